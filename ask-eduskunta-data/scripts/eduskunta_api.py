@@ -8,25 +8,77 @@ containing the retrieval time, request, endpoint, and returned data.
 from __future__ import annotations
 
 import argparse
+import codecs
 import email.utils
+import hashlib
+import http.client
+import itertools
 import json
+import os
+import re
 import sys
+import tempfile
+import threading
 import time
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field, replace
+from datetime import date, datetime, timedelta, timezone
+from html import unescape
 from html.parser import HTMLParser
 from pathlib import Path
-from typing import Any, Callable, Iterable, Mapping
+from typing import Any, Callable, Iterable, Iterator, Mapping, NoReturn, Sequence
 from urllib.error import HTTPError, URLError
-from urllib.parse import parse_qs, quote, urlencode, urlparse
-from urllib.request import Request, urlopen
+from urllib.parse import parse_qs, quote, urlencode, urljoin, urlparse
+from urllib.request import Request, getproxies, proxy_bypass, urlopen
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+try:
+    import msvcrt
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None  # type: ignore[assignment]
 
 
 DEFAULT_BASE_URL = "https://api.eduskunta.fi/api/v1"
 DEFAULT_TIMEOUT = 45.0
 TRANSIENT_STATUS = {429, 500, 502, 503, 504}
 MAX_SEARCH_RESULTS = 10_000
+# Longest URL-encoded ``q`` sent as GET; longer searches go through POST.
+MAX_GET_QUERY = 900
+# Most values one ``match`` partition ORs together, which keeps a partitioned
+# search short enough for GET.
+MAX_MATCH_VALUES = 8
+BATCH_METHODS = {
+    "matter": "matter",
+    "documents": "documents",
+    "document": "document",
+    "vote": "vote",
+    "mp": "mp",
+    "session-votes": "session_votes",
+    "matter-votes": "matter_votes",
+    "reference": "reference",
+}
+REFERENCE_NAMES = frozenset(
+    {
+        "asiakirjatyypit",
+        "asiatyypit",
+        "eduskuntaryhmat",
+        "kansanedustajat",
+        "puheenvuorotyypit",
+        "sukupuolet",
+        "vaalikaudet",
+        "vaalipiirit",
+        "valiokunnat",
+        "valtiopaivat",
+    }
+)
 USER_AGENT = "ask-eduskunta-data/1.0 (+https://api.eduskunta.fi/)"
+ACCEPT_ENCODING = "gzip, deflate"
+READ_CHUNK = 64 * 1024
 
 
 class ApiError(RuntimeError):
@@ -43,16 +95,36 @@ class HttpResponse:
     headers: Mapping[str, str]
     body: bytes
     final_url: str
+    wire_bytes: int | None = None
+    # Seconds spent per phase ("connect", "ttfb", "download") when measured.
+    timings: Mapping[str, float] | None = None
 
 
 @dataclass(frozen=True)
 class RequestTrace:
+    """Audit record of one logical request.
+
+    ``timings`` holds seconds per phase: ``connect``, ``ttfb`` and
+    ``download`` as measured by the transport, ``decode`` for turning the body
+    into data, and ``total`` from the first attempt to the response including
+    sleeps. ``retries`` lists why and for how long earlier attempts backed off;
+    ``sleep_seconds`` is all time slept for this request, including rate
+    limiter waits.
+    """
+
     method: str
     url: str
     final_url: str
     status: int
     retrieved_at: str
     attempt: int
+    cache: str = "network"
+    wire_bytes: int = 0
+    decoded_bytes: int = 0
+    request_bytes: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+    retries: list[dict[str, Any]] = field(default_factory=list)
+    sleep_seconds: float = 0.0
 
 
 Transport = Callable[[str, str, bytes | None, Mapping[str, str], float], HttpResponse]
@@ -86,21 +158,316 @@ def public_document_url(edktunnus: str) -> str:
     )
 
 
-def _default_transport(
+def urlopen_transport(
     method: str,
     url: str,
     body: bytes | None,
     headers: Mapping[str, str],
     timeout: float,
 ) -> HttpResponse:
-    request = Request(url, data=body, headers=dict(headers), method=method)
+    """Send one request with ``urlopen``; honours proxy environment variables."""
+
+    request_headers = dict(headers)
+    request_headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+    request = Request(url, data=body, headers=request_headers, method=method)
+    started = time.perf_counter()
     with urlopen(request, timeout=timeout) as response:
+        # urlopen connects and reads the headers in one call.
+        headed = time.perf_counter()
+        response_headers = {key: value for key, value in response.headers.items()}
+        payload, wire_bytes = _read_body(response, response_headers)
         return HttpResponse(
             status=int(response.status),
-            headers={key: value for key, value in response.headers.items()},
-            body=response.read(),
+            headers=response_headers,
+            body=payload,
             final_url=response.geturl(),
+            wire_bytes=wire_bytes,
+            timings={
+                "ttfb": headed - started,
+                "download": time.perf_counter() - headed,
+            },
+        )
+
+
+def _add_timing(timings: dict[str, float], phase: str, seconds: float) -> None:
+    timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+class _BodyDecoder:
+    """Incrementally decode one response body's ``Content-Encoding``.
+
+    ``wire_bytes`` counts the bytes fed in. ``finish`` removes
+    ``Content-Encoding`` and ``Content-Length`` from ``headers`` once a
+    compressed body has been decoded, since they describe the wire format.
+    """
+
+    def __init__(self, headers: dict[str, str]) -> None:
+        encoding = (_header(headers, "Content-Encoding") or "identity").strip().lower()
+        if encoding in {"gzip", "x-gzip"}:
+            self._decoder: Any = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding in {"deflate", "identity"}:
+            self._decoder = None
+        else:
+            raise ApiError(f"Unsupported Content-Encoding: {encoding}")
+        self.encoding = encoding
+        self.headers = headers
+        self.wire_bytes = 0
+
+    def decode(self, chunk: bytes) -> bytes:
+        self.wire_bytes += len(chunk)
+        if self.encoding == "identity" or not chunk:
+            return chunk
+        if self._decoder is None:
+            # "deflate" is zlib-wrapped by the standard but raw in practice.
+            raw = (
+                len(chunk) < 2
+                or (chunk[0] & 0x0F) != 8
+                or (chunk[0] << 8 | chunk[1]) % 31 != 0
+            )
+            self._decoder = zlib.decompressobj(
+                -zlib.MAX_WBITS if raw else zlib.MAX_WBITS
+            )
+        try:
+            return self._decoder.decompress(chunk)
+        except zlib.error as exc:
+            raise ApiError(f"Could not decode {self.encoding} response: {exc}") from exc
+
+    def finish(self) -> bytes:
+        if self.encoding == "identity":
+            return b""
+        tail = self._decoder.flush() if self._decoder is not None else b""
+        for name in [
+            key
+            for key in self.headers
+            if key.lower() in {"content-encoding", "content-length"}
+        ]:
+            del self.headers[name]
+        return tail
+
+
+def _read_body(stream: Any, headers: dict[str, str]) -> tuple[bytes, int]:
+    """Read and incrementally decompress a response body.
+
+    Returns the decoded body and the number of bytes received on the wire.
+    ``Content-Encoding`` and ``Content-Length`` are removed from ``headers``
+    once the body has been decoded, since they describe the wire format.
+    """
+
+    decoder = _BodyDecoder(headers)
+    parts: list[bytes] = []
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.finish())
+    return b"".join(parts), decoder.wire_bytes
+
+
+REDIRECT_STATUS = {301, 302, 303, 307, 308}
+
+
+class PooledTransport:
+    """Keep-alive transport that reuses ``http.client`` connections per host.
+
+    At most ``max_per_host`` requests are in flight per host; idle connections
+    older than ``idle_timeout`` seconds are closed before reuse. Redirects are
+    followed like ``urlopen`` does: 301, 302 and 303 turn POST into GET and
+    307/308 repeat the request. Requests that must go through a proxy from the
+    environment are delegated to :func:`urlopen_transport`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_per_host: int = 4,
+        idle_timeout: float = 30.0,
+        max_redirects: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.max_redirects = max_redirects
+        self.clock = clock
+        self._idle: dict[tuple[str, str, int], list[tuple[Any, float]]] = {}
+        self._slots: dict[tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> HttpResponse:
+        current_method, current_url, current_body = method, url, body
+        current_headers = dict(headers)
+        current_headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        timings: dict[str, float] = {}
+        for _ in range(self.max_redirects + 1):
+            parts = urlparse(current_url)
+            if _uses_proxy(parts.scheme, parts.hostname or ""):
+                return urlopen_transport(
+                    current_method, current_url, current_body, current_headers, timeout
+                )
+            status, response_headers, response_body, wire_bytes = self._send(
+                current_method, parts, current_body, current_headers, timeout, timings
+            )
+            location = _header(response_headers, "Location")
+            if status not in REDIRECT_STATUS or not location:
+                return HttpResponse(
+                    status=status,
+                    headers=response_headers,
+                    body=response_body,
+                    final_url=current_url,
+                    wire_bytes=wire_bytes,
+                    timings=timings,
+                )
+            current_url = urljoin(current_url, location)
+            if status in {301, 302, 303} and current_method != "HEAD":
+                current_method = "GET"
+                current_body = None
+                current_headers.pop("Content-Type", None)
+        raise ApiError(f"Too many redirects for {url}")
+
+    def _send(
+        self,
+        method: str,
+        parts: Any,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timeout: float,
+        timings: dict[str, float],
+    ) -> tuple[int, dict[str, str], bytes, int]:
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"}:
+            raise ApiError(f"Unsupported URL scheme: {scheme}")
+        host = parts.hostname or ""
+        key = (scheme, host, parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        with self._lock:
+            slots = self._slots.setdefault(
+                key, threading.BoundedSemaphore(self.max_per_host)
+            )
+        with slots:
+            connection, reused = self._checkout(key, timeout)
+            try:
+                return self._exchange(
+                    connection, key, method, target, body, headers, timings
+                )
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                if not reused or not isinstance(
+                    exc, (ConnectionError, http.client.HTTPException)
+                ):
+                    _reraise_as_os_error(exc)
+            except BaseException:
+                connection.close()
+                raise
+            # The server closed an idle keep-alive connection; retry once on a
+            # fresh one.
+            connection = self._open(key, timeout)
+            try:
+                return self._exchange(
+                    connection, key, method, target, body, headers, timings
+                )
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                _reraise_as_os_error(exc)
+            except BaseException:
+                connection.close()
+                raise
+
+    def _exchange(
+        self,
+        connection: Any,
+        key: tuple[str, str, int],
+        method: str,
+        target: str,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timings: dict[str, float],
+    ) -> tuple[int, dict[str, str], bytes, int]:
+        started = time.perf_counter()
+        if connection.sock is None:
+            connection.connect()
+            connected = time.perf_counter()
+            _add_timing(timings, "connect", connected - started)
+            started = connected
+        connection.request(method, target, body=body, headers=dict(headers))
+        response = connection.getresponse()
+        headed = time.perf_counter()
+        _add_timing(timings, "ttfb", headed - started)
+        response_headers = {key: value for key, value in response.getheaders()}
+        payload, wire_bytes = _read_body(response, response_headers)
+        _add_timing(timings, "download", time.perf_counter() - headed)
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(key, connection)
+        return int(response.status), response_headers, payload, wire_bytes
+
+    def _open(self, key: tuple[str, str, int], timeout: float) -> Any:
+        scheme, host, port = key
+        factory = (
+            http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
         )
+        with self._lock:
+            self.connections_opened += 1
+        return factory(host, port, timeout=timeout)
+
+    def _checkout(self, key: tuple[str, str, int], timeout: float) -> tuple[Any, bool]:
+        now = self.clock()
+        stale: list[Any] = []
+        connection = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, since = idle.pop()
+                if now - since <= self.idle_timeout:
+                    connection = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+        if connection is None:
+            return self._open(key, timeout), False
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection, True
+
+    def _checkin(self, key: tuple[str, str, int], connection: Any) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            idle.append((connection, self.clock()))
+            overflow = idle[: max(0, len(idle) - self.max_per_host)]
+            del idle[: len(overflow)]
+        for candidate in overflow:
+            candidate[0].close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [connection for items in self._idle.values() for connection, _ in items]
+            self._idle.clear()
+        for connection in idle:
+            connection.close()
+
+
+def _reraise_as_os_error(exc: BaseException) -> NoReturn:
+    """Re-raise protocol errors as OSError so that the client retries them."""
+
+    if isinstance(exc, OSError):
+        raise exc
+    raise ConnectionError(f"{type(exc).__name__}: {exc}") from exc
+
+
+def _uses_proxy(scheme: str, host: str) -> bool:
+    return scheme in getproxies() and not proxy_bypass(host)
 
 
 def _retry_after_seconds(headers: Mapping[str, str]) -> float | None:
@@ -122,6 +489,13 @@ def _retry_after_seconds(headers: Mapping[str, str]) -> float | None:
             return None
 
 
+def _header(headers: Mapping[str, str], name: str) -> str | None:
+    lowered = name.lower()
+    return next(
+        (value for key, value in headers.items() if key.lower() == lowered), None
+    )
+
+
 def _decode_json(body: bytes, url: str) -> Any:
     try:
         return json.loads(body.decode("utf-8-sig"))
@@ -130,6 +504,1170 @@ def _decode_json(body: bytes, url: str) -> Any:
         raise ApiError(f"Expected JSON from {url}, received: {preview!r}") from exc
 
 
+@dataclass(frozen=True)
+class PartitionAxis:
+    """A range that a search can be split along.
+
+    ``start`` is inclusive and ``end`` exclusive, like the API's ``from``/``to``
+    and ``fromDate``/``toDate`` ranges. ``kind`` is ``match`` for values such as
+    ``valtiopaivavuosi`` that are matched one by one, ``int`` for integer
+    ranges and ``date`` for ISO date ranges. A wide ``match`` range is first
+    split into runs of at most ``MAX_MATCH_VALUES`` values rather than halved.
+    """
+
+    property: str
+    start: str
+    end: str
+    kind: str = "int"
+
+    def bounds(self) -> tuple[Any, Any]:
+        if self.kind == "date":
+            low, high = date.fromisoformat(self.start), date.fromisoformat(self.end)
+        else:
+            low, high = int(self.start), int(self.end)
+        if high <= low:
+            raise ValueError(f"Empty partition range for {self.property}")
+        return low, high
+
+    def parts(self, low: Any, high: Any) -> tuple[tuple[Any, Any], ...] | None:
+        if self.kind == "match" and high - low > MAX_MATCH_VALUES:
+            count = -(-(high - low) // MAX_MATCH_VALUES)
+            edges = [low + (high - low) * index // count for index in range(count + 1)]
+            return tuple(zip(edges, edges[1:]))
+        if self.kind == "date":
+            days = (high - low).days
+            if days <= 1:
+                return None
+            middle = low + timedelta(days=days // 2)
+        else:
+            if high - low <= 1:
+                return None
+            middle = low + (high - low) // 2
+        return (low, middle), (middle, high)
+
+    def condition(self, low: Any, high: Any) -> dict[str, Any]:
+        if self.kind == "date":
+            return {
+                "property": self.property,
+                "fromDate": low.isoformat(),
+                "toDate": high.isoformat(),
+            }
+        if self.kind == "match":
+            if high - low > MAX_MATCH_VALUES:
+                raise ValueError(
+                    f"{self.property} part {low}:{high} has more than "
+                    f"{MAX_MATCH_VALUES} values"
+                )
+            matches = [
+                {"property": self.property, "match": str(value)}
+                for value in range(low, high)
+            ]
+            return matches[0] if len(matches) == 1 else {"or": matches}
+        return {"property": self.property, "from": low, "to": high}
+
+
+def parse_partition_axis(spec: str) -> PartitionAxis:
+    """Parse ``property[:kind]=start:end``, inferring the kind when omitted."""
+
+    name, separator, value_range = spec.partition("=")
+    start, colon, end = value_range.partition(":")
+    if not separator or not colon or not name or not start or not end:
+        raise ValueError(f"Partition must look like property=start:end, got {spec!r}")
+    prop, _, kind = name.partition(":")
+    if not kind:
+        if "-" in start:
+            kind = "date"
+        elif prop.split(".", 1)[0] in {"valtiopaivavuosi", "taysistuntonumero"}:
+            kind = "match"
+        else:
+            kind = "int"
+    if kind not in {"match", "int", "date"}:
+        raise ValueError(f"Unknown partition kind: {kind}")
+    axis = PartitionAxis(prop, start, end, kind)
+    axis.bounds()
+    return axis
+
+
+@dataclass(frozen=True)
+class CountAxis:
+    """Values a count matrix is split along; each value is matched exactly."""
+
+    property: str
+    values: tuple[str, ...]
+
+    def condition(self, value: str) -> dict[str, Any]:
+        return {"property": self.property, "match": value}
+
+    def union(self) -> dict[str, Any]:
+        matches = [self.condition(value) for value in self.values]
+        return matches[0] if len(matches) == 1 else {"or": matches}
+
+
+def parse_count_axis(spec: str) -> CountAxis:
+    """Parse ``property=a,b,c`` or an integer range ``property=start:end``."""
+
+    prop, separator, raw = spec.partition("=")
+    if not separator or not prop or not raw:
+        raise ValueError(
+            f"Axis must look like property=a,b,c or property=start:end, got {spec!r}"
+        )
+    start, colon, end = raw.partition(":")
+    if colon:
+        try:
+            values = tuple(str(value) for value in range(int(start), int(end)))
+        except ValueError:
+            raise ValueError(f"Axis range must be integers, got {raw!r}") from None
+    else:
+        values = tuple(value.strip() for value in raw.split(",") if value.strip())
+    if not values:
+        raise ValueError(f"Axis {prop} has no values")
+    return CountAxis(prop, values)
+
+
+def _with_conditions(
+    payload: Mapping[str, Any], conditions: Sequence[Mapping[str, Any]]
+) -> dict[str, Any]:
+    result = dict(payload)
+    if not conditions:
+        return result
+    clauses = [dict(condition) for condition in conditions]
+    if payload.get("expression"):
+        clauses.insert(0, payload["expression"])
+    result["expression"] = clauses[0] if len(clauses) == 1 else {"and": clauses}
+    return result
+
+
+def _search_base(
+    payload: Mapping[str, Any], page_size: int, max_records: int, partitioned: bool
+) -> dict[str, Any]:
+    base_payload = dict(payload)
+    base_payload.pop("startFromIndex", None)
+    if partitioned:
+        base_payload.pop("maxResults", None)
+    else:
+        base_payload["maxResults"] = min(page_size, max_records)
+    return base_payload
+
+
+def _record_id(record: Any) -> str | None:
+    """Return a search record's ``id``, looking inside a category wrapper."""
+
+    if not isinstance(record, dict):
+        return None
+    if "id" not in record:
+        inner = [value for value in record.values() if isinstance(value, dict)]
+        record = next((value for value in inner if "id" in value), {})
+    value = record.get("id")
+    if isinstance(value, dict):
+        value = value.get("fi", value.get("sv"))
+    return None if value is None or isinstance(value, (dict, list)) else str(value)
+
+
+def _id_chunks(payload: Mapping[str, Any], ids: Sequence[str]) -> list[list[str]]:
+    """Split ``ids`` greedily into ``ids`` searches that each fit a GET URL."""
+
+    chunks: list[list[str]] = []
+    chunk: list[str] = []
+    for identifier in ids:
+        candidate = chunk + [identifier]
+        probe = _with_conditions(payload, [{"ids": candidate}])
+        probe.update(maxResults=len(candidate), startFromIndex=0)
+        if chunk and EduskuntaClient._search_method(probe, "auto") == "POST":
+            chunks.append(chunk)
+            candidate = [identifier]
+        chunk = candidate
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _count_value(data: Any) -> int:
+    if isinstance(data, bool):
+        raise ApiError("Count response was not a number")
+    if isinstance(data, int):
+        return data
+    if isinstance(data, dict):
+        for key in ("count", "totalResultCount"):
+            if isinstance(data.get(key), int):
+                return int(data[key])
+        metadata = data.get("searchMetadata")
+        if isinstance(metadata, dict) and isinstance(
+            metadata.get("totalResultCount"), int
+        ):
+            return int(metadata["totalResultCount"])
+    raise ApiError("Count response did not contain a count")
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    capacity: float
+    per_second: float
+
+
+# The OpenAPI description limits POST to 450 requests per 3000 s per IP. A
+# bucket allows at most capacity + per_second * window requests in any window,
+# so the POST bucket is sized to stay within that budget. GET has no documented
+# limit, so its bucket only caps runaway bursts and leaves concurrent detail
+# and batch calls unpaced; after a 429, penalize() slows GETs down.
+DEFAULT_RATE_BUCKETS: Mapping[str, BucketSpec] = {
+    "GET": BucketSpec(capacity=100.0, per_second=10.0),
+    "POST": BucketSpec(capacity=50.0, per_second=400 / 3000),
+}
+DEFAULT_RATE_STATE = Path(tempfile.gettempdir()) / "ask-eduskunta-data-ratelimit.json"
+
+
+class _FileLock:
+    """Exclusive lock shared by threads and by processes on the same host."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._handle: Any = None
+
+    def __enter__(self) -> "_FileLock":
+        self._thread_lock.acquire()
+        try:
+            self._handle = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                while True:
+                    try:
+                        self._handle.seek(0)
+                        msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            if self._handle is not None:
+                self._handle.close()
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._handle.close()
+            self._handle = None
+            self._thread_lock.release()
+
+
+class RateLimiter:
+    """Token buckets per HTTP method, optionally shared through a state file.
+
+    ``acquire`` reserves a token and returns how long the caller must wait
+    before sending. Reservations may drive a bucket negative, which queues
+    concurrent callers fairly. ``penalize`` records 429 feedback: the bucket is
+    blocked until ``Retry-After`` has passed and its refill rate is halved,
+    recovering linearly over ``recovery`` seconds.
+    """
+
+    def __init__(
+        self,
+        state_path: str | os.PathLike[str] | None = None,
+        *,
+        buckets: Mapping[str, BucketSpec] = DEFAULT_RATE_BUCKETS,
+        recovery: float = 600.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.state_path = Path(state_path) if state_path is not None else None
+        self.buckets = dict(buckets)
+        self.recovery = recovery
+        self.clock = clock
+        self._state: dict[str, dict[str, float]] = {}
+        self._lock: Any = (
+            _FileLock(self.state_path.with_name(self.state_path.name + ".lock"))
+            if self.state_path is not None
+            else threading.Lock()
+        )
+
+    def _load(self) -> dict[str, dict[str, float]]:
+        if self.state_path is None:
+            return self._state
+        try:
+            value = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return value if isinstance(value, dict) else {}
+
+    def _save(self, state: dict[str, dict[str, float]]) -> None:
+        if self.state_path is None:
+            self._state = state
+            return
+        _atomic_write_bytes(self.state_path, json.dumps(state).encode("utf-8"))
+
+    def _bucket(
+        self, state: dict[str, dict[str, float]], method: str, now: float
+    ) -> tuple[dict[str, float], BucketSpec]:
+        spec = self.buckets[method]
+        bucket = state.get(method)
+        if not isinstance(bucket, dict):
+            bucket = {
+                "tokens": spec.capacity,
+                "updated": now,
+                "blocked_until": 0.0,
+                "scale": 1.0,
+            }
+        elapsed = max(0.0, now - float(bucket["updated"]))
+        scale = min(1.0, float(bucket["scale"]) + elapsed / self.recovery)
+        tokens = min(
+            spec.capacity, float(bucket["tokens"]) + elapsed * spec.per_second * scale
+        )
+        bucket = {
+            "tokens": tokens,
+            "updated": now,
+            "blocked_until": float(bucket["blocked_until"]),
+            "scale": scale,
+        }
+        state[method] = bucket
+        return bucket, spec
+
+    def acquire(self, method: str) -> float:
+        method = method.upper()
+        if method not in self.buckets:
+            return 0.0
+        with self._lock:
+            state = self._load()
+            now = self.clock()
+            bucket, spec = self._bucket(state, method, now)
+            bucket["tokens"] -= 1.0
+            wait = max(0.0, bucket["blocked_until"] - now)
+            if bucket["tokens"] < 0:
+                wait = max(wait, -bucket["tokens"] / (spec.per_second * bucket["scale"]))
+            self._save(state)
+        return wait
+
+    def penalize(self, method: str, delay: float) -> None:
+        method = method.upper()
+        if method not in self.buckets:
+            return
+        with self._lock:
+            state = self._load()
+            now = self.clock()
+            bucket, _ = self._bucket(state, method, now)
+            bucket["blocked_until"] = max(bucket["blocked_until"], now + delay)
+            bucket["tokens"] = min(bucket["tokens"], 0.0)
+            bucket["scale"] = max(0.125, bucket["scale"] / 2)
+            self._save(state)
+
+
+# Reference data and published documents practically never change; searches,
+# counts and the latest-votes feed do. The first matching prefix wins.
+DEFAULT_CACHE_TTLS: tuple[tuple[str, float], ...] = (
+    ("/reference-data/", 7 * 86_400.0),
+    ("/asiakirjat/edktunnus/", 30 * 86_400.0),
+    ("/taysistunnot/aanestykset/", 30 * 86_400.0),
+    ("/taysistunnot/istunnon-aanestykset/", 86_400.0),
+    ("/taysistunnot/poytakirja-asiakohdat/", 86_400.0),
+    ("/taysistunnot/uusimmat-aanestykset", 300.0),
+    ("/kansanedustajat", 86_400.0),
+    ("/valtiopaivaasiat/", 3_600.0),
+    ("/asiakirjat/eduskuntatunnus/", 3_600.0),
+    ("/taysistunnot/asian-aanestykset/", 3_600.0),
+    ("/search", 900.0),
+    ("/aggregations/", 900.0),
+)
+CLOSED_MATTER_TTL = 30 * 86_400.0
+DEFAULT_CACHE_TTL = 900.0
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _has_decision(value: Any, depth: int = 0) -> bool:
+    if depth > 4:
+        return False
+    if isinstance(value, dict):
+        if value.get("kokonaispaatosnimi"):
+            return True
+        return any(_has_decision(item, depth + 1) for item in value.values())
+    if isinstance(value, list):
+        return any(_has_decision(item, depth + 1) for item in value[:5])
+    return False
+
+
+class ResponseCache:
+    """Size-bounded on-disk cache of successful API responses.
+
+    Entries are keyed by method, URL and the canonical JSON payload. Each entry
+    keeps its original retrieval time and validators so that stale entries can
+    be revalidated with ``If-None-Match``/``If-Modified-Since`` instead of being
+    downloaded again. Least recently used entries are evicted when the total
+    body size exceeds ``max_bytes``.
+
+    The total is kept as a running count, so the directory is only scanned
+    when it crosses ``max_bytes``; eviction then frees down to
+    ``EVICT_TO_FRACTION`` of the limit so the next scan is many writes away.
+    """
+
+    EVICT_TO_FRACTION = 0.9
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        *,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        ttls: Iterable[tuple[str, float]] = DEFAULT_CACHE_TTLS,
+        default_ttl: float = DEFAULT_CACHE_TTL,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = tuple(ttls)
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._size: int | None = None
+
+    @staticmethod
+    def key(method: str, url: str, payload: Mapping[str, Any] | None) -> str:
+        canonical = json.dumps(
+            [method.upper(), url, payload],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, method: str, path: str, body: bytes) -> float:
+        route = path.split("?", 1)[0]
+        if route.startswith("/valtiopaivaasiat/"):
+            try:
+                if _has_decision(json.loads(body.decode("utf-8-sig"))):
+                    return CLOSED_MATTER_TTL
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                pass
+        for prefix, ttl in self.ttls:
+            if route.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.meta.json", self.directory / f"{key}.body"
+
+    def get(self, key: str) -> tuple[HttpResponse, dict[str, Any]] | None:
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        response = HttpResponse(
+            status=int(meta["status"]),
+            headers=dict(meta.get("headers") or {}),
+            body=body,
+            final_url=str(meta["final_url"]),
+        )
+        return response, meta
+
+    def is_fresh(self, meta: Mapping[str, Any]) -> bool:
+        return float(meta.get("expires_at", 0)) > self.clock()
+
+    def put(
+        self,
+        key: str,
+        response: HttpResponse,
+        *,
+        method: str,
+        url: str,
+        ttl: float,
+        retrieved_at: str,
+    ) -> None:
+        meta = {
+            "method": method,
+            "url": url,
+            "final_url": response.final_url,
+            "status": response.status,
+            "headers": dict(response.headers),
+            "retrieved_at": retrieved_at,
+            "expires_at": self.clock() + ttl,
+            "etag": _header(response.headers, "ETag"),
+            "last_modified": _header(response.headers, "Last-Modified"),
+        }
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            try:
+                replaced = body_path.stat().st_size
+            except OSError:
+                replaced = 0
+            _atomic_write_bytes(body_path, response.body)
+            _atomic_write_bytes(
+                meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            )
+            self._size += len(response.body) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def refresh(
+        self, key: str, meta: Mapping[str, Any], *, ttl: float, retrieved_at: str
+    ) -> None:
+        updated = dict(meta)
+        updated["expires_at"] = self.clock() + ttl
+        updated["retrieved_at"] = retrieved_at
+        meta_path, _ = self._paths(key)
+        with self._lock:
+            _atomic_write_bytes(
+                meta_path, json.dumps(updated, ensure_ascii=False).encode("utf-8")
+            )
+
+    def _scan(self) -> tuple[list[tuple[float, int, Path]], int]:
+        entries = []
+        total = 0
+        for body_path in self.directory.glob("*.body"):
+            try:
+                stat = body_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+            total += stat.st_size
+        return entries, total
+
+    def _evict(self) -> None:
+        # Rescan rather than trust the running total: other processes may
+        # share the directory.
+        entries, total = self._scan()
+        if total > self.max_bytes:
+            target = self.max_bytes * self.EVICT_TO_FRACTION
+            for _, size, body_path in sorted(entries):
+                if total <= target:
+                    break
+                key = body_path.name[: -len(".body")]
+                for path in self._paths(key):
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                total -= size
+        self._size = total
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+RequestKey = tuple[str, str, str, str | None]
+
+
+class ResponseMemo:
+    """Bounded in-memory LRU of successful responses for one client session.
+
+    Unlike :class:`ResponseCache` nothing is persisted and entries do not
+    expire; the least recently used ones are dropped beyond ``max_entries``
+    or ``max_bytes`` of response bodies.
+    """
+
+    def __init__(
+        self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[RequestKey, tuple[HttpResponse, RequestTrace]] = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: RequestKey) -> tuple[HttpResponse, RequestTrace] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        response, trace = entry
+        return response, _shared_trace(trace, "memo")
+
+    def put(self, key: RequestKey, response: HttpResponse, trace: RequestTrace) -> None:
+        size = len(response.body)
+        if size > self.max_bytes or self.max_entries < 1:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0].body)
+            self._entries[key] = (response, trace)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (dropped, _) = self._entries.popitem(last=False)
+                self._bytes -= len(dropped.body)
+
+
+def _request_key(
+    method: str, path: str, payload: Mapping[str, Any] | None, accept: str
+) -> RequestKey:
+    body = None
+    if payload is not None:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return method, path, accept, body
+
+
+def _shared_trace(
+    trace: RequestTrace, cache: str, waited: float | None = None
+) -> RequestTrace:
+    """Trace for a caller served by another caller's response.
+
+    Bytes, retries and sleeps stay with the request that did the work, so run
+    metrics count them once; ``waited`` is how long a coalesced caller waited.
+    """
+
+    return replace(
+        trace,
+        cache=cache,
+        wire_bytes=0,
+        request_bytes=0,
+        timings={} if waited is None else {"total": round(waited, 6)},
+        retries=[],
+        sleep_seconds=0.0,
+    )
+
+
+@dataclass(frozen=True)
+class _PreparedRequest:
+    method: str
+    path: str
+    url: str
+    body: bytes | None
+    headers: Mapping[str, str]
+    cache_key: str | None = None
+    cached: tuple[HttpResponse, dict[str, Any]] | None = None
+
+
+class _RequestLog:
+    """Retry reasons and sleeps of one logical request, for its trace."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.retries: list[dict[str, Any]] = []
+        self.sleep_seconds = 0.0
+
+    def retry(
+        self, attempt: int, reason: str, delay: float, detail: str | None = None
+    ) -> None:
+        entry: dict[str, Any] = {
+            "attempt": attempt,
+            "reason": reason,
+            "delay": round(delay, 3),
+        }
+        if detail:
+            entry["detail"] = detail
+        self.retries.append(entry)
+
+    def slept(self, seconds: float) -> None:
+        self.sleep_seconds += seconds
+
+    def trace_fields(self, response: HttpResponse | None) -> dict[str, Any]:
+        timings = {
+            phase: round(seconds, 6)
+            for phase, seconds in ((response and response.timings) or {}).items()
+        }
+        timings["total"] = round(time.perf_counter() - self.started, 6)
+        return {
+            "timings": timings,
+            "retries": list(self.retries),
+            "sleep_seconds": round(self.sleep_seconds, 6),
+        }
+
+
+def _prepare_request(
+    base_url: str,
+    cache: ResponseCache | None,
+    method: str,
+    path: str,
+    payload: Mapping[str, Any] | None,
+    accept: str,
+) -> tuple[_PreparedRequest, tuple[HttpResponse, RequestTrace] | None]:
+    """Build the request and answer it from ``cache`` when a fresh copy exists.
+
+    Stale cached copies add validators to the headers so that the server can
+    answer 304; the copy is kept on the prepared request for that case.
+    """
+
+    url = f"{base_url}{path}"
+    body = None
+    headers = {"Accept": accept, "User-Agent": USER_AGENT}
+    if payload is not None:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        headers["Content-Type"] = "application/json"
+
+    cache_key: str | None = None
+    cached: tuple[HttpResponse, dict[str, Any]] | None = None
+    if cache is not None:
+        cache_key = ResponseCache.key(method, url, payload)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached_response, meta = cached
+            if cache.is_fresh(meta):
+                trace = RequestTrace(
+                    method=method,
+                    url=url,
+                    final_url=cached_response.final_url,
+                    status=cached_response.status,
+                    retrieved_at=str(meta.get("retrieved_at") or utc_now()),
+                    attempt=0,
+                    cache="hit",
+                    decoded_bytes=len(cached_response.body),
+                )
+                prepared = _PreparedRequest(method, path, url, body, headers)
+                return prepared, (cached_response, trace)
+            if meta.get("etag"):
+                headers["If-None-Match"] = str(meta["etag"])
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = str(meta["last_modified"])
+    prepared = _PreparedRequest(method, path, url, body, headers, cache_key, cached)
+    return prepared, None
+
+
+def _settle_response(
+    cache: ResponseCache | None,
+    prepared: _PreparedRequest,
+    response: HttpResponse,
+    attempt: int,
+    log: _RequestLog | None = None,
+) -> tuple[HttpResponse, RequestTrace] | float:
+    """Turn a transport response into a result, a retry delay or an error.
+
+    A float means the status is transient: it is the ``Retry-After`` delay, or
+    ``-1.0`` when the server gave none and the caller should back off itself.
+    """
+
+    if response.status == 304 and prepared.cached is not None:
+        return _revalidated(cache, prepared, attempt, log, response)
+    if response.status in TRANSIENT_STATUS:
+        delay = _retry_after_seconds(response.headers)
+        return -1.0 if delay is None else delay
+    if response.status < 200 or response.status >= 300:
+        preview = response.body[:240].decode("utf-8", errors="replace")
+        raise ApiError(f"HTTP {response.status} for {prepared.url}: {preview!r}")
+    trace = RequestTrace(
+        method=prepared.method,
+        url=prepared.url,
+        final_url=response.final_url,
+        status=response.status,
+        retrieved_at=utc_now(),
+        attempt=attempt,
+        wire_bytes=(
+            len(response.body) if response.wire_bytes is None else response.wire_bytes
+        ),
+        decoded_bytes=len(response.body),
+        request_bytes=len(prepared.body or b""),
+        **(log.trace_fields(response) if log is not None else {}),
+    )
+    if cache is not None and prepared.cache_key and response.status == 200:
+        cache.put(
+            prepared.cache_key,
+            response,
+            method=prepared.method,
+            url=prepared.url,
+            ttl=cache.ttl_for(prepared.method, prepared.path, response.body),
+            retrieved_at=trace.retrieved_at,
+        )
+    return response, trace
+
+
+def _revalidated(
+    cache: ResponseCache | None,
+    prepared: _PreparedRequest,
+    attempt: int,
+    log: _RequestLog | None = None,
+    response: HttpResponse | None = None,
+) -> tuple[HttpResponse, RequestTrace]:
+    assert cache is not None and prepared.cached is not None
+    assert prepared.cache_key is not None
+    cached_response, meta = prepared.cached
+    retrieved_at = utc_now()
+    cache.refresh(
+        prepared.cache_key,
+        meta,
+        ttl=cache.ttl_for(prepared.method, prepared.path, cached_response.body),
+        retrieved_at=retrieved_at,
+    )
+    trace = RequestTrace(
+        method=prepared.method,
+        url=prepared.url,
+        final_url=cached_response.final_url,
+        status=cached_response.status,
+        retrieved_at=retrieved_at,
+        attempt=attempt,
+        cache="revalidated",
+        wire_bytes=0 if response is None else response.wire_bytes or 0,
+        decoded_bytes=len(cached_response.body),
+        request_bytes=len(prepared.body or b""),
+        **(log.trace_fields(response) if log is not None else {}),
+    )
+    return cached_response, trace
+
+
+def _envelope_trace(
+    trace: RequestTrace, decode_seconds: float, metrics: RunMetrics | None
+) -> dict[str, Any]:
+    """Return ``trace`` as an envelope dict with the decode time recorded."""
+
+    record = asdict(trace)
+    record["timings"]["decode"] = round(decode_seconds, 6)
+    if metrics is not None:
+        metrics.record(record)
+    return record
+
+
+def _decode_text(response: HttpResponse) -> str:
+    encoding = "utf-8"
+    content_type = _header(response.headers, "Content-Type") or ""
+    if "charset=" in content_type.lower():
+        encoding = content_type.lower().split("charset=", 1)[1].split(";", 1)[0]
+    return response.body.decode(encoding, errors="replace")
+
+
+def _search_page(data: Any, max_records: int) -> tuple[list[Any], int]:
+    """Validate one search page and return its results and total count."""
+
+    if not isinstance(data, dict):
+        raise ApiError("Search response was not a JSON object")
+    page_results = data.get("results")
+    metadata = data.get("searchMetadata") or {}
+    if not isinstance(page_results, list):
+        raise ApiError("Search response did not contain a results list")
+    raw_total = metadata.get("totalResultCount")
+    total = int(raw_total) if raw_total is not None else len(page_results)
+    if total > MAX_SEARCH_RESULTS:
+        raise SearchLimitError(
+            f"Query matches {total} results; split it into non-overlapping "
+            "partitions such as years or sessions (see --partition)"
+        )
+    if total > max_records:
+        raise SearchLimitError(
+            f"Query matches {total} results, above max_records={max_records}"
+        )
+    return page_results, total
+
+
+class HarvestCheckpoint:
+    """Progress of a long harvest, persisted so that a re-run can resume.
+
+    The state lives in ``path`` as JSON and the records written so far in
+    ``<path>.records.ndjson``. Records are appended and synced before the state
+    is atomically replaced, and ``records_offset`` in the state marks the end of
+    the last complete write, so a crash between the two never duplicates or
+    loses records.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        self.records_path = self.path.with_name(self.path.name + ".records.ndjson")
+
+    def load(self, fingerprint: str) -> dict[str, Any] | None:
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except ValueError as exc:
+            raise ValueError(f"Checkpoint {self.path} is not valid JSON") from exc
+        if state.get("fingerprint") != fingerprint:
+            raise ValueError(
+                f"Checkpoint {self.path} belongs to a different request; "
+                "remove it or choose another path"
+            )
+        self._truncate(int(state["records_offset"]))
+        return state
+
+    def begin(self, fingerprint: str, **fields: Any) -> dict[str, Any]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.records_path.write_bytes(b"")
+        state = {"fingerprint": fingerprint, "records_offset": 0, **fields}
+        self.save(state)
+        return state
+
+    def save(self, state: Mapping[str, Any]) -> None:
+        _atomic_write_bytes(
+            self.path, json.dumps(state, ensure_ascii=False).encode("utf-8")
+        )
+
+    def append(self, state: dict[str, Any], records: Iterable[Any]) -> None:
+        data = "".join(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in records
+        ).encode("utf-8")
+        with open(self.records_path, "ab") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        state["records_offset"] = int(state["records_offset"]) + len(data)
+
+    def replay(self, start: int, end: int) -> Iterator[Any]:
+        with open(self.records_path, "rb") as handle:
+            handle.seek(start)
+            while handle.tell() < end:
+                line = handle.readline()
+                if not line:
+                    break
+                yield json.loads(line)
+
+    def rewind(self, state: dict[str, Any], offset: int) -> None:
+        self._truncate(offset)
+        state["records_offset"] = offset
+
+    def _truncate(self, offset: int) -> None:
+        try:
+            size = self.records_path.stat().st_size
+        except FileNotFoundError:
+            size = -1
+        if size < offset:
+            raise ValueError(
+                f"Checkpoint records {self.records_path} are missing or shorter "
+                "than the saved state; remove the checkpoint and start again"
+            )
+        with open(self.records_path, "r+b") as handle:
+            handle.truncate(offset)
+
+
+def _fingerprint(value: Any) -> str:
+    canonical = json.dumps(
+        value, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+METRICS_FORMATS = ("json", "prometheus")
+LATENCY_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+TRACE_PHASES = ("connect", "ttfb", "download", "decode")
+
+
+class RunMetrics:
+    """Thread-safe totals of every request trace recorded during one run.
+
+    :meth:`summary` returns counts, bytes, retry reasons, sleep time split into
+    per-request backoff and rate-limit waits (``request``) and pauses between
+    search pages (``pause``), time per phase and latency percentiles.
+    :meth:`write` exports it as JSON or as a Prometheus textfile.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests: dict[tuple[str, str, str], int] = {}
+        self.errors: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+        self.bytes = {"request": 0, "wire": 0, "decoded": 0}
+        self.sleep = {"request": 0.0, "pause": 0.0}
+        self.phases = {phase: 0.0 for phase in TRACE_PHASES}
+        self.latencies: list[float] = []
+
+    def record(self, trace: Mapping[str, Any]) -> None:
+        key = (str(trace["method"]), str(trace["status"]), str(trace["cache"]))
+        timings = trace.get("timings") or {}
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.bytes["request"] += int(trace.get("request_bytes") or 0)
+            self.bytes["wire"] += int(trace.get("wire_bytes") or 0)
+            self.bytes["decoded"] += int(trace.get("decoded_bytes") or 0)
+            self._add_retries(trace.get("retries") or [], trace.get("sleep_seconds"))
+            for phase in TRACE_PHASES:
+                self.phases[phase] += float(timings.get(phase) or 0.0)
+            if trace["cache"] not in {"hit", "memo"} and "total" in timings:
+                self.latencies.append(float(timings["total"]))
+
+    def record_error(self, method: str, log: _RequestLog | None = None) -> None:
+        with self._lock:
+            self.errors[method] = self.errors.get(method, 0) + 1
+            if log is not None:
+                self._add_retries(log.retries, log.sleep_seconds)
+
+    def record_pause(self, seconds: float) -> None:
+        with self._lock:
+            self.sleep["pause"] += seconds
+
+    def _add_retries(self, retries: Iterable[Mapping[str, Any]], slept: Any) -> None:
+        for retry in retries:
+            reason = str(retry.get("reason"))
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+        self.sleep["request"] += float(slept or 0.0)
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            by_status: dict[str, int] = {}
+            by_cache: dict[str, int] = {}
+            for (_, status, cache), count in self.requests.items():
+                by_status[status] = by_status.get(status, 0) + count
+                by_cache[cache] = by_cache.get(cache, 0) + count
+            return {
+                "requests": sum(self.requests.values()),
+                "errors": sum(self.errors.values()),
+                "by_status": by_status,
+                "by_cache": by_cache,
+                "retries": dict(self.retries),
+                "bytes": dict(self.bytes),
+                "sleep_seconds": {
+                    key: round(value, 3) for key, value in self.sleep.items()
+                },
+                "phase_seconds": {
+                    key: round(value, 3) for key, value in self.phases.items()
+                },
+                "latency_seconds": {
+                    **{
+                        f"p{round(quantile * 100)}": _quantile(latencies, quantile)
+                        for quantile in LATENCY_QUANTILES
+                    },
+                    "max": latencies[-1] if latencies else None,
+                },
+                "elapsed_seconds": round(time.time() - self.started, 3),
+            }
+
+    def prometheus(self) -> str:
+        """Render the totals in the Prometheus text exposition format."""
+
+        summary = self.summary()
+        with self._lock:
+            requests = sorted(self.requests.items())
+            errors = sorted(self.errors.items())
+            latencies = sorted(self.latencies)
+        lines: list[str] = []
+
+        def metric(
+            name: str, kind: str, help_text: str, samples: Iterable[Any]
+        ) -> None:
+            lines.append(f"# HELP eduskunta_{name} {help_text}")
+            lines.append(f"# TYPE eduskunta_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{_prometheus_label(str(item))}"' for key, item in labels
+                )
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"eduskunta_{name}{suffix} {value}")
+
+        metric(
+            "requests_total",
+            "counter",
+            "Completed API requests.",
+            (
+                ((("method", method), ("status", status), ("cache", cache)), count)
+                for (method, status, cache), count in requests
+            ),
+        )
+        metric(
+            "request_errors_total",
+            "counter",
+            "API requests that failed after retries.",
+            (((("method", method),), count) for method, count in errors),
+        )
+        metric(
+            "retries_total",
+            "counter",
+            "Retried attempts by reason.",
+            (
+                ((("reason", reason),), count)
+                for reason, count in sorted(summary["retries"].items())
+            ),
+        )
+        metric(
+            "bytes_total",
+            "counter",
+            "Request and response bytes.",
+            (
+                ((("direction", direction),), count)
+                for direction, count in summary["bytes"].items()
+            ),
+        )
+        metric(
+            "sleep_seconds_total",
+            "counter",
+            "Time slept in backoff, rate limiting and page pauses.",
+            (
+                ((("kind", kind),), seconds)
+                for kind, seconds in summary["sleep_seconds"].items()
+            ),
+        )
+        metric(
+            "phase_seconds_total",
+            "counter",
+            "Time spent per request phase.",
+            (
+                ((("phase", phase),), seconds)
+                for phase, seconds in summary["phase_seconds"].items()
+            ),
+        )
+        metric(
+            "request_latency_seconds",
+            "summary",
+            "Request latency from first attempt to response, including sleeps.",
+            (
+                ((("quantile", str(quantile)),), _quantile(latencies, quantile))
+                for quantile in LATENCY_QUANTILES
+                if latencies
+            ),
+        )
+        lines.append(
+            f"eduskunta_request_latency_seconds_sum {round(sum(latencies), 6)}"
+        )
+        lines.append(f"eduskunta_request_latency_seconds_count {len(latencies)}")
+        metric(
+            "run_duration_seconds",
+            "gauge",
+            "Wall-clock duration of the run.",
+            [((), summary["elapsed_seconds"])],
+        )
+        metric(
+            "run_completed_timestamp_seconds",
+            "gauge",
+            "Unix time at which the run finished.",
+            [((), round(time.time(), 3))],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path, metrics_format: str | None = None) -> str:
+        """Write the metrics atomically and return the format used.
+
+        The format follows the file extension (``.prom`` for Prometheus)
+        unless ``metrics_format`` is given.
+        """
+
+        target = Path(path)
+        chosen = metrics_format or (
+            "prometheus" if target.suffix == ".prom" else "json"
+        )
+        if chosen not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format: {chosen}")
+        if chosen == "prometheus":
+            text = self.prometheus()
+        else:
+            text = json.dumps(self.summary(), ensure_ascii=False, indent=2) + "\n"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(target, text.encode("utf-8"))
+        return chosen
+
+
+def _quantile(ordered: Sequence[float], quantile: float) -> float | None:
+    """Nearest-rank quantile of an already sorted sequence."""
+
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * quantile // 1))
+    return ordered[int(rank) - 1]
+
+
+def _prometheus_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
 class EduskuntaClient:
     def __init__(
         self,
@@ -140,13 +1678,55 @@ class EduskuntaClient:
         backoff: float = 1.0,
         transport: Transport | None = None,
         sleeper: Callable[[float], None] = time.sleep,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        metrics: RunMetrics | None = None,
+        memo: ResponseMemo | None = None,
+        coalesce: bool = True,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.retries = retries
         self.backoff = backoff
-        self.transport = transport or _default_transport
+        self.transport = transport or PooledTransport()
         self.sleeper = sleeper
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.memo = memo
+        self.coalesce = coalesce
+        self._in_flight: dict[RequestKey, Future[tuple[HttpResponse, RequestTrace]]] = (
+            {}
+        )
+        self._in_flight_lock = threading.Lock()
+
+    def _sleep(self, delay: float, log: _RequestLog) -> None:
+        self.sleeper(delay)
+        log.slept(delay)
+
+    def _back_off(
+        self, method: str, status: int, delay: float, log: _RequestLog
+    ) -> None:
+        if status == 429 and self.rate_limiter is not None:
+            # The limiter makes every caller sharing the bucket wait, including
+            # this one on its next attempt.
+            self.rate_limiter.penalize(method, delay)
+            return
+        self._sleep(delay, log)
+
+    def _pause(
+        self, method: str, get_delay: float | None, post_delay: float | None
+    ) -> None:
+        """Wait between pages when no rate limiter paces the requests."""
+
+        delay = post_delay if method == "POST" else get_delay
+        if delay is None:
+            if self.rate_limiter is not None:
+                return
+            delay = 7.0 if method == "POST" else 1.1
+        self.sleeper(delay)
+        if self.metrics is not None:
+            self.metrics.record_pause(delay)
 
     def _request(
         self,
@@ -155,58 +1735,114 @@ class EduskuntaClient:
         *,
         payload: Mapping[str, Any] | None = None,
         accept: str = "application/json",
+        remember: bool = True,
     ) -> tuple[HttpResponse, RequestTrace]:
-        url = f"{self.base_url}{path}"
-        body = None
-        headers = {"Accept": accept, "User-Agent": USER_AGENT}
-        if payload is not None:
-            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(
-                "utf-8"
-            )
-            headers["Content-Type"] = "application/json"
-
+        """Send one request, sharing identical ones that are already running.
+
+        A request identical to one still in flight waits for that response
+        instead of sending its own; with a ``memo`` a repeated request is
+        answered from memory for the rest of the session unless ``remember``
+        is false, as for search pages and document bodies that are streamed.
+        """
+
+        key = _request_key(method, path, payload, accept)
+        memo = self.memo if remember else None
+        if memo is not None:
+            remembered = memo.get(key)
+            if remembered is not None:
+                return remembered
+        if not self.coalesce:
+            return self._fetch(key, method, path, payload, accept, memo)
+        with self._in_flight_lock:
+            leader = self._in_flight.get(key)
+            if leader is None:
+                future: Future[tuple[HttpResponse, RequestTrace]] = Future()
+                self._in_flight[key] = future
+        if leader is not None:
+            started = time.perf_counter()
+            response, trace = leader.result()
+            waited = time.perf_counter() - started
+            return response, _shared_trace(trace, "coalesced", waited)
+        try:
+            outcome = self._fetch(key, method, path, payload, accept, memo)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(outcome)
+            return outcome
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+
+    def _fetch(
+        self,
+        key: RequestKey,
+        method: str,
+        path: str,
+        payload: Mapping[str, Any] | None,
+        accept: str,
+        memo: ResponseMemo | None,
+    ) -> tuple[HttpResponse, RequestTrace]:
+        prepared, hit = _prepare_request(
+            self.base_url, self.cache, method, path, payload, accept
+        )
+        if hit is None:
+            log = _RequestLog()
+            try:
+                hit = self._attempts(prepared, log)
+            except ApiError:
+                if self.metrics is not None:
+                    self.metrics.record_error(method, log)
+                raise
+        if memo is not None:
+            memo.put(key, *hit)
+        return hit
+
+    def _attempts(
+        self, prepared: _PreparedRequest, log: _RequestLog
+    ) -> tuple[HttpResponse, RequestTrace]:
+        method, url = prepared.method, prepared.url
         last_error: Exception | None = None
         for attempt in range(1, self.retries + 2):
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.acquire(method)
+                if wait > 0:
+                    self._sleep(wait, log)
             try:
-                response = self.transport(method, url, body, headers, self.timeout)
-                if response.status in TRANSIENT_STATUS:
-                    delay = _retry_after_seconds(response.headers)
-                    if delay is None:
-                        delay = self.backoff * (2 ** (attempt - 1))
-                    if attempt <= self.retries:
-                        self.sleeper(delay)
-                        continue
-                    raise ApiError(
-                        f"Transient HTTP {response.status} persisted for {url}"
-                    )
-                if response.status < 200 or response.status >= 300:
-                    preview = response.body[:240].decode("utf-8", errors="replace")
-                    raise ApiError(
-                        f"HTTP {response.status} for {url}: {preview!r}"
-                    )
-                trace = RequestTrace(
-                    method=method,
-                    url=url,
-                    final_url=response.final_url,
-                    status=response.status,
-                    retrieved_at=utc_now(),
-                    attempt=attempt,
+                response = self.transport(
+                    method, url, prepared.body, prepared.headers, self.timeout
                 )
-                return response, trace
+                outcome = _settle_response(
+                    self.cache, prepared, response, attempt, log
+                )
+                if not isinstance(outcome, float):
+                    return outcome
+                delay = self.backoff * (2 ** (attempt - 1)) if outcome < 0 else outcome
+                if attempt <= self.retries:
+                    log.retry(attempt, f"HTTP {response.status}", delay)
+                    self._back_off(method, response.status, delay, log)
+                    continue
+                raise ApiError(f"Transient HTTP {response.status} persisted for {url}")
             except HTTPError as exc:
+                if exc.code == 304 and prepared.cached is not None:
+                    return _revalidated(self.cache, prepared, attempt, log)
                 response_body = exc.read() if exc.fp is not None else b""
                 if exc.code in TRANSIENT_STATUS and attempt <= self.retries:
                     delay = _retry_after_seconds(dict(exc.headers.items()))
                     if delay is None:
                         delay = self.backoff * (2 ** (attempt - 1))
-                    self.sleeper(delay)
+                    log.retry(attempt, f"HTTP {exc.code}", delay)
+                    self._back_off(method, exc.code, delay, log)
                     continue
                 preview = response_body[:240].decode("utf-8", errors="replace")
                 raise ApiError(f"HTTP {exc.code} for {url}: {preview!r}") from exc
             except (URLError, TimeoutError, OSError) as exc:
                 last_error = exc
                 if attempt <= self.retries:
-                    self.sleeper(self.backoff * (2 ** (attempt - 1)))
+                    delay = self.backoff * (2 ** (attempt - 1))
+                    log.retry(attempt, type(exc).__name__, delay, str(exc))
+                    self._sleep(delay, log)
                     continue
                 break
 
@@ -218,31 +1854,31 @@ class EduskuntaClient:
         path: str,
         *,
         payload: Mapping[str, Any] | None = None,
+        remember: bool = True,
     ) -> dict[str, Any]:
-        response, trace = self._request(method, path, payload=payload)
+        response, trace = self._request(
+            method, path, payload=payload, remember=remember
+        )
+        started = time.perf_counter()
+        data = _decode_json(response.body, trace.final_url)
         return {
-            "trace": asdict(trace),
+            "trace": _envelope_trace(
+                trace, time.perf_counter() - started, self.metrics
+            ),
             "request": payload,
-            "data": _decode_json(response.body, trace.final_url),
+            "data": data,
         }
 
     def _text(self, path: str, *, accept: str) -> dict[str, Any]:
-        response, trace = self._request("GET", path, accept=accept)
-        encoding = "utf-8"
-        content_type = next(
-            (
-                value
-                for key, value in response.headers.items()
-                if key.lower() == "content-type"
-            ),
-            "",
-        )
-        if "charset=" in content_type.lower():
-            encoding = content_type.lower().split("charset=", 1)[1].split(";", 1)[0]
+        response, trace = self._request("GET", path, accept=accept, remember=False)
+        started = time.perf_counter()
+        data = _decode_text(response)
         return {
-            "trace": asdict(trace),
+            "trace": _envelope_trace(
+                trace, time.perf_counter() - started, self.metrics
+            ),
             "request": None,
-            "data": response.body.decode(encoding, errors="replace"),
+            "data": data,
         }
 
     @staticmethod
@@ -251,20 +1887,171 @@ class EduskuntaClient:
             return requested.upper()
         compact = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
         query_length = len(urlencode({"q": compact}, safe=""))
-        return "GET" if query_length <= 900 else "POST"
+        return "GET" if query_length <= MAX_GET_QUERY else "POST"
 
     def search(
         self, payload: Mapping[str, Any], *, method: str = "auto"
+    ) -> dict[str, Any]:
+        return self._search(payload, method, remember=False)
+
+    def _search(
+        self, payload: Mapping[str, Any], method: str, *, remember: bool
     ) -> dict[str, Any]:
         chosen = self._search_method(payload, method)
         if chosen == "GET":
             compact = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
             path = "/search?" + urlencode({"q": compact})
-            return self._json("GET", path)
-        return self._json("POST", "/search", payload=payload)
+            return self._json("GET", path, remember=remember)
+        return self._json("POST", "/search", payload=payload, remember=remember)
+
+    def count(
+        self, payload: Mapping[str, Any], *, method: str = "post"
+    ) -> dict[str, Any]:
+        """Count matching records.
+
+        ``post`` calls ``/search/count``. ``get`` reads ``totalResultCount``
+        from a one-record ``GET /search`` page instead, which draws on the much
+        larger GET budget; ``auto`` does that whenever the query fits a URL.
+        """
+
+        probe = dict(payload)
+        probe.update(startFromIndex=0, maxResults=1)
+        if method == "post" or self._search_method(probe, method) == "POST":
+            return self._json("POST", "/search/count", payload=payload)
+        result = self._search(probe, "get", remember=True)
+        total = _count_value(result["data"])
+        return {"trace": result["trace"], "request": payload, "data": {"count": total}}
+
+    def count_matrix(
+        self,
+        payload: Mapping[str, Any],
+        axes: Sequence[CountAxis],
+        *,
+        method: str = "auto",
+        workers: int = 4,
+        check_total: bool = True,
+    ) -> dict[str, Any]:
+        """Count every combination of axis values concurrently.
+
+        ``data`` is a tidy table with one row per cell and ``trace["cells"]``
+        holds the matching per-cell traces. With ``check_total`` the cell sum is
+        compared with one count over the union of all axis values; the two only
+        agree when every record falls into exactly one cell.
+        """
+
+        if not axes:
+            raise ValueError("count_matrix needs at least one axis")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        base_payload = dict(payload)
+        base_payload.pop("startFromIndex", None)
+        base_payload.pop("maxResults", None)
+        cells = list(itertools.product(*(axis.values for axis in axes)))
+
+        def run(conditions: Sequence[Mapping[str, Any]]) -> dict[str, Any]:
+            return self.count(_with_conditions(base_payload, conditions), method=method)
+
+        jobs = [
+            [axis.condition(value) for axis, value in zip(axes, values)]
+            for values in cells
+        ]
+        if check_total:
+            jobs.append([axis.union() for axis in axes])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, jobs))
+
+        rows = []
+        for values, result in zip(cells, results):
+            row: dict[str, Any] = {
+                axis.property: value for axis, value in zip(axes, values)
+            }
+            row["count"] = _count_value(result["data"])
+            rows.append(row)
+        trace: dict[str, Any] = {
+            "retrieved_at": utc_now(),
+            "cells": [result["trace"] for result in results[: len(cells)]],
+        }
+        if check_total:
+            total = _count_value(results[-1]["data"])
+            cell_sum = sum(row["count"] for row in rows)
+            trace["total"] = results[-1]["trace"]
+            trace["total_check"] = {
+                "total_count": total,
+                "cell_sum": cell_sum,
+                "consistent": total == cell_sum,
+            }
+        return {
+            "trace": trace,
+            "request": {
+                "payload": base_payload,
+                "axes": [asdict(axis) for axis in axes],
+                "method": method,
+            },
+            "data": rows,
+        }
 
-    def count(self, payload: Mapping[str, Any]) -> dict[str, Any]:
-        return self._json("POST", "/search/count", payload=payload)
+    def lookup_ids(
+        self,
+        payload: Mapping[str, Any],
+        ids: Iterable[str],
+        *,
+        method: str = "auto",
+        workers: int = 4,
+    ) -> dict[str, Any]:
+        """Fetch the records of many ids through ``ids`` searches run at once.
+
+        ``payload`` names the category and may narrow it further. Repeated
+        ids are dropped, and the rest are split into chunks whose encoded
+        ``q`` stays within the GET limit, so a long list keeps to the larger
+        GET budget instead of falling back to POST. ``data["results"]``
+        follows the input order; ids without a record are listed in
+        ``data["missing"]`` and ``trace["chunks"]`` holds one search trace
+        per chunk.
+        """
+
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        wanted = list(dict.fromkeys(str(value) for value in ids))
+        if not wanted:
+            raise ValueError("lookup_ids needs at least one id")
+        base_payload = dict(payload)
+        base_payload.pop("startFromIndex", None)
+        base_payload.pop("maxResults", None)
+        chunks = _id_chunks(base_payload, wanted)
+
+        def run(chunk: list[str]) -> dict[str, Any]:
+            return self.search_all(
+                _with_conditions(base_payload, [{"ids": chunk}]),
+                method=method,
+                page_size=len(chunk),
+            )
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, chunks))
+
+        found: dict[str, Any] = {}
+        unkeyed = []
+        for result in results:
+            for record in result["data"]["results"]:
+                key = _record_id(record)
+                if key is None:
+                    unkeyed.append(record)
+                else:
+                    found.setdefault(key, record)
+        records = [found[key] for key in wanted if key in found] + unkeyed
+        return {
+            "trace": {
+                "retrieved_at": utc_now(),
+                "chunks": [result["trace"] for result in results],
+                "chunk_sizes": [len(chunk) for chunk in chunks],
+                "complete": all(result["trace"]["complete"] for result in results),
+            },
+            "request": _with_conditions(base_payload, [{"ids": wanted}]),
+            "data": {
+                "results": records,
+                "missing": [key for key in wanted if key not in found],
+            },
+        }
 
     def search_all(
         self,
@@ -273,70 +2060,301 @@ class EduskuntaClient:
         method: str = "auto",
         page_size: int = 1000,
         max_records: int = MAX_SEARCH_RESULTS,
-        get_delay: float = 1.1,
-        post_delay: float = 7.0,
+        get_delay: float | None = None,
+        post_delay: float | None = None,
+        partitions: Sequence[PartitionAxis] | None = None,
+        checkpoint: HarvestCheckpoint | None = None,
     ) -> dict[str, Any]:
+        trace: dict[str, Any] = {}
+        results = list(
+            self.iter_search(
+                payload,
+                method=method,
+                page_size=page_size,
+                max_records=max_records,
+                get_delay=get_delay,
+                post_delay=post_delay,
+                partitions=partitions,
+                trace=trace,
+                checkpoint=checkpoint,
+            )
+        )
+        total = trace.pop("totalResultCount")
+        return {
+            "trace": trace,
+            "request": _search_base(payload, page_size, max_records, bool(partitions)),
+            "data": {
+                "results": results,
+                "searchMetadata": {
+                    "totalResultCount": total,
+                    "actualResultCount": len(results),
+                    "startFromIndex": 0,
+                },
+            },
+        }
+
+    def iter_search(
+        self,
+        payload: Mapping[str, Any],
+        *,
+        method: str = "auto",
+        page_size: int = 1000,
+        max_records: int = MAX_SEARCH_RESULTS,
+        get_delay: float | None = None,
+        post_delay: float | None = None,
+        partitions: Sequence[PartitionAxis] | None = None,
+        pages: bool = False,
+        trace: dict[str, Any] | None = None,
+        checkpoint: HarvestCheckpoint | None = None,
+    ) -> Iterator[Any]:
+        """Yield search records, or page envelopes when ``pages`` is set.
+
+        Only the current page is held in memory. When ``trace`` is given it is
+        filled in as the harvest proceeds with the page traces, partition
+        counts, ``totalResultCount`` and the final ``complete`` flag.
+
+        With a ``checkpoint``, every page is persisted before it is yielded. A
+        later call with the same arguments first replays the stored records and
+        then continues from the next ``startFromIndex``. If the unfinished
+        part's ``totalResultCount`` has changed upstream, that part is fetched
+        again from the start and the change is listed in ``trace["resumed"]``.
+        """
+
         if page_size < 1 or page_size > MAX_SEARCH_RESULTS:
             raise ValueError("page_size must be between 1 and 10000")
         if max_records < 1 or max_records > MAX_SEARCH_RESULTS:
             raise ValueError("max_records must be between 1 and 10000")
-
-        base_payload = dict(payload)
-        base_payload.pop("startFromIndex", None)
-        base_payload["maxResults"] = min(page_size, max_records)
-        results: list[Any] = []
-        traces: list[dict[str, Any]] = []
+        if checkpoint is not None and pages:
+            raise ValueError("pages cannot be combined with a checkpoint")
+        trace = {} if trace is None else trace
+        base_payload = _search_base(payload, page_size, max_records, bool(partitions))
+        fingerprint = _fingerprint(
+            {
+                "payload": base_payload,
+                "partitions": [asdict(axis) for axis in partitions or ()],
+                "method": method,
+                "page_size": page_size,
+                "max_records": max_records,
+            }
+        )
+        state = checkpoint.load(fingerprint) if checkpoint is not None else None
+        if state is not None:
+            trace.update(
+                retrieved_at=utc_now(),
+                pages=state["pages"],
+                complete=False,
+                resumed={"changes": []},
+            )
+            if partitions:
+                trace["counts"] = state["counts"]
+                trace["partitions"] = state["partitions"]
+            total: int | None = state["total"]
+            leaves = [(conditions, matched) for conditions, matched in state["leaves"]]
+        else:
+            trace.update(retrieved_at=utc_now(), pages=[], complete=False)
+            if partitions:
+                trace["counts"] = []
+                trace["partitions"] = []
+                total, leaves = self._plan_partitions(
+                    base_payload,
+                    partitions,
+                    max_records=max_records,
+                    get_delay=get_delay,
+                    post_delay=post_delay,
+                    count_traces=trace["counts"],
+                )
+            else:
+                total, leaves = None, [([], -1)]
+            if checkpoint is not None:
+                state = checkpoint.begin(
+                    fingerprint,
+                    total=total,
+                    leaves=leaves,
+                    counts=trace.get("counts", []),
+                    partitions=trace.get("partitions", []),
+                    pages=trace["pages"],
+                    leaf=0,
+                    leaf_total=None,
+                    leaf_offset=0,
+                    leaf_fetched=0,
+                    written=0,
+                )
+        page_traces: list[dict[str, Any]] = trace["pages"]
+
+        yielded = 0
+        first_leaf = 0
+        if state is not None and checkpoint is not None:
+            first_leaf = int(state["leaf"])
+            yielded = int(state["written"]) - int(state["leaf_fetched"])
+            yield from checkpoint.replay(0, int(state["leaf_offset"]))
+        for leaf_index in range(first_leaf, len(leaves)):
+            conditions, matched = leaves[leaf_index]
+            start = fetched = 0
+            resuming = False
+            if state is not None and leaf_index == first_leaf:
+                start = fetched = int(state["leaf_fetched"])
+                resuming = start > 0
+            while matched:
+                if page_traces and not resuming:
+                    self._pause(page_traces[-1]["method"], get_delay, post_delay)
+                leaf_payload = _with_conditions(base_payload, conditions)
+                leaf_payload["maxResults"] = min(page_size, max_records)
+                restart = False
+                for page, leaf_total in self._iter_pages(
+                    leaf_payload,
+                    method=method,
+                    max_records=max_records,
+                    get_delay=get_delay,
+                    post_delay=post_delay,
+                    traces=page_traces,
+                    start=start,
+                ):
+                    trace["retrieved_at"] = page["trace"]["retrieved_at"]
+                    if total is None:
+                        total = leaf_total
+                    if resuming and state is not None and checkpoint is not None:
+                        resuming = False
+                        if leaf_total != state["leaf_total"]:
+                            trace["resumed"]["changes"].append(
+                                {
+                                    "conditions": conditions,
+                                    "previous": state["leaf_total"],
+                                    "current": leaf_total,
+                                }
+                            )
+                            checkpoint.rewind(state, int(state["leaf_offset"]))
+                            state["written"] = yielded
+                            if not partitions:
+                                total = leaf_total
+                            start = fetched = 0
+                            restart = True
+                            break
+                        yield from checkpoint.replay(
+                            int(state["leaf_offset"]), int(state["records_offset"])
+                        )
+                    page_results = page["data"]["results"]
+                    fetched += len(page_results)
+                    if state is not None and checkpoint is not None:
+                        checkpoint.append(state, page_results)
+                        state.update(
+                            leaf_total=leaf_total,
+                            leaf_fetched=fetched,
+                            written=yielded + fetched,
+                            pages=page_traces,
+                            total=total,
+                        )
+                        checkpoint.save(state)
+                    if pages:
+                        yield page
+                    else:
+                        yield from page_results
+                if not restart:
+                    break
+            yielded += fetched
+            if partitions:
+                trace["partitions"].append(
+                    {"conditions": conditions, "count": matched, "fetched": fetched}
+                )
+            if state is not None and checkpoint is not None:
+                state.update(
+                    leaf=leaf_index + 1,
+                    leaf_total=None,
+                    leaf_offset=state["records_offset"],
+                    leaf_fetched=0,
+                    written=yielded,
+                    partitions=trace.get("partitions", []),
+                )
+                checkpoint.save(state)
+
+        total = total or 0
+        trace["totalResultCount"] = total
+        consistent = True
+        if partitions:
+            leaf_sum = sum(matched for _, matched in leaves)
+            consistent = leaf_sum == total
+            trace["partition_check"] = {
+                "parent_count": total,
+                "partition_count_sum": leaf_sum,
+                "consistent": consistent,
+            }
+        trace["complete"] = consistent and yielded >= total
+
+    def _iter_pages(
+        self,
+        base_payload: Mapping[str, Any],
+        *,
+        method: str,
+        max_records: int,
+        get_delay: float | None,
+        post_delay: float | None,
+        traces: list[dict[str, Any]],
+        start: int = 0,
+    ) -> Iterator[tuple[dict[str, Any], int]]:
         total: int | None = None
-        start = 0
 
         while True:
             page_payload = dict(base_payload)
             page_payload["startFromIndex"] = start
             page = self.search(page_payload, method=method)
             traces.append(page["trace"])
-            data = page["data"]
-            if not isinstance(data, dict):
-                raise ApiError("Search response was not a JSON object")
-            page_results = data.get("results")
-            metadata = data.get("searchMetadata") or {}
-            if not isinstance(page_results, list):
-                raise ApiError("Search response did not contain a results list")
+            page_results, page_total = _search_page(page["data"], max_records)
             if total is None:
-                raw_total = metadata.get("totalResultCount")
-                total = int(raw_total) if raw_total is not None else len(page_results)
-                if total > MAX_SEARCH_RESULTS:
-                    raise SearchLimitError(
-                        f"Query matches {total} results; split it into non-overlapping "
-                        "partitions such as years or sessions"
-                    )
-                if total > max_records:
-                    raise SearchLimitError(
-                        f"Query matches {total} results, above max_records={max_records}"
-                    )
-            results.extend(page_results)
+                total = page_total
+            yield page, total
             actual = len(page_results)
             start += actual
             if actual == 0 or start >= total:
                 break
-            selected_method = traces[-1]["method"]
-            self.sleeper(post_delay if selected_method == "POST" else get_delay)
+            self._pause(traces[-1]["method"], get_delay, post_delay)
 
-        return {
-            "trace": {
-                "retrieved_at": traces[-1]["retrieved_at"] if traces else utc_now(),
-                "pages": traces,
-                "complete": total is not None and len(results) >= total,
-            },
-            "request": base_payload,
-            "data": {
-                "results": results,
-                "searchMetadata": {
-                    "totalResultCount": total or 0,
-                    "actualResultCount": len(results),
-                    "startFromIndex": 0,
-                },
-            },
-        }
+    def _plan_partitions(
+        self,
+        base_payload: Mapping[str, Any],
+        axes: Sequence[PartitionAxis],
+        *,
+        max_records: int,
+        get_delay: float | None,
+        post_delay: float | None,
+        count_traces: list[dict[str, Any]],
+    ) -> tuple[int, list[tuple[list[dict[str, Any]], int]]]:
+        """Split a search with /search/count until every part fits max_records."""
+
+        def count(conditions: Sequence[Mapping[str, Any]]) -> int:
+            if count_traces:
+                self._pause("POST", get_delay, post_delay)
+            result = self.count(_with_conditions(base_payload, conditions))
+            count_traces.append(result["trace"])
+            return _count_value(result["data"])
+
+        parent_count = count(())
+        leaves: list[tuple[list[dict[str, Any]], int]] = []
+
+        def split(
+            axis_index: int,
+            fixed: list[dict[str, Any]],
+            bounds: tuple[Any, Any] | None,
+            matched: int,
+        ) -> None:
+            own = [] if bounds is None else [axes[axis_index].condition(*bounds)]
+            if matched <= max_records:
+                leaves.append((fixed + own, matched))
+                return
+            if axis_index >= len(axes):
+                raise SearchLimitError(
+                    f"Partition {json.dumps(fixed, ensure_ascii=False)} still matches "
+                    f"{matched} results; add a finer partition axis"
+                )
+            axis = axes[axis_index]
+            low, high = bounds if bounds is not None else axis.bounds()
+            parts = axis.parts(low, high)
+            if parts is None:
+                split(axis_index + 1, fixed + own, None, matched)
+                return
+            for part in parts:
+                split(axis_index, fixed, part, count(fixed + [axis.condition(*part)]))
+
+        split(0, [], None, parent_count)
+        return parent_count, leaves
 
     def matter(self, identifier: str) -> dict[str, Any]:
         return self._json(
@@ -399,25 +2417,109 @@ class EduskuntaClient:
         )
 
     def reference(self, name: str) -> dict[str, Any]:
-        allowed = {
-            "asiakirjatyypit",
-            "asiatyypit",
-            "eduskuntaryhmat",
-            "kansanedustajat",
-            "puheenvuorotyypit",
-            "sukupuolet",
-            "vaalikaudet",
-            "vaalipiirit",
-            "valiokunnat",
-            "valtiopaivat",
-        }
-        if name not in allowed:
+        if name not in REFERENCE_NAMES:
             raise ValueError(f"Unknown reference-data name: {name}")
         return self._json("GET", f"/reference-data/{name}")
 
     def aggregate(self, payload: Mapping[str, Any]) -> dict[str, Any]:
         return self._json("POST", "/aggregations/unique-by", payload=payload)
 
+    def batch(
+        self,
+        kind: str,
+        identifiers: Iterable[str],
+        *,
+        workers: int = 4,
+        ordered: bool = False,
+        checkpoint: HarvestCheckpoint | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Fetch many identifiers of one kind through a bounded thread pool.
+
+        Items are yielded as they complete, or in input order when ``ordered``
+        is set. A failing identifier yields an item with an ``error`` field and
+        does not stop the others. With a ``checkpoint``, successful items are
+        persisted; a re-run with the same identifiers replays them in their
+        input position and fetches only the rest, including the identifiers
+        that failed before.
+
+        Arguments and the checkpoint are checked before this returns, so a
+        bad call fails before the caller starts writing output.
+        """
+
+        if kind not in BATCH_METHODS:
+            raise ValueError(f"Unknown batch kind: {kind}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        done: dict[str, dict[str, Any]] = {}
+        state: dict[str, Any] | None = None
+        if checkpoint is not None:
+            identifiers = list(identifiers)
+            fingerprint = _fingerprint({"batch": kind, "identifiers": identifiers})
+            state = checkpoint.load(fingerprint) or checkpoint.begin(fingerprint)
+            wanted = set(identifiers)
+            for item in checkpoint.replay(0, int(state["records_offset"])):
+                if item["identifier"] in wanted:
+                    done.setdefault(item["identifier"], item)
+        fetch = getattr(self, BATCH_METHODS[kind])
+        return self._batch(
+            fetch, identifiers, workers, ordered, checkpoint, state, done
+        )
+
+    def _batch(
+        self,
+        fetch: Callable[[str], dict[str, Any]],
+        identifiers: Iterable[str],
+        workers: int,
+        ordered: bool,
+        checkpoint: HarvestCheckpoint | None,
+        state: dict[str, Any] | None,
+        done: Mapping[str, dict[str, Any]],
+    ) -> Iterator[dict[str, Any]]:
+        def run(index: int, identifier: str) -> dict[str, Any]:
+            try:
+                return {"index": index, "identifier": identifier, **fetch(identifier)}
+            except (ApiError, ValueError, OSError) as exc:
+                return {"index": index, "identifier": identifier, "error": str(exc)}
+
+        def persisted(items: Iterator[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+            for item in items:
+                if (
+                    checkpoint is not None
+                    and state is not None
+                    and "error" not in item
+                    and item["identifier"] not in done
+                ):
+                    checkpoint.append(state, [item])
+                    checkpoint.save(state)
+                yield item
+
+        window = workers * 2
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: deque[Future[dict[str, Any]]] = deque()
+            for index, identifier in enumerate(identifiers):
+                if identifier in done:
+                    replayed: Future[dict[str, Any]] = Future()
+                    replayed.set_result({**done[identifier], "index": index})
+                    pending.append(replayed)
+                else:
+                    pending.append(pool.submit(run, index, identifier))
+                if len(pending) >= window:
+                    yield from persisted(_drain(pending, ordered, until=window - 1))
+            yield from persisted(_drain(pending, ordered, until=0))
+
+
+def _drain(
+    pending: deque[Future[dict[str, Any]]], ordered: bool, *, until: int
+) -> Iterator[dict[str, Any]]:
+    while len(pending) > until:
+        if ordered:
+            yield pending.popleft().result()
+            continue
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in [item for item in pending if item in done]:
+            pending.remove(future)
+            yield future.result()
+
 
 class BlockHTMLParser(HTMLParser):
     BLOCK_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "td", "th"}
@@ -458,11 +2560,224 @@ class BlockHTMLParser(HTMLParser):
             self._parts.append(data)
 
 
+_SPACE = r"[ \t\n\r\f]"
+_TAG_NAME = r"[a-zA-Z][-.a-zA-Z0-9:_]*"
+# Well-formed markup only; anything else is left to BlockHTMLParser.
+_FAST_MARKUP = re.compile(
+    rf"""<(?:
+        (?P<start>{_TAG_NAME})
+        (?:{_SPACE}+[a-zA-Z_:][-.a-zA-Z0-9_:]*
+            (?:{_SPACE}*={_SPACE}*(?:"[^"]*"|'[^']*'|[^\s"'=<>`]+))?)*
+        {_SPACE}*(?P<empty>/?)>
+      | /(?P<end>{_TAG_NAME}){_SPACE}*>
+      | !--(?!-?>)(?:(?!--).)*-->
+      | ![dD][oO][cC][tT][yY][pP][eE][^>]*>
+      | \?[^>]*>
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+_CDATA_TAGS = frozenset(HTMLParser.CDATA_CONTENT_ELEMENTS)
+_RCDATA_TAGS = frozenset(getattr(HTMLParser, "RCDATA_CONTENT_ELEMENTS", ())) | {
+    "plaintext"
+}
+_RAW_TEXT_TAGS = _CDATA_TAGS | _RCDATA_TAGS
+_MARKUP_OPENERS = frozenset("/!?abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+
+class StreamingBlockExtractor:
+    """Incremental twin of :class:`BlockHTMLParser` fed with HTML chunks.
+
+    :meth:`feed` returns the blocks completed so far and :meth:`close` the
+    rest, with the same ``{index, tag, text}`` output as the parser. Tags are
+    matched with one regular expression each; the first construct the fast
+    path does not recognise hands the remaining input to a
+    :class:`BlockHTMLParser` carrying the same state, so malformed markup is
+    still handled exactly like the parser would.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._count = 0
+        self._ready: list[dict[str, Any]] = []
+        self._active_tag: str | None = None
+        self._parts: list[str] = []
+        self._skip_depth = 0
+        self._closers: dict[str, tuple[re.Pattern[str], re.Pattern[str]]] = {}
+        self._fallback: BlockHTMLParser | None = None
+
+    @property
+    def fell_back(self) -> bool:
+        return self._fallback is not None
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        if self._fallback is not None:
+            self._fallback.feed(chunk)
+        else:
+            self._buffer += chunk
+            self._scan(final=False)
+        return self._take()
+
+    def close(self) -> list[dict[str, Any]]:
+        if self._fallback is None:
+            self._scan(final=True)
+        if self._fallback is not None:
+            self._fallback.close()
+        return self._take()
+
+    def _take(self) -> list[dict[str, Any]]:
+        blocks, self._ready = self._ready, []
+        if self._fallback is not None and self._fallback.blocks:
+            for block in self._fallback.blocks:
+                block["index"] = self._count
+                self._count += 1
+                blocks.append(block)
+            self._fallback.blocks = []
+        return blocks
+
+    def _start(self, tag: str) -> None:
+        if tag in BlockHTMLParser.SKIP_TAGS:
+            self._skip_depth += 1
+        elif (
+            self._skip_depth == 0
+            and self._active_tag is None
+            and tag in BlockHTMLParser.BLOCK_TAGS
+        ):
+            self._active_tag = tag
+            self._parts = []
+
+    def _end(self, tag: str) -> None:
+        if tag in BlockHTMLParser.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif self._skip_depth == 0 and tag == self._active_tag:
+            text = " ".join("".join(self._parts).split())
+            if text:
+                self._ready.append({"index": self._count, "tag": tag, "text": text})
+                self._count += 1
+            self._active_tag = None
+            self._parts = []
+
+    def _scan(self, final: bool) -> None:
+        buffer = self._buffer
+        size = len(buffer)
+        position = 0
+        fast_match = _FAST_MARKUP.match
+        marked_tags = BlockHTMLParser.BLOCK_TAGS | BlockHTMLParser.SKIP_TAGS
+        skip_tags = BlockHTMLParser.SKIP_TAGS
+        while position < size:
+            start = buffer.find("<", position)
+            if start < 0:
+                if not final:
+                    break
+                start = size
+            if start > position and self._active_tag and not self._skip_depth:
+                text = buffer[position:start]
+                self._parts.append(unescape(text) if "&" in text else text)
+            position = start
+            if start == size:
+                break
+            match = fast_match(buffer, start)
+            if match is None:
+                following = buffer[start + 1 : start + 2]
+                if following and following not in _MARKUP_OPENERS:
+                    # A lone "<" is text, as in HTMLParser.
+                    if self._active_tag and not self._skip_depth:
+                        self._parts.append("<")
+                    position = start + 1
+                    continue
+                if not final and (
+                    buffer.find("-->", start + 4) < 0
+                    if buffer.startswith("<!--", start)
+                    else buffer.find("<", start + 1) < 0
+                ):
+                    break  # wait for the rest of the markup
+                self._fall_back(buffer[start:])
+                return
+            tag, empty, end_tag = match.groups()
+            position = match.end()
+            if tag is None:
+                if end_tag is not None:
+                    end_tag = end_tag.lower()
+                    if end_tag == self._active_tag or end_tag in skip_tags:
+                        self._end(end_tag)
+                continue
+            tag = tag.lower()
+            if tag not in _RAW_TEXT_TAGS:
+                if tag in marked_tags:
+                    self._start(tag)
+                    if empty:
+                        self._end(tag)
+                continue
+            if tag in _RCDATA_TAGS or empty:
+                self._fall_back(buffer[start:])
+                return
+            closing = self._closing_tag(buffer, tag, position, final)
+            if closing is None:
+                position = start
+                break
+            if not closing:
+                self._fall_back(buffer[start:])
+                return
+            self._start(tag)
+            if self._active_tag and not self._skip_depth:
+                self._parts.append(buffer[position : closing.start()])
+            self._end(tag)
+            position = closing.end()
+        self._buffer = buffer[position:]
+
+    def _closing_tag(
+        self, buffer: str, tag: str, start: int, final: bool
+    ) -> re.Match[str] | None | bool:
+        """Find the ``</tag>`` ending a script or style element's raw text.
+
+        Returns ``None`` while the closing tag may still be on its way and
+        ``False`` when it is not in the plain form handled here.
+        """
+
+        closers = self._closers.get(tag)
+        if closers is None:
+            closers = self._closers[tag] = (
+                re.compile(rf"</\s*{tag}", re.IGNORECASE),
+                re.compile(rf"</{tag}{_SPACE}*>", re.IGNORECASE),
+            )
+        loose, plain = closers
+        found = loose.search(buffer, start)
+        if found is None:
+            return False if final else None
+        closing = plain.match(buffer, found.start())
+        if closing is not None:
+            return closing
+        if not final and buffer.find(">", found.end()) < 0:
+            return None
+        return False
+
+    def _fall_back(self, rest: str) -> None:
+        parser = BlockHTMLParser()
+        parser._active_tag = self._active_tag
+        parser._parts = self._parts
+        parser._skip_depth = self._skip_depth
+        self._fallback = parser
+        self._buffer = ""
+        parser.feed(rest)
+
+
+def iter_html_blocks(
+    chunks: Iterable[str | bytes], *, encoding: str = "utf-8"
+) -> Iterator[dict[str, Any]]:
+    """Yield text blocks while HTML chunks arrive; bytes are decoded on the fly."""
+
+    extractor = StreamingBlockExtractor()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        yield from extractor.feed(chunk)
+    yield from extractor.feed(decoder.decode(b"", final=True))
+    yield from extractor.close()
+
+
 def extract_html_blocks(html: str) -> list[dict[str, Any]]:
-    parser = BlockHTMLParser()
-    parser.feed(html)
-    parser.close()
-    return parser.blocks
+    extractor = StreamingBlockExtractor()
+    return extractor.feed(html) + extractor.close()
 
 
 def _read_payload(path: str) -> dict[str, Any]:
@@ -473,6 +2788,29 @@ def _read_payload(path: str) -> dict[str, Any]:
     return value
 
 
+def _read_identifiers(path: str) -> Iterator[str]:
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in handle:
+            identifier = line.strip()
+            if identifier:
+                yield identifier
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def _write_lines(records: Iterable[Any], output: str | None) -> None:
+    handle = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            handle.flush()
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+
+
 def _write_result(result: Any, output: str | None) -> None:
     text = json.dumps(result, ensure_ascii=False, indent=2) + "\n"
     if output:
@@ -481,12 +2819,54 @@ def _write_result(result: Any, output: str | None) -> None:
         sys.stdout.write(text)
 
 
-def _client_from_args(args: argparse.Namespace) -> EduskuntaClient:
+def _rate_limiter_from_args(args: argparse.Namespace) -> RateLimiter | None:
+    """Pick the limiter: none to pace a replay, a per-host state file otherwise.
+
+    Runs against another base URL, such as a local stand-in server, keep their
+    own default state file so they neither wait on nor drain the buckets that
+    live-API jobs on this host share.
+    """
+
+    if args.fixed_delays:
+        return None
+    if args.replay:
+        return RateLimiter(buckets={})
+    state = args.rate_state
+    if state is None:
+        state = DEFAULT_RATE_STATE
+        if args.base_url.rstrip("/") != DEFAULT_BASE_URL:
+            netloc = urlparse(args.base_url).netloc or "local"
+            host = re.sub(r"[^A-Za-z0-9.-]", "_", netloc)
+            state = state.with_name(f"{state.stem}-{host}{state.suffix}")
+    return RateLimiter(state)
+
+
+def _client_from_args(
+    args: argparse.Namespace, metrics: RunMetrics | None = None
+) -> EduskuntaClient:
+    cache = None
+    if args.cache_dir:
+        cache = ResponseCache(
+            args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024)
+        )
+    transport: Transport | None = None
+    if args.record or args.replay:
+        from eduskunta_replay import RecordingTransport, ReplayTransport
+
+        if args.replay:
+            transport = ReplayTransport(args.replay)
+        else:
+            transport = RecordingTransport(args.record, PooledTransport())
     return EduskuntaClient(
         args.base_url,
         timeout=args.timeout,
         retries=args.retries,
         backoff=args.backoff,
+        transport=transport,
+        cache=cache,
+        rate_limiter=_rate_limiter_from_args(args),
+        metrics=metrics,
+        memo=ResponseMemo(max_entries=args.memo_size) if args.memo_size > 0 else None,
     )
 
 
@@ -497,18 +2877,102 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--retries", type=int, default=4)
     parser.add_argument("--backoff", type=float, default=1.0)
     parser.add_argument("--output", help="Write UTF-8 JSON to this path")
+    parser.add_argument(
+        "--cache-dir", help="Reuse and store responses in this directory"
+    )
+    parser.add_argument("--cache-max-mb", type=float, default=256.0)
+    parser.add_argument(
+        "--memo-size",
+        type=int,
+        default=0,
+        help="Answer up to this many repeated requests of this run from memory "
+        "(search pages and document bodies excepted); 0 disables",
+    )
+    parser.add_argument(
+        "--rate-state",
+        help="Token-bucket state file shared by concurrent runs on this host; "
+        "by default one per API host",
+    )
+    parser.add_argument(
+        "--fixed-delays",
+        action="store_true",
+        help="Sleep 1.1 s after GET and 7 s after POST pages instead",
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Write a run summary of all requests here (.prom for Prometheus)",
+    )
+    parser.add_argument("--metrics-format", choices=METRICS_FORMATS)
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument(
+        "--record", help="Append every HTTP exchange to this NDJSON cassette"
+    )
+    recording.add_argument(
+        "--replay", help="Answer from this cassette instead of the network"
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
     search = sub.add_parser("search", help="Run a search request")
     search.add_argument("--payload", required=True, help="JSON file or - for stdin")
     search.add_argument("--method", choices=("auto", "get", "post"), default="auto")
     search.add_argument("--all", action="store_true", help="Fetch every result page")
+    search.add_argument(
+        "--checkpoint",
+        help="With --all, persist progress here and resume from it when re-run",
+    )
+    search.add_argument(
+        "--stream",
+        action="store_true",
+        help="With --all, write one NDJSON record per line and a final trailer",
+    )
     search.add_argument("--page-size", type=int, default=1000)
     search.add_argument("--max-records", type=int, default=MAX_SEARCH_RESULTS)
+    search.add_argument(
+        "--partition",
+        action="append",
+        default=[],
+        metavar="PROPERTY[:KIND]=START:END",
+        help=(
+            "With --all, split the search by /search/count until every part fits; "
+            "repeat for finer axes, e.g. valtiopaivavuosi=2024:2025 "
+            "taysistuntonumero=1:200 (END is exclusive)"
+        ),
+    )
 
     count = sub.add_parser("count", help="Count results without fetching them")
     count.add_argument("--payload", required=True, help="JSON file or - for stdin")
 
+    count_matrix = sub.add_parser(
+        "count-matrix", help="Count every combination of axis values concurrently"
+    )
+    count_matrix.add_argument(
+        "--payload", required=True, help="Base JSON file or - for stdin"
+    )
+    count_matrix.add_argument(
+        "--axis",
+        action="append",
+        required=True,
+        metavar="PROPERTY=A,B,C|START:END",
+        help=(
+            "Matched values of one dimension; repeat for more, e.g. "
+            "valtiopaivavuosi.fi=2013:2026 asiakirjatyyppikoodi.fi=HE,LA,KAA "
+            "(END is exclusive)"
+        ),
+    )
+    count_matrix.add_argument(
+        "--method",
+        choices=("auto", "get", "post"),
+        default="auto",
+        help="get/auto count through one-record GET /search pages; post uses "
+        "/search/count",
+    )
+    count_matrix.add_argument("--workers", type=int, default=4)
+    count_matrix.add_argument(
+        "--no-total-check",
+        action="store_true",
+        help="Skip comparing the cell sum with a count over all axis values",
+    )
+
     aggregate = sub.add_parser("aggregate", help="Run a unique-by aggregation")
     aggregate.add_argument("--payload", required=True, help="JSON file or - for stdin")
 
@@ -528,12 +2992,228 @@ def build_parser() -> argparse.ArgumentParser:
         item = sub.add_parser(command, help=help_text)
         item.add_argument("identifier")
 
+    document_texts = sub.add_parser(
+        "document-texts",
+        help="Fetch and extract many documents' text blocks, streaming NDJSON",
+    )
+    document_texts.add_argument(
+        "--input", help="File with one edktunnus per line, or - for stdin"
+    )
+    document_texts.add_argument(
+        "--matter", help="Take the edktunnus values of this matter's documents"
+    )
+    document_texts.add_argument("--fetch-workers", type=int, default=4)
+    document_texts.add_argument(
+        "--parse-workers",
+        type=int,
+        help="HTML parsing processes; default one per CPU, 0 parses in threads",
+    )
+    document_texts.add_argument(
+        "--ordered", action="store_true", help="Emit documents in input order"
+    )
+
+    bundle = sub.add_parser(
+        "matter-bundle",
+        help="Fetch a matter with its documents, votes and record items at once",
+    )
+    bundle.add_argument("identifier")
+    bundle.add_argument(
+        "--html", action="store_true", help="Also extract every document's text"
+    )
+    bundle.add_argument(
+        "--record-item",
+        action="append",
+        help="Plenary record item to fetch instead of the matter's own; repeatable",
+    )
+    bundle.add_argument("--workers", type=int, default=6)
+
+    batch = sub.add_parser(
+        "batch", help="Fetch many identifiers concurrently and stream NDJSON"
+    )
+    batch.add_argument("kind", choices=sorted(BATCH_METHODS))
+    batch.add_argument(
+        "--input", default="-", help="File with one identifier per line, or - for stdin"
+    )
+    batch.add_argument("--workers", type=int, default=4)
+    batch.add_argument(
+        "--ordered", action="store_true", help="Emit results in input order"
+    )
+    batch.add_argument(
+        "--checkpoint", help="Persist progress here and resume from it when re-run"
+    )
+
+    lookup_ids = sub.add_parser(
+        "lookup-ids", help="Fetch records by id in GET-sized concurrent chunks"
+    )
+    lookup_ids.add_argument(
+        "--payload", required=True, help="JSON file naming the category, or - for stdin"
+    )
+    lookup_ids.add_argument(
+        "--input", default="-", help="File with one id per line, or - for stdin"
+    )
+    lookup_ids.add_argument("--method", choices=("auto", "get", "post"), default="auto")
+    lookup_ids.add_argument("--workers", type=int, default=4)
+
+    harvest = sub.add_parser(
+        "harvest-matters", help="Harvest matters into a CSV or Parquet table"
+    )
+    harvest.add_argument(
+        "--years",
+        required=True,
+        metavar="START:END",
+        help="valtiopaivavuosi range, END exclusive",
+    )
+    harvest.add_argument("--types", help="Comma-separated asiakirjatyyppikoodi values")
+    harvest.add_argument("--payload", help="JSON file with extra search filters")
+    harvest.add_argument("--method", choices=("auto", "get", "post"), default="auto")
+    harvest.add_argument("--table", required=True, help="Output .csv or .parquet path")
+    harvest.add_argument(
+        "--format", choices=("csv", "parquet"), help="Override the extension"
+    )
+    harvest.add_argument(
+        "--reference-snapshot",
+        help="Take type names from this reference-snapshot file instead of the API",
+    )
+
+    speeches = sub.add_parser(
+        "harvest-speeches",
+        help="Stream a valtiopaivavuosi's speeches, fetched per plenary session",
+    )
+    speeches.add_argument("--year", type=int, required=True, help="valtiopaivavuosi")
+    speeches.add_argument(
+        "--speaker",
+        action="append",
+        default=[],
+        help="Only this henkilonro; repeatable",
+    )
+    speeches.add_argument(
+        "--type",
+        action="append",
+        default=[],
+        help="Only this puheenvuorotyyppikoodi, e.g. T; repeatable",
+    )
+    speeches.add_argument(
+        "--sessions",
+        metavar="START:END",
+        help="taysistuntonumero range, END exclusive; found from counts if omitted",
+    )
+    speeches.add_argument("--payload", help="JSON file with extra search filters")
+    speeches.add_argument("--method", choices=("auto", "get", "post"), default="auto")
+    speeches.add_argument("--workers", type=int, default=4)
+    speeches.add_argument(
+        "--ordered", action="store_true", help="Emit sessions in number order"
+    )
+
+    sync = sub.add_parser(
+        "sync",
+        help="Add a search category's records dated since the last run, less a "
+        "lookback, to a SQLite store; older records are not re-checked",
+    )
+    sync.add_argument("category", choices=("aanestys", "puheenvuoro", "valtiopaivaasia"))
+    sync.add_argument("--store", required=True, help="SQLite database path")
+    sync.add_argument("--since", help="First day (YYYY-MM-DD) for the initial sync")
+    sync.add_argument(
+        "--lookback-days",
+        type=int,
+        default=1,
+        help="Days before the stored mark to fetch again for late or edited records",
+    )
+    sync.add_argument("--date-property", help="Override the high-water date field")
+    sync.add_argument("--payload", help="JSON file with extra search filters")
+
+    ingest = sub.add_parser(
+        "ingest", help="Normalise saved envelopes into a SQLite store"
+    )
+    ingest.add_argument("--store", required=True, help="SQLite database path")
+    ingest.add_argument("files", nargs="+", help="JSON or NDJSON envelope files")
+    ingest.add_argument(
+        "--category",
+        choices=("aanestys", "puheenvuoro", "valtiopaivaasia"),
+        help="Category of streamed records whose trailer does not name one",
+    )
+
+    query = sub.add_parser("query", help="Answer from a SQLite store without the API")
+    query.add_argument("--store", required=True, help="SQLite database path")
+    query.add_argument(
+        "name",
+        nargs="?",
+        help="Named query: matter, matter-documents, matter-votes, matter-ballots, "
+        "vote-ballots, session-votes, mp, mp-ballots or mp-speeches",
+    )
+    query.add_argument("--id", help="Identifier the named query filters on")
+    query.add_argument("--ballot", help="Only ballots with this value, e.g. Ei")
+    query.add_argument("--sql", help="Run a read-only SQL statement instead")
+
+    vote_matrix = sub.add_parser(
+        "vote-matrix", help="Build or query a dense votes x MPs matrix file"
+    )
+    vote_matrix.add_argument(
+        "action", choices=("build", "summary", "turnout", "cohesion", "agreement")
+    )
+    vote_matrix.add_argument("--matrix", required=True, help="Matrix file path")
+    vote_matrix.add_argument(
+        "--input",
+        action="append",
+        default=[],
+        help="With build, a JSON or NDJSON file of vote detail envelopes",
+    )
+    vote_matrix.add_argument(
+        "--sessions",
+        help="With build, fetch session-votes for the session IDs in this file",
+    )
+    vote_matrix.add_argument("--workers", type=int, default=4)
+    vote_matrix.add_argument(
+        "--group",
+        action="append",
+        default=[],
+        help="Cohesion of this group; repeat to treat several groups as one bloc",
+    )
+    vote_matrix.add_argument("--member", help="henkilonro to compare for agreement")
+
+    text_index = sub.add_parser(
+        "text-index", help="Build or search a local full-text index of texts"
+    )
+    text_index.add_argument("action", choices=("build", "search", "terms", "summary"))
+    text_index.add_argument("--index", required=True, help="Index file path")
+    text_index.add_argument(
+        "--input",
+        action="append",
+        default=[],
+        help="With build, a JSON or NDJSON file of document texts or speeches",
+    )
+    text_index.add_argument(
+        "--query", help='Words, prefix* words and "quoted phrases", all required'
+    )
+    text_index.add_argument("--limit", type=int, default=20)
+
     sub.add_parser("mps", help="Fetch all MPs")
     sub.add_parser("latest-votes", help="Fetch the latest votes")
 
     reference = sub.add_parser("reference", help="Fetch reference data")
     reference.add_argument("name")
 
+    snapshot = sub.add_parser(
+        "reference-snapshot",
+        help="Fetch all reference tables concurrently into a snapshot file",
+    )
+    snapshot.add_argument("snapshot", help="Snapshot JSON path")
+    snapshot.add_argument(
+        "--name",
+        action="append",
+        choices=sorted(REFERENCE_NAMES),
+        help="Fetch only this table; repeatable",
+    )
+
+    lookup = sub.add_parser(
+        "reference-lookup", help="Answer code and date lookups from a snapshot"
+    )
+    lookup.add_argument("snapshot", help="Snapshot JSON path")
+    lookup.add_argument(
+        "--date", help="Map this day (YYYY-MM-DD) to valtiopäivät and vaalikausi"
+    )
+    lookup.add_argument("--table", help="Reference table of --code")
+    lookup.add_argument("--code", help="Code to translate to its Finnish name")
+
     public_url = sub.add_parser("public-url", help="Build an encoded public URL")
     public_url.add_argument("kind", choices=("matter", "document"))
     public_url.add_argument("identifier")
@@ -541,7 +3221,120 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
-def run_command(args: argparse.Namespace) -> Any:
+def _stream_search(
+    client: EduskuntaClient,
+    payload: Mapping[str, Any],
+    args: argparse.Namespace,
+    partitions: Sequence[PartitionAxis],
+    checkpoint: HarvestCheckpoint | None,
+) -> Iterator[Any]:
+    """Yield NDJSON records followed by a trailer with the audit trace."""
+
+    trace: dict[str, Any] = {}
+    yield from client.iter_search(
+        payload,
+        method=args.method,
+        page_size=args.page_size,
+        max_records=args.max_records,
+        partitions=partitions,
+        trace=trace,
+        checkpoint=checkpoint,
+    )
+    request = _search_base(payload, args.page_size, args.max_records, bool(partitions))
+    yield {"trailer": {"trace": trace, "request": request}}
+
+
+def _stream_document_texts(
+    client: EduskuntaClient, args: argparse.Namespace
+) -> Iterator[Any]:
+    """Yield one NDJSON item per document followed by a throughput trailer."""
+
+    from eduskunta_documents import document_texts, edk_identifiers
+
+    if bool(args.input) == bool(args.matter):
+        raise ValueError("document-texts needs exactly one of --input or --matter")
+    listing = None
+    if args.matter:
+        listing = client.documents(args.matter)
+        identifiers: Iterable[str] = edk_identifiers(listing["data"])
+    else:
+        identifiers = _read_identifiers(args.input)
+    summary: dict[str, Any] = {}
+    yield from document_texts(
+        client,
+        identifiers,
+        fetch_workers=args.fetch_workers,
+        parse_workers=args.parse_workers,
+        ordered=args.ordered,
+        summary=summary,
+    )
+    trailer: dict[str, Any] = {"summary": summary, "request": {"matter": args.matter}}
+    if listing is not None:
+        trailer["listing_trace"] = listing["trace"]
+    yield {"trailer": trailer}
+
+
+def _stream_speeches(
+    client: EduskuntaClient, args: argparse.Namespace
+) -> Iterator[Any]:
+    """Yield one NDJSON record per speech followed by a harvest trailer."""
+
+    from eduskunta_harvest import harvest_speeches
+
+    sessions = None
+    if args.sessions:
+        axis = parse_count_axis(f"taysistuntonumero={args.sessions}")
+        sessions = [int(number) for number in axis.values]
+    payload = _read_payload(args.payload) if args.payload else None
+    summary: dict[str, Any] = {}
+    yield from harvest_speeches(
+        client,
+        args.year,
+        speakers=args.speaker,
+        types=args.type,
+        payload=payload,
+        sessions=sessions,
+        workers=args.workers,
+        method=args.method,
+        ordered=args.ordered,
+        summary=summary,
+    )
+    request = {
+        "year": args.year,
+        "speakers": args.speaker,
+        "types": args.type,
+        "sessions": args.sessions,
+        "payload": payload,
+    }
+    yield {"trailer": {"summary": summary, "request": request}}
+
+
+def _reference_lookup(registry: Any, args: argparse.Namespace) -> dict[str, Any]:
+    if not args.date and not (args.table and args.code):
+        raise ValueError("reference-lookup needs --date or --table with --code")
+    data: dict[str, Any] = {}
+    if args.date:
+        for key, find in (
+            ("valtiopaivat", registry.valtiopaivat_on),
+            ("vaalikausi", registry.vaalikausi_on),
+        ):
+            period = find(args.date)
+            data[key] = None if period is None else asdict(period)
+    if args.table and args.code:
+        data["name"] = registry.name(args.table, args.code)
+    return {
+        "trace": {
+            "source": "local",
+            "snapshot": args.snapshot,
+            "retrieved_at": registry.retrieved_at,
+            "digest": registry.digest,
+        },
+        "request": {"date": args.date, "table": args.table, "code": args.code},
+        "data": data,
+    }
+
+
+def run_command(args: argparse.Namespace, metrics: RunMetrics | None = None) -> Any:
     if args.command == "public-url":
         url = (
             public_matter_url(args.identifier)
@@ -549,20 +3342,178 @@ def run_command(args: argparse.Namespace) -> Any:
             else public_document_url(args.identifier)
         )
         return {"kind": args.kind, "identifier": args.identifier, "url": url}
+    if args.command == "reference-lookup":
+        from eduskunta_reference import ReferenceRegistry
+
+        return _reference_lookup(ReferenceRegistry.load(args.snapshot), args)
+    if args.command in {"ingest", "query"}:
+        from eduskunta_store import LocalStore, ingest
+
+        with LocalStore(args.store) as store:
+            if args.command == "ingest":
+                return ingest(store, args.files, category=args.category)
+            if args.sql:
+                return store.sql(args.sql)
+            if not args.name:
+                raise ValueError("query needs a query name or --sql")
+            params = {"id": args.id, "ballot": args.ballot}
+            return store.query(
+                args.name, **{key: value for key, value in params.items() if value}
+            )
+
+    if args.command == "text-index":
+        from eduskunta_index import TextIndex, TextIndexBuilder, query_index
+        from eduskunta_store import read_items
+
+        if args.action != "build":
+            return query_index(
+                TextIndex.load(args.index),
+                args.action,
+                query=args.query,
+                limit=args.limit,
+            )
+        if not args.input:
+            raise ValueError("text-index build needs --input")
+        builder = TextIndexBuilder()
+        for path in args.input:
+            for item in read_items(path):
+                builder.add_item(item)
+        index = builder.build()
+        index.save(args.index)
+        return {
+            "trace": {"source": "local", "index": args.index, "built_at": utc_now()},
+            "request": {"inputs": args.input},
+            "data": {**index.summary(), "duplicates_skipped": builder.skipped},
+        }
 
-    client = _client_from_args(args)
+    client = _client_from_args(args, metrics)
     if args.command == "search":
         payload = _read_payload(args.payload)
+        partitions = [parse_partition_axis(spec) for spec in args.partition]
+        checkpoint = HarvestCheckpoint(args.checkpoint) if args.checkpoint else None
+        if (args.stream or checkpoint) and not args.all:
+            raise ValueError("--stream and --checkpoint require --all")
+        if args.stream:
+            return _stream_search(client, payload, args, partitions, checkpoint)
         if args.all:
             return client.search_all(
                 payload,
                 method=args.method,
                 page_size=args.page_size,
                 max_records=args.max_records,
+                partitions=partitions,
+                checkpoint=checkpoint,
             )
         return client.search(payload, method=args.method)
+    if args.command == "document-texts":
+        return _stream_document_texts(client, args)
+    if args.command == "harvest-speeches":
+        return _stream_speeches(client, args)
+    if args.command == "batch":
+        return client.batch(
+            args.kind,
+            _read_identifiers(args.input),
+            workers=args.workers,
+            ordered=args.ordered,
+            checkpoint=HarvestCheckpoint(args.checkpoint) if args.checkpoint else None,
+        )
+    if args.command == "lookup-ids":
+        return client.lookup_ids(
+            _read_payload(args.payload),
+            _read_identifiers(args.input),
+            method=args.method,
+            workers=args.workers,
+        )
+    if args.command == "harvest-matters":
+        from eduskunta_harvest import harvest_matters, write_table
+
+        axis = parse_count_axis(f"valtiopaivavuosi={args.years}")
+        types = [code.strip() for code in (args.types or "").split(",") if code.strip()]
+        payload = _read_payload(args.payload) if args.payload else None
+        registry = None
+        if args.reference_snapshot:
+            from eduskunta_reference import ReferenceRegistry
+
+            registry = ReferenceRegistry.load(args.reference_snapshot)
+        table, trace = harvest_matters(
+            client,
+            [int(year) for year in axis.values],
+            types=types or None,
+            payload=payload,
+            method=args.method,
+            registry=registry,
+        )
+        table_format = write_table(table, args.table, args.format)
+        return {
+            "trace": trace,
+            "request": {"years": args.years, "types": types or None, "payload": payload},
+            "data": {
+                "path": args.table,
+                "format": table_format,
+                "rows": len(table),
+                "columns": list(table.columns()),
+            },
+        }
+    if args.command == "sync":
+        from eduskunta_store import LocalStore, sync
+
+        with LocalStore(args.store) as store:
+            return sync(
+                client,
+                store,
+                args.category,
+                since=args.since,
+                lookback_days=args.lookback_days,
+                payload=_read_payload(args.payload) if args.payload else None,
+                date_property=args.date_property,
+            )
+    if args.command == "vote-matrix":
+        from eduskunta_store import read_envelopes
+        from eduskunta_votes import VoteMatrix, VoteMatrixBuilder, query_matrix
+
+        if args.action != "build":
+            with VoteMatrix.open(args.matrix) as matrix:
+                return query_matrix(
+                    matrix, args.action, groups=args.group, member=args.member
+                )
+        builder = VoteMatrixBuilder()
+        errors = []
+        for path in args.input:
+            for envelope in read_envelopes(path):
+                builder.add_envelope(envelope)
+        if args.sessions:
+            for item in client.batch(
+                "session-votes", _read_identifiers(args.sessions), workers=args.workers
+            ):
+                if "error" in item:
+                    errors.append(
+                        {"identifier": item["identifier"], "error": item["error"]}
+                    )
+                builder.add_envelope(item)
+        matrix = builder.build()
+        matrix.save(args.matrix)
+        return {
+            "trace": {"source": "local", "matrix": args.matrix, "built_at": utc_now()},
+            "request": {"inputs": args.input, "sessions": args.sessions},
+            "data": {
+                "votes": matrix.shape[0],
+                "members": matrix.shape[1],
+                "groups": [name for name in matrix.group_names if name],
+                "cancelled_skipped": builder.skipped,
+                "unknown_ballots": builder.unknown_ballots,
+                "errors": errors,
+            },
+        }
     if args.command == "count":
         return client.count(_read_payload(args.payload))
+    if args.command == "count-matrix":
+        return client.count_matrix(
+            _read_payload(args.payload),
+            [parse_count_axis(spec) for spec in args.axis],
+            method=args.method,
+            workers=args.workers,
+            check_total=not args.no_total_check,
+        )
     if args.command == "aggregate":
         return client.aggregate(_read_payload(args.payload))
     if args.command == "matter":
@@ -576,14 +3527,19 @@ def run_command(args: argparse.Namespace) -> Any:
     if args.command == "document-xml":
         return client.document_xml(args.identifier)
     if args.command == "document-text":
-        result = client.document_html(args.identifier)
-        html = result["data"]
-        result["data"] = {
-            "edktunnus": args.identifier,
-            "source_url": result["trace"]["final_url"],
-            "blocks": extract_html_blocks(html),
-        }
-        return result
+        from eduskunta_documents import document_text
+
+        return document_text(client, args.identifier)
+    if args.command == "matter-bundle":
+        from eduskunta_documents import matter_bundle
+
+        return matter_bundle(
+            client,
+            args.identifier,
+            html=args.html,
+            records=args.record_item,
+            workers=args.workers,
+        )
     if args.command == "mp":
         return client.mp(args.identifier)
     if args.command == "mps":
@@ -600,21 +3556,45 @@ def run_command(args: argparse.Namespace) -> Any:
         return client.record_html(args.identifier)
     if args.command == "reference":
         return client.reference(args.name)
+    if args.command == "reference-snapshot":
+        from eduskunta_reference import ReferenceRegistry
+
+        registry = ReferenceRegistry.fetch(client, args.name or REFERENCE_NAMES)
+        registry.save(args.snapshot)
+        return {
+            "trace": registry.traces,
+            "request": {"names": sorted(registry.tables)},
+            "data": {"path": args.snapshot, **registry.summary()},
+        }
     raise ValueError(f"Unknown command: {args.command}")
 
 
 def main(argv: Iterable[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(list(argv) if argv is not None else None)
+    metrics = RunMetrics() if args.metrics else None
+    status = 0
     try:
-        result = run_command(args)
-        _write_result(result, args.output)
-        return 0
+        result = run_command(args, metrics)
+        if isinstance(result, Iterator):
+            _write_lines(result, args.output)
+        else:
+            _write_result(result, args.output)
     except (ApiError, ValueError, OSError, json.JSONDecodeError) as exc:
         sys.stderr.write(f"error: {exc}\n")
-        return 2
+        status = 2
+    if metrics is not None:
+        # Written for failed runs too, so that nightly jobs report their errors.
+        try:
+            metrics.write(args.metrics, args.metrics_format)
+        except (ValueError, OSError) as exc:
+            sys.stderr.write(f"error: {exc}\n")
+            status = 2
+    return status
 
 
 if __name__ == "__main__":
+    # Sibling modules import eduskunta_api; let them share this module's classes.
+    sys.modules.setdefault("eduskunta_api", sys.modules[__name__])
     raise SystemExit(main())
 
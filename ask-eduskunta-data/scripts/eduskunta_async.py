@@ -0,0 +1,848 @@
+"""Asyncio client for the Parliament of Finland Open Data API.
+
+:class:`AsyncEduskuntaClient` mirrors :class:`eduskunta_api.EduskuntaClient`
+for applications that already run an event loop. Requests, envelopes, caching,
+retries and rate limiting behave the same; waiting happens with
+``asyncio.sleep`` and the default transport speaks HTTP/1.1 over asyncio
+streams, so hundreds of concurrent lookups need no threads. Uses only the
+Python standard library.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import time
+from collections import deque
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Mapping
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin, urlparse
+
+from eduskunta_api import (
+    ACCEPT_ENCODING,
+    BATCH_METHODS,
+    DEFAULT_BASE_URL,
+    DEFAULT_TIMEOUT,
+    MAX_SEARCH_RESULTS,
+    READ_CHUNK,
+    REDIRECT_STATUS,
+    REFERENCE_NAMES,
+    ApiError,
+    EduskuntaClient,
+    HttpResponse,
+    RateLimiter,
+    RequestKey,
+    RequestTrace,
+    ResponseCache,
+    ResponseMemo,
+    RunMetrics,
+    _add_timing,
+    _BodyDecoder,
+    _decode_json,
+    _decode_text,
+    _envelope_trace,
+    _header,
+    _prepare_request,
+    _PreparedRequest,
+    _request_key,
+    _RequestLog,
+    _search_base,
+    _search_page,
+    _settle_response,
+    _shared_trace,
+    _uses_proxy,
+    encode_path_identifier,
+    urlopen_transport,
+    utc_now,
+)
+
+AsyncTransport = Callable[
+    [str, str, bytes | None, Mapping[str, str], float], Awaitable[HttpResponse]
+]
+MAX_HEADER_LINES = 200
+
+_Connection = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncPooledTransport:
+    """Keep-alive HTTP/1.1 transport on asyncio streams.
+
+    Behaves like :class:`eduskunta_api.PooledTransport`: at most
+    ``max_per_host`` requests per host are in flight, idle connections older
+    than ``idle_timeout`` seconds are dropped, redirects are followed and
+    bodies are decompressed. Requests that must go through a proxy from the
+    environment run :func:`eduskunta_api.urlopen_transport` in a worker thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_per_host: int = 8,
+        idle_timeout: float = 30.0,
+        max_redirects: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+        ssl_context: ssl.SSLContext | None = None,
+    ) -> None:
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.max_redirects = max_redirects
+        self.clock = clock
+        self.ssl_context = ssl_context
+        self._idle: dict[tuple[str, str, int], list[tuple[_Connection, float]]] = {}
+        self._slots: dict[tuple[str, str, int], asyncio.Semaphore] = {}
+        self.connections_opened = 0
+
+    async def __call__(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> HttpResponse:
+        current_method, current_url, current_body = method, url, body
+        current_headers = dict(headers)
+        current_headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        timings: dict[str, float] = {}
+        for _ in range(self.max_redirects + 1):
+            parts = urlparse(current_url)
+            if _uses_proxy(parts.scheme, parts.hostname or ""):
+                return await asyncio.to_thread(
+                    _proxied,
+                    current_method,
+                    current_url,
+                    current_body,
+                    current_headers,
+                    timeout,
+                )
+            status, response_headers, response_body, wire_bytes = await self._send(
+                current_method, parts, current_body, current_headers, timeout, timings
+            )
+            location = _header(response_headers, "Location")
+            if status not in REDIRECT_STATUS or not location:
+                return HttpResponse(
+                    status=status,
+                    headers=response_headers,
+                    body=response_body,
+                    final_url=current_url,
+                    wire_bytes=wire_bytes,
+                    timings=timings,
+                )
+            current_url = urljoin(current_url, location)
+            if status in {301, 302, 303} and current_method != "HEAD":
+                current_method = "GET"
+                current_body = None
+                current_headers.pop("Content-Type", None)
+        raise ApiError(f"Too many redirects for {url}")
+
+    async def _send(
+        self,
+        method: str,
+        parts: Any,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timeout: float,
+        timings: dict[str, float],
+    ) -> tuple[int, dict[str, str], bytes, int]:
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"}:
+            raise ApiError(f"Unsupported URL scheme: {scheme}")
+        host = parts.hostname or ""
+        default_port = 443 if scheme == "https" else 80
+        key = (scheme, host, parts.port or default_port)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        host_header = f"[{host}]" if ":" in host else host
+        if key[2] != default_port:
+            host_header += f":{key[2]}"
+        request = _request_bytes(method, target, host_header, body, headers)
+        slots = self._slots.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        async with slots:
+            started = time.perf_counter()
+            connection, reused = await self._checkout(key, timeout)
+            if not reused:
+                _add_timing(timings, "connect", time.perf_counter() - started)
+            try:
+                return await asyncio.wait_for(
+                    self._exchange(connection, key, method, request, timings), timeout
+                )
+            except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+                _close(connection)
+                if not reused or not isinstance(
+                    exc, (ConnectionError, asyncio.IncompleteReadError)
+                ):
+                    raise _as_os_error(exc) from exc
+            except BaseException:
+                _close(connection)
+                raise
+            # The server closed an idle keep-alive connection; retry once on a
+            # fresh one.
+            started = time.perf_counter()
+            connection = await self._open(key, timeout)
+            _add_timing(timings, "connect", time.perf_counter() - started)
+            try:
+                return await asyncio.wait_for(
+                    self._exchange(connection, key, method, request, timings), timeout
+                )
+            except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+                _close(connection)
+                raise _as_os_error(exc) from exc
+            except BaseException:
+                _close(connection)
+                raise
+
+    async def _exchange(
+        self,
+        connection: _Connection,
+        key: tuple[str, str, int],
+        method: str,
+        request: bytes,
+        timings: dict[str, float],
+    ) -> tuple[int, dict[str, str], bytes, int]:
+        reader, writer = connection
+        started = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        while True:
+            version, status = _status_line(await reader.readline())
+            response_headers = await _read_headers(reader)
+            if not 100 <= status < 200:
+                break
+        headed = time.perf_counter()
+        _add_timing(timings, "ttfb", headed - started)
+        # Decode as the body arrives, like PooledTransport, so a compressed
+        # page is never held twice.
+        decoder = _BodyDecoder(response_headers)
+        chunks, will_close = _raw_body(
+            reader, method, status, version, response_headers
+        )
+        parts = [decoder.decode(chunk) async for chunk in chunks]
+        parts.append(decoder.finish())
+        payload, wire_bytes = b"".join(parts), decoder.wire_bytes
+        _add_timing(timings, "download", time.perf_counter() - headed)
+        if will_close:
+            _close(connection)
+        else:
+            self._checkin(key, connection)
+        return status, response_headers, payload, wire_bytes
+
+    async def _open(self, key: tuple[str, str, int], timeout: float) -> _Connection:
+        scheme, host, port = key
+        context = None
+        if scheme == "https":
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            context = self.ssl_context
+        self.connections_opened += 1
+        return await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context), timeout
+        )
+
+    async def _checkout(
+        self, key: tuple[str, str, int], timeout: float
+    ) -> tuple[_Connection, bool]:
+        now = self.clock()
+        idle = self._idle.get(key, [])
+        while idle:
+            connection, since = idle.pop()
+            if now - since <= self.idle_timeout and not connection[0].at_eof():
+                return connection, True
+            _close(connection)
+        return await self._open(key, timeout), False
+
+    def _checkin(self, key: tuple[str, str, int], connection: _Connection) -> None:
+        idle = self._idle.setdefault(key, [])
+        idle.append((connection, self.clock()))
+        overflow = idle[: max(0, len(idle) - self.max_per_host)]
+        del idle[: len(overflow)]
+        for candidate, _ in overflow:
+            _close(candidate)
+
+    async def aclose(self) -> None:
+        idle = [connection for items in self._idle.values() for connection, _ in items]
+        self._idle.clear()
+        for connection in idle:
+            _close(connection)
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+def _proxied(
+    method: str,
+    url: str,
+    body: bytes | None,
+    headers: Mapping[str, str],
+    timeout: float,
+) -> HttpResponse:
+    try:
+        return urlopen_transport(method, url, body, headers, timeout)
+    except HTTPError as exc:
+        response_headers = dict(exc.headers.items()) if exc.headers else {}
+        payload = exc.read() if exc.fp is not None else b""
+        return HttpResponse(exc.code, response_headers, payload, exc.geturl() or url)
+
+
+def _request_bytes(
+    method: str,
+    target: str,
+    host_header: str,
+    body: bytes | None,
+    headers: Mapping[str, str],
+) -> bytes:
+    lines = [f"{method} {target} HTTP/1.1", f"Host: {host_header}"]
+    lines.extend(
+        f"{name}: {value}"
+        for name, value in headers.items()
+        if name.lower() not in {"host", "content-length"}
+    )
+    if body is not None or method in {"POST", "PUT", "PATCH"}:
+        lines.append(f"Content-Length: {len(body or b'')}")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head + (body or b"")
+
+
+def _status_line(line: bytes) -> tuple[str, int]:
+    if not line:
+        raise ConnectionError("Server closed the connection before responding")
+    version, _, rest = line.decode("latin-1").strip().partition(" ")
+    if not version.startswith("HTTP/") or len(rest) < 3 or not rest[:3].isdigit():
+        raise ValueError(f"Malformed HTTP status line: {line[:80]!r}")
+    return version, int(rest[:3])
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    headers: dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in {b"\r\n", b"\n", b""}:
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip()] = value.strip()
+    raise ValueError(f"More than {MAX_HEADER_LINES} response headers")
+
+
+def _raw_body(
+    reader: asyncio.StreamReader,
+    method: str,
+    status: int,
+    version: str,
+    headers: Mapping[str, str],
+) -> tuple[AsyncIterator[bytes], bool]:
+    """Return the undecoded body chunks and whether the connection must close."""
+
+    connection = (_header(headers, "Connection") or "").lower()
+    will_close = connection == "close" or (
+        version == "HTTP/1.0" and connection != "keep-alive"
+    )
+    if method == "HEAD" or status in {204, 304}:
+        return _read_sized(reader, 0), will_close
+    if "chunked" in (_header(headers, "Transfer-Encoding") or "").lower():
+        return _read_chunked(reader), will_close
+    length = _header(headers, "Content-Length")
+    if length is not None:
+        return _read_sized(reader, int(length)), will_close
+    return _read_to_end(reader), True
+
+
+async def _read_sized(reader: asyncio.StreamReader, size: int) -> AsyncIterator[bytes]:
+    while size > 0:
+        chunk = await reader.readexactly(min(size, READ_CHUNK))
+        size -= len(chunk)
+        yield chunk
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+        if size == 0:
+            break
+        async for chunk in _read_sized(reader, size):
+            yield chunk
+        await reader.readexactly(2)
+    while (await reader.readline()) not in {b"\r\n", b"\n", b""}:
+        pass
+
+
+async def _read_to_end(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    while chunk := await reader.read(READ_CHUNK):
+        yield chunk
+
+
+def _close(connection: _Connection) -> None:
+    connection[1].close()
+
+
+def _as_os_error(exc: BaseException) -> OSError:
+    """Present protocol errors as OSError so that the client retries them."""
+
+    if isinstance(exc, OSError):
+        return exc
+    return ConnectionError(f"{type(exc).__name__}: {exc}")
+
+
+class AsyncEduskuntaClient:
+    """Asyncio counterpart of :class:`eduskunta_api.EduskuntaClient`.
+
+    At most ``concurrency`` requests are sent at once; callers beyond that wait
+    for a free slot, and backoff sleeps do not hold one. Checkpointed and
+    partitioned harvests stay with the synchronous client.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        *,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = 4,
+        backoff: float = 1.0,
+        transport: AsyncTransport | None = None,
+        sleeper: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        concurrency: int = 16,
+        metrics: RunMetrics | None = None,
+        memo: ResponseMemo | None = None,
+        coalesce: bool = True,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.transport = transport or AsyncPooledTransport()
+        self.sleeper = sleeper
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.memo = memo
+        self.coalesce = coalesce
+        self._in_flight: dict[
+            RequestKey, asyncio.Future[tuple[HttpResponse, RequestTrace]]
+        ] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> "AsyncEduskuntaClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        close = getattr(self.transport, "aclose", None)
+        if close is not None:
+            await close()
+
+    async def _sleep(self, delay: float, log: _RequestLog) -> None:
+        await self.sleeper(delay)
+        log.slept(delay)
+
+    async def _back_off(
+        self, method: str, status: int, delay: float, log: _RequestLog
+    ) -> None:
+        if status == 429 and self.rate_limiter is not None:
+            await asyncio.to_thread(self.rate_limiter.penalize, method, delay)
+            return
+        await self._sleep(delay, log)
+
+    async def _pause(
+        self, method: str, get_delay: float | None, post_delay: float | None
+    ) -> None:
+        """Wait between pages when no rate limiter paces the requests."""
+
+        delay = post_delay if method == "POST" else get_delay
+        if delay is None:
+            if self.rate_limiter is not None:
+                return
+            delay = 7.0 if method == "POST" else 1.1
+        await self.sleeper(delay)
+        if self.metrics is not None:
+            self.metrics.record_pause(delay)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        payload: Mapping[str, Any] | None = None,
+        accept: str = "application/json",
+        remember: bool = True,
+    ) -> tuple[HttpResponse, RequestTrace]:
+        key = _request_key(method, path, payload, accept)
+        memo = self.memo if remember else None
+        if memo is not None:
+            remembered = memo.get(key)
+            if remembered is not None:
+                return remembered
+        if not self.coalesce:
+            return await self._fetch(key, method, path, payload, accept, memo)
+        leader = self._in_flight.get(key)
+        while leader is not None:
+            started = time.perf_counter()
+            try:
+                response, trace = await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                if not leader.cancelled():
+                    raise  # this caller was cancelled, not the leader
+                # The leading caller was cancelled; send this request ourselves
+                # unless another waiter has already taken over.
+                leader = self._in_flight.get(key)
+                continue
+            waited = time.perf_counter() - started
+            return response, _shared_trace(trace, "coalesced", waited)
+        future: asyncio.Future[tuple[HttpResponse, RequestTrace]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._in_flight[key] = future
+        try:
+            outcome = await self._fetch(key, method, path, payload, accept, memo)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved here when nobody else was waiting
+            raise
+        else:
+            future.set_result(outcome)
+            return outcome
+        finally:
+            del self._in_flight[key]
+
+    async def _fetch(
+        self,
+        key: RequestKey,
+        method: str,
+        path: str,
+        payload: Mapping[str, Any] | None,
+        accept: str,
+        memo: ResponseMemo | None,
+    ) -> tuple[HttpResponse, RequestTrace]:
+        # Cache lookups read files; keep them off the event loop.
+        prepare = partial(
+            _prepare_request, self.base_url, self.cache, method, path, payload, accept
+        )
+        prepared, hit = (
+            await asyncio.to_thread(prepare) if self.cache is not None else prepare()
+        )
+        if hit is None:
+            log = _RequestLog()
+            try:
+                hit = await self._attempts(prepared, log)
+            except ApiError:
+                if self.metrics is not None:
+                    self.metrics.record_error(method, log)
+                raise
+        if memo is not None:
+            memo.put(key, *hit)
+        return hit
+
+    async def _attempts(
+        self, prepared: _PreparedRequest, log: _RequestLog
+    ) -> tuple[HttpResponse, RequestTrace]:
+        method, url = prepared.method, prepared.url
+        last_error: Exception | None = None
+        for attempt in range(1, self.retries + 2):
+            if self.rate_limiter is not None:
+                # acquire() may wait on a host-wide file lock.
+                wait = await asyncio.to_thread(self.rate_limiter.acquire, method)
+                if wait > 0:
+                    await self._sleep(wait, log)
+            try:
+                async with self._slots:
+                    response = await self.transport(
+                        method, url, prepared.body, prepared.headers, self.timeout
+                    )
+                settle = partial(
+                    _settle_response, self.cache, prepared, response, attempt, log
+                )
+                outcome = (
+                    await asyncio.to_thread(settle)
+                    if self.cache is not None
+                    else settle()
+                )
+                if not isinstance(outcome, float):
+                    return outcome
+                delay = self.backoff * (2 ** (attempt - 1)) if outcome < 0 else outcome
+                if attempt <= self.retries:
+                    log.retry(attempt, f"HTTP {response.status}", delay)
+                    await self._back_off(method, response.status, delay, log)
+                    continue
+                raise ApiError(f"Transient HTTP {response.status} persisted for {url}")
+            except (URLError, asyncio.TimeoutError, TimeoutError, OSError) as exc:
+                last_error = exc
+                if attempt <= self.retries:
+                    delay = self.backoff * (2 ** (attempt - 1))
+                    log.retry(attempt, type(exc).__name__, delay, str(exc))
+                    await self._sleep(delay, log)
+                    continue
+                break
+
+        raise ApiError(f"Request failed after retries for {url}: {last_error}")
+
+    async def _json(
+        self,
+        method: str,
+        path: str,
+        *,
+        payload: Mapping[str, Any] | None = None,
+        remember: bool = True,
+    ) -> dict[str, Any]:
+        response, trace = await self._request(
+            method, path, payload=payload, remember=remember
+        )
+        started = time.perf_counter()
+        data = _decode_json(response.body, trace.final_url)
+        return {
+            "trace": _envelope_trace(
+                trace, time.perf_counter() - started, self.metrics
+            ),
+            "request": payload,
+            "data": data,
+        }
+
+    async def _text(self, path: str, *, accept: str) -> dict[str, Any]:
+        response, trace = await self._request(
+            "GET", path, accept=accept, remember=False
+        )
+        started = time.perf_counter()
+        data = _decode_text(response)
+        return {
+            "trace": _envelope_trace(
+                trace, time.perf_counter() - started, self.metrics
+            ),
+            "request": None,
+            "data": data,
+        }
+
+    async def search(
+        self, payload: Mapping[str, Any], *, method: str = "auto"
+    ) -> dict[str, Any]:
+        chosen = EduskuntaClient._search_method(payload, method)
+        if chosen == "GET":
+            compact = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            path = "/search?" + urlencode({"q": compact})
+            return await self._json("GET", path, remember=False)
+        return await self._json("POST", "/search", payload=payload, remember=False)
+
+    async def count(self, payload: Mapping[str, Any]) -> dict[str, Any]:
+        return await self._json("POST", "/search/count", payload=payload)
+
+    async def search_all(
+        self,
+        payload: Mapping[str, Any],
+        *,
+        method: str = "auto",
+        page_size: int = 1000,
+        max_records: int = MAX_SEARCH_RESULTS,
+        get_delay: float | None = None,
+        post_delay: float | None = None,
+    ) -> dict[str, Any]:
+        trace: dict[str, Any] = {}
+        results = [
+            record
+            async for record in self.iter_search(
+                payload,
+                method=method,
+                page_size=page_size,
+                max_records=max_records,
+                get_delay=get_delay,
+                post_delay=post_delay,
+                trace=trace,
+            )
+        ]
+        total = trace.pop("totalResultCount")
+        return {
+            "trace": trace,
+            "request": _search_base(payload, page_size, max_records, False),
+            "data": {
+                "results": results,
+                "searchMetadata": {
+                    "totalResultCount": total,
+                    "actualResultCount": len(results),
+                    "startFromIndex": 0,
+                },
+            },
+        }
+
+    async def iter_search(
+        self,
+        payload: Mapping[str, Any],
+        *,
+        method: str = "auto",
+        page_size: int = 1000,
+        max_records: int = MAX_SEARCH_RESULTS,
+        get_delay: float | None = None,
+        post_delay: float | None = None,
+        pages: bool = False,
+        trace: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Any]:
+        """Yield search records, or page envelopes when ``pages`` is set.
+
+        ``trace`` is filled in like :meth:`EduskuntaClient.iter_search` does.
+        """
+
+        if page_size < 1 or page_size > MAX_SEARCH_RESULTS:
+            raise ValueError("page_size must be between 1 and 10000")
+        if max_records < 1 or max_records > MAX_SEARCH_RESULTS:
+            raise ValueError("max_records must be between 1 and 10000")
+        trace = {} if trace is None else trace
+        base_payload = _search_base(payload, page_size, max_records, False)
+        trace.update(retrieved_at=utc_now(), pages=[], complete=False)
+        page_traces: list[dict[str, Any]] = trace["pages"]
+
+        total: int | None = None
+        start = 0
+        while True:
+            page_payload = dict(base_payload)
+            page_payload["startFromIndex"] = start
+            page = await self.search(page_payload, method=method)
+            page_traces.append(page["trace"])
+            trace["retrieved_at"] = page["trace"]["retrieved_at"]
+            page_results, page_total = _search_page(page["data"], max_records)
+            if total is None:
+                total = page_total
+            if pages:
+                yield page
+            else:
+                for record in page_results:
+                    yield record
+            start += len(page_results)
+            if not page_results or start >= total:
+                break
+            await self._pause(page_traces[-1]["method"], get_delay, post_delay)
+
+        trace["totalResultCount"] = total or 0
+        trace["complete"] = start >= (total or 0)
+
+    async def matter(self, identifier: str) -> dict[str, Any]:
+        return await self._json(
+            "GET", f"/valtiopaivaasiat/{encode_path_identifier(identifier)}"
+        )
+
+    async def documents(self, identifier: str) -> dict[str, Any]:
+        return await self._json(
+            "GET", f"/asiakirjat/eduskuntatunnus/{encode_path_identifier(identifier)}"
+        )
+
+    async def document(self, edktunnus: str) -> dict[str, Any]:
+        return await self._json(
+            "GET", f"/asiakirjat/edktunnus/{encode_path_identifier(edktunnus)}"
+        )
+
+    async def document_html(self, edktunnus: str) -> dict[str, Any]:
+        return await self._text(
+            f"/asiakirjat/edktunnus/{encode_path_identifier(edktunnus)}/html",
+            accept="text/html,application/xhtml+xml",
+        )
+
+    async def document_xml(self, edktunnus: str) -> dict[str, Any]:
+        return await self._text(
+            f"/asiakirjat/edktunnus/{encode_path_identifier(edktunnus)}/xml",
+            accept="application/xml,text/xml",
+        )
+
+    async def mp(self, identifier: str) -> dict[str, Any]:
+        return await self._json(
+            "GET", f"/kansanedustajat/{encode_path_identifier(identifier)}"
+        )
+
+    async def mps(self) -> dict[str, Any]:
+        return await self._json("GET", "/kansanedustajat")
+
+    async def vote(self, identifier: str) -> dict[str, Any]:
+        return await self._json(
+            "GET", f"/taysistunnot/aanestykset/{encode_path_identifier(identifier)}"
+        )
+
+    async def session_votes(self, identifier: str) -> dict[str, Any]:
+        return await self._json(
+            "GET",
+            f"/taysistunnot/istunnon-aanestykset/{encode_path_identifier(identifier)}",
+        )
+
+    async def matter_votes(self, identifier: str) -> dict[str, Any]:
+        return await self._json(
+            "GET",
+            f"/taysistunnot/asian-aanestykset/{encode_path_identifier(identifier)}",
+        )
+
+    async def latest_votes(self) -> dict[str, Any]:
+        return await self._json("GET", "/taysistunnot/uusimmat-aanestykset")
+
+    async def record_html(self, identifier: str) -> dict[str, Any]:
+        return await self._text(
+            "/taysistunnot/poytakirja-asiakohdat/"
+            f"{encode_path_identifier(identifier)}/html",
+            accept="text/html,application/xhtml+xml",
+        )
+
+    async def reference(self, name: str) -> dict[str, Any]:
+        if name not in REFERENCE_NAMES:
+            raise ValueError(f"Unknown reference-data name: {name}")
+        return await self._json("GET", f"/reference-data/{name}")
+
+    async def aggregate(self, payload: Mapping[str, Any]) -> dict[str, Any]:
+        return await self._json("POST", "/aggregations/unique-by", payload=payload)
+
+    async def batch(
+        self,
+        kind: str,
+        identifiers: Iterable[str],
+        *,
+        workers: int = 4,
+        ordered: bool = False,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Fetch many identifiers of one kind with at most ``workers`` in flight.
+
+        Items look like those of :meth:`EduskuntaClient.batch`.
+        """
+
+        if kind not in BATCH_METHODS:
+            raise ValueError(f"Unknown batch kind: {kind}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        fetch = getattr(self, BATCH_METHODS[kind])
+
+        async def run(index: int, identifier: str) -> dict[str, Any]:
+            try:
+                return {
+                    "index": index,
+                    "identifier": identifier,
+                    **await fetch(identifier),
+                }
+            except (ApiError, ValueError, OSError) as exc:
+                return {"index": index, "identifier": identifier, "error": str(exc)}
+
+        pending: deque[asyncio.Task[dict[str, Any]]] = deque()
+        try:
+            for index, identifier in enumerate(identifiers):
+                pending.append(asyncio.ensure_future(run(index, identifier)))
+                if len(pending) >= workers:
+                    async for item in _drain(pending, ordered, until=workers - 1):
+                        yield item
+            async for item in _drain(pending, ordered, until=0):
+                yield item
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def _drain(
+    pending: deque[asyncio.Task[dict[str, Any]]], ordered: bool, *, until: int
+) -> AsyncIterator[dict[str, Any]]:
+    while len(pending) > until:
+        if ordered:
+            yield await pending.popleft()
+            continue
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in [item for item in pending if item in done]:
+            pending.remove(task)
+            yield task.result()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the Parliament of Finland Open Data helper.
+
+Uses only the Python standard library. Inputs are synthetic and served by a
+fake transport with a no-op sleeper, so the timings measure the client's own
+work, do not depend on the network or on the live API, and can be compared
+between runs. Results are written as JSON; a previous result file can be
+given as a baseline to flag regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Mapping, Sequence
+from urllib.parse import parse_qs, urlparse
+
+from eduskunta_api import (
+    READ_CHUNK,
+    BlockHTMLParser,
+    EduskuntaClient,
+    HttpResponse,
+    _decode_json,
+    _write_result,
+    iter_html_blocks,
+    utc_now,
+)
+
+SECTION_HTML = (
+    '<h2 class="otsikko" id="s{n}">{n}. Valiokunnan kannanotot</h2>\n'
+    '<div class="sisalto"><p class="kappale">Hallituksen esityksessä ehdotetaan '
+    "muutettavaksi lakia &amp; asetusta <span>vuodelta</span> 2024. Valiokunta "
+    "puoltaa&nbsp;esitystä.</p>\n<table><tr><td>Kohta {n}</td><td><b>{n}</b> "
+    "€</td></tr></table><ul><li>Ensimmäinen</li><li>Toinen "
+    '<a href="/asiat?a=1&amp;b=2">linkki</a></li></ul></div>\n'
+)
+MATTER_TYPES = ("HE", "LA", "KK", "VK", "K", "M")
+
+
+def synthetic_report_html(sections: int = 1000) -> str:
+    """Return a committee-report-like page with ``sections`` sections."""
+
+    body = "".join(SECTION_HTML.format(n=n) for n in range(1, sections + 1))
+    return (
+        "<!DOCTYPE html><html><head><style>p { margin: 0 }</style></head>"
+        f"<body>{body}</body></html>"
+    )
+
+
+def synthetic_record(index: int) -> dict[str, Any]:
+    """Return a ``valtiopaivaasia`` search record of realistic shape and size."""
+
+    kind = MATTER_TYPES[index % len(MATTER_TYPES)]
+    year = 2015 + index % 10
+    tunnus = f"{kind} {index + 1}/{year} vp"
+    return {
+        "id": f"asia-{index}",
+        "eduskuntatunnus": tunnus,
+        "asiakirjatyyppikoodi": {"fi": kind, "sv": kind},
+        "asiakirjatyyppinimi": {
+            "fi": "Hallituksen esitys",
+            "sv": "Regeringens proposition",
+        },
+        "valtiopaivavuosi": {"fi": str(year), "sv": str(year)},
+        "laadintapvm": f"{year}-{index % 12 + 1:02d}-{index % 28 + 1:02d}",
+        "nimeketeksti": {
+            "fi": f"Hallituksen esitys eduskunnalle laiksi {index}. muuttamisesta",
+            "sv": f"Regeringens proposition till riksdagen om lag {index}",
+        },
+        "tila": {"fi": "Käsittelyssä", "sv": "Under behandling"},
+        "asiasanat": [
+            {"fi": term, "sv": term} for term in ("verotus", "sosiaaliturva", "EU")
+        ],
+        "kasittelyt": [
+            {
+                "tapahtumapvm": f"{year}-{month:02d}-15",
+                "vaihe": {"fi": "Lähetekeskustelu", "sv": "Remissdebatt"},
+            }
+            for month in (2, 5, 9)
+        ],
+    }
+
+
+def search_page(
+    records: Sequence[Any], start: int, size: int, total: int
+) -> dict[str, Any]:
+    page = list(records[start : start + size])
+    return {
+        "results": page,
+        "searchMetadata": {
+            "totalResultCount": total,
+            "actualResultCount": len(page),
+            "requestedResultCount": size,
+            "startFromIndex": start,
+            "maxScore": 1.0,
+        },
+    }
+
+
+class PageTransport:
+    """Serves pre-encoded search pages so only client work is timed."""
+
+    def __init__(self, total: int, page_size: int) -> None:
+        records = [synthetic_record(index) for index in range(total)]
+        self.total = total
+        self.pages = {
+            start: json.dumps(search_page(records, start, page_size, total)).encode()
+            for start in range(0, max(total, 1), page_size)
+        }
+        self.calls = 0
+
+    def __call__(self, method, url, body, headers, timeout):
+        if method == "GET":
+            payload = json.loads(parse_qs(urlparse(url).query)["q"][0])
+        else:
+            payload = json.loads(body)
+        self.calls += 1
+        return HttpResponse(
+            200,
+            {"Content-Type": "application/json"},
+            self.pages[int(payload.get("startFromIndex", 0))],
+            url,
+        )
+
+
+def no_sleep(delay: float) -> None:
+    return None
+
+
+@dataclass
+class Benchmark:
+    """One hot path: ``run`` is timed, ``items`` and ``size`` scale throughput."""
+
+    name: str
+    run: Callable[[], Any]
+    items: int
+    unit: str
+    size: int = 0
+    extra: Callable[[], dict[str, Any]] | None = None
+
+
+def measure(benchmark: Benchmark, repeat: int = 3) -> dict[str, Any]:
+    """Time ``benchmark`` (best of ``repeat``) and trace its peak memory."""
+
+    benchmark.run()  # warm-up
+    timings = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        benchmark.run()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        benchmark.run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    seconds = min(timings)
+    result = {
+        "name": benchmark.name,
+        "items": benchmark.items,
+        "unit": benchmark.unit,
+        "bytes": benchmark.size,
+        "seconds": round(seconds, 5),
+        "items_per_second": round(benchmark.items / seconds, 1) if seconds else None,
+        "megabytes_per_second": (
+            round(benchmark.size / seconds / 1e6, 2)
+            if seconds and benchmark.size
+            else None
+        ),
+        "peak_memory_bytes": peak,
+    }
+    if benchmark.extra is not None:
+        result.update(benchmark.extra())
+    return result
+
+
+def _parser_blocks(html: str) -> list[dict[str, Any]]:
+    parser = BlockHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return parser.blocks
+
+
+def build_benchmarks(
+    *,
+    records: int = 10_000,
+    page_size: int = 1000,
+    sections: int = 2000,
+    workdir: str | Path | None = None,
+) -> list[Benchmark]:
+    """Build the fixtures of every benchmark; nothing is timed yet."""
+
+    transport = PageTransport(records, page_size)
+    client = EduskuntaClient(transport=transport, sleeper=no_sleep)
+    payload = {"category": "valtiopaivaasia"}
+    page_body = transport.pages[0]
+    page_records = min(page_size, records)
+    envelope = client.search_all(payload, page_size=page_size)
+    envelope_size = len(json.dumps(envelope, ensure_ascii=False).encode())
+    target = Path(workdir or tempfile.gettempdir()) / f"bench-{os.getpid()}.json"
+
+    html = synthetic_report_html(sections)
+    raw_html = html.encode()
+    chunks = [
+        raw_html[start : start + READ_CHUNK]
+        for start in range(0, len(raw_html), READ_CHUNK)
+    ]
+    blocks = len(_parser_blocks(html))
+
+    def html_extra() -> dict[str, Any]:
+        started = time.perf_counter()
+        expected = _parser_blocks(html)
+        parser_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        streamed = list(iter_html_blocks(chunks))
+        streaming_seconds = time.perf_counter() - started
+        return {
+            "identical": streamed == expected,
+            "parser_seconds": round(parser_seconds, 5),
+            "speedup": round(parser_seconds / streaming_seconds, 2),
+        }
+
+    return [
+        Benchmark(
+            "search-all",
+            lambda: client.search_all(payload, page_size=page_size),
+            records,
+            "records",
+            sum(len(body) for body in transport.pages.values()),
+        ),
+        Benchmark(
+            "decode-json",
+            lambda: _decode_json(page_body, "bench://search"),
+            page_records,
+            "records",
+            len(page_body),
+        ),
+        Benchmark(
+            "write-result",
+            lambda: _write_result(envelope, str(target)),
+            records,
+            "records",
+            envelope_size,
+        ),
+        Benchmark(
+            "html-blocks",
+            lambda: list(iter_html_blocks(chunks)),
+            blocks,
+            "blocks",
+            len(raw_html),
+            html_extra,
+        ),
+    ]
+
+
+def run_suite(
+    names: Sequence[str] | None = None, *, repeat: int = 3, **sizes: Any
+) -> dict[str, Any]:
+    """Run the selected benchmarks and return the JSON-ready report."""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        benchmarks = build_benchmarks(workdir=workdir, **sizes)
+        known = [benchmark.name for benchmark in benchmarks]
+        unknown = sorted(set(names or ()) - set(known))
+        if unknown:
+            raise ValueError(f"Unknown benchmark: {', '.join(unknown)}")
+        results = [
+            measure(benchmark, repeat)
+            for benchmark in benchmarks
+            if not names or benchmark.name in names
+        ]
+    return {
+        "generated_at": utc_now(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(
+    report: Mapping[str, Any], baseline: Mapping[str, Any], tolerance: float = 0.25
+) -> list[dict[str, Any]]:
+    """Compare timings and peak memory with ``baseline``, flagging regressions.
+
+    A benchmark regresses when it is more than ``tolerance`` slower or uses
+    more than ``tolerance`` more peak memory than in the baseline.
+    """
+
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    rows = []
+    for result in report["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        time_ratio = result["seconds"] / before["seconds"] if before["seconds"] else 1.0
+        memory_ratio = (
+            result["peak_memory_bytes"] / before["peak_memory_bytes"]
+            if before["peak_memory_bytes"]
+            else 1.0
+        )
+        rows.append(
+            {
+                "name": result["name"],
+                "time_ratio": round(time_ratio, 3),
+                "memory_ratio": round(memory_ratio, 3),
+                "regressed": max(time_ratio, memory_ratio) > 1 + tolerance,
+            }
+        )
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--only", action="append", help="Run only this benchmark; repeatable"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--sections", type=int, default=2000)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown or memory growth against the baseline",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        report = run_suite(
+            args.only,
+            repeat=args.repeat,
+            records=args.records,
+            page_size=args.page_size,
+            sections=args.sections,
+        )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    regressed = False
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["comparison"] = compare(report, baseline, args.tolerance)
+        regressed = any(row["regressed"] for row in report["comparison"])
+    _write_result(report, args.output)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
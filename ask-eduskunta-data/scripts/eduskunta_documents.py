@@ -0,0 +1,287 @@
+"""Bulk document text extraction for Parliament of Finland Open Data documents.
+
+Uses only the Python standard library. Document HTML is fetched by a thread
+pool while a process pool turns the finished pages into traceable text blocks,
+so network waits and HTML parsing overlap and parsing uses every CPU core.
+Results stream out one document at a time. A matter bundle fetches a matter
+and the documents, votes and plenary record items that verify it in one run.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, Sequence
+
+from eduskunta_api import (
+    ApiError,
+    EduskuntaClient,
+    _drain,
+    extract_html_blocks,
+    utc_now,
+)
+from eduskunta_records import record_value
+
+
+def _parse(html: str) -> list[dict[str, Any]]:
+    return extract_html_blocks(html)
+
+
+def edk_identifiers(data: Any, *, depth: int = 6) -> list[str]:
+    """Collect the distinct ``edktunnus`` values of a documents listing in order."""
+
+    found: dict[str, None] = {}
+
+    def walk(value: Any, level: int) -> None:
+        if level > depth:
+            return
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key == "edktunnus":
+                    if isinstance(item, dict):
+                        item = item.get("fi", item.get("sv"))
+                    if isinstance(item, str) and item:
+                        found.setdefault(item, None)
+                else:
+                    walk(item, level + 1)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item, level + 1)
+
+    walk(data, 0)
+    return list(found)
+
+
+def document_texts(
+    client: EduskuntaClient,
+    identifiers: Iterable[str],
+    *,
+    fetch_workers: int = 4,
+    parse_workers: int | None = None,
+    ordered: bool = False,
+    summary: dict[str, Any] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield ``document-text`` envelopes for many EDK identifiers.
+
+    Items carry ``index`` and ``identifier`` like :meth:`EduskuntaClient.batch`
+    items; a document that cannot be fetched or parsed yields an ``error``
+    item. ``parse_workers=0`` parses in the fetching threads instead of a
+    process pool. When ``summary`` is given it is filled in at the end with
+    the counts, elapsed seconds and documents per second.
+    """
+
+    if fetch_workers < 1:
+        raise ValueError("fetch_workers must be at least 1")
+    if parse_workers is not None and parse_workers < 0:
+        raise ValueError("parse_workers must not be negative")
+    summary = {} if summary is None else summary
+    started = time.perf_counter()
+    documents = errors = 0
+    parse_count = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+    parsers: Executor | None = None
+    if parse_count:
+        parsers = ProcessPoolExecutor(max_workers=parse_count)
+    window = 2 * (fetch_workers + parse_count)
+    try:
+        with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers:
+            pending: deque[Future[dict[str, Any]]] = deque()
+            for index, identifier in enumerate(identifiers):
+                pending.append(_submit(fetchers, parsers, client, index, identifier))
+                if len(pending) >= window:
+                    for item in _drain(pending, ordered, until=window - 1):
+                        documents += 1
+                        errors += "error" in item
+                        yield item
+            for item in _drain(pending, ordered, until=0):
+                documents += 1
+                errors += "error" in item
+                yield item
+    finally:
+        if parsers is not None:
+            parsers.shutdown(cancel_futures=True)
+    elapsed = time.perf_counter() - started
+    summary.update(
+        documents=documents,
+        errors=errors,
+        seconds=round(elapsed, 3),
+        documents_per_second=round(documents / elapsed, 2) if elapsed > 0 else None,
+    )
+
+
+def _submit(
+    fetchers: Executor,
+    parsers: Executor | None,
+    client: EduskuntaClient,
+    index: int,
+    identifier: str,
+) -> Future[dict[str, Any]]:
+    """Chain a fetch in ``fetchers`` to a parse in ``parsers``; return one future."""
+
+    item: Future[dict[str, Any]] = Future()
+
+    def fail(exc: BaseException) -> None:
+        item.set_result({"index": index, "identifier": identifier, "error": str(exc)})
+
+    def fetched(fetch: Future[dict[str, Any]]) -> None:
+        try:
+            envelope = fetch.result()
+        except (ApiError, ValueError, OSError) as exc:
+            fail(exc)
+            return
+        except BaseException as exc:
+            item.set_exception(exc)
+            return
+
+        def finish(blocks: list[dict[str, Any]]) -> None:
+            item.set_result(
+                {
+                    "index": index,
+                    "identifier": identifier,
+                    "trace": envelope["trace"],
+                    "request": None,
+                    "data": {
+                        "edktunnus": identifier,
+                        "source_url": envelope["trace"]["final_url"],
+                        "blocks": blocks,
+                    },
+                }
+            )
+
+        if parsers is None:
+            try:
+                finish(_parse(envelope["data"]))
+            except Exception as exc:  # one broken document must not stop the run
+                fail(exc)
+            return
+
+        def parsed(parse: Future[list[dict[str, Any]]]) -> None:
+            try:
+                blocks = parse.result()
+            except Exception as exc:  # includes a broken or shut-down pool
+                fail(exc)
+                return
+            finish(blocks)
+
+        try:
+            parsers.submit(_parse, envelope["data"]).add_done_callback(parsed)
+        except RuntimeError as exc:
+            fail(exc)
+
+    fetchers.submit(client.document_html, identifier).add_done_callback(fetched)
+    return item
+
+
+def document_text(client: EduskuntaClient, edktunnus: str) -> dict[str, Any]:
+    """Fetch one document's HTML and return its text blocks as an envelope."""
+
+    envelope = client.document_html(edktunnus)
+    envelope["data"] = {
+        "edktunnus": edktunnus,
+        "source_url": envelope["trace"]["final_url"],
+        "blocks": extract_html_blocks(envelope["data"]),
+    }
+    return envelope
+
+
+def matter_bundle(
+    client: EduskuntaClient,
+    identifier: str,
+    *,
+    html: bool = False,
+    records: Sequence[str] | None = None,
+    workers: int = 6,
+) -> dict[str, Any]:
+    """Fetch a matter and the resources that verify it as one envelope.
+
+    The matter detail is fetched first and its ``eduskuntatunnus`` keys the
+    rest: the document listing, the votes and the plenary record items run
+    concurrently, and once the listing arrives the metadata of each EDK
+    document, plus its text blocks when ``html`` is set, joins the same pool.
+    ``records`` replaces the default record item, the matter's own tunnus.
+    Every part keeps its own trace. A failing part other than the matter is
+    listed in ``data["errors"]`` and does not stop the others.
+    """
+
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    started = time.perf_counter()
+    matter = client.matter(identifier)
+    found = record_value(matter["data"], "eduskuntatunnus")
+    tunnus = found if isinstance(found, str) and found else identifier
+    items = list(records) if records else [tunnus]
+    trace: dict[str, Any] = {
+        "matter": matter["trace"],
+        "documents": None,
+        "document_metadata": {},
+        "votes": None,
+        "records": {},
+    }
+    data: dict[str, Any] = {
+        "eduskuntatunnus": tunnus,
+        "matter": matter["data"],
+        "documents": None,
+        "edk_identifiers": [],
+        "document_metadata": {},
+        "votes": None,
+        "records": {},
+    }
+    if html:
+        trace["document_texts"] = {}
+        data["document_texts"] = {}
+    errors: list[dict[str, Any]] = []
+
+    def collect(part: str, key: str | None, future: Future[dict[str, Any]]) -> None:
+        try:
+            envelope = future.result()
+        except (ApiError, ValueError, OSError) as exc:
+            errors.append(
+                {"part": part, "identifier": key or tunnus, "error": str(exc)}
+            )
+            return
+        if key is None:
+            trace[part] = envelope["trace"]
+            data[part] = envelope["data"]
+        else:
+            trace[part][key] = envelope["trace"]
+            data[part][key] = envelope["data"]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        listing = pool.submit(client.documents, tunnus)
+        parts: list[tuple[str, str | None, Future[dict[str, Any]]]] = [
+            ("votes", None, pool.submit(client.matter_votes, tunnus))
+        ]
+        parts.extend(
+            ("records", item, pool.submit(client.record_html, item)) for item in items
+        )
+        collect("documents", None, listing)
+        if data["documents"] is not None:
+            data["edk_identifiers"] = edk_identifiers(data["documents"])
+        for edktunnus in data["edk_identifiers"]:
+            parts.append(
+                (
+                    "document_metadata",
+                    edktunnus,
+                    pool.submit(client.document, edktunnus),
+                )
+            )
+            if html:
+                parts.append(
+                    (
+                        "document_texts",
+                        edktunnus,
+                        pool.submit(document_text, client, edktunnus),
+                    )
+                )
+        for part, key, future in parts:
+            collect(part, key, future)
+    trace["retrieved_at"] = utc_now()
+    trace["seconds"] = round(time.perf_counter() - started, 3)
+    data["errors"] = errors
+    data["complete"] = not errors
+    return {
+        "trace": trace,
+        "request": {"identifier": identifier, "html": html, "records": items},
+        "data": data,
+    }
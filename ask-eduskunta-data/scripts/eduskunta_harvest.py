@@ -0,0 +1,498 @@
+"""Columnar harvesters for large Parliament of Finland Open Data API extracts.
+
+Uses only the Python standard library; Parquet output is written with
+``pyarrow`` when it is installed. Records are streamed from
+:meth:`eduskunta_api.EduskuntaClient.iter_search` straight into typed column
+arrays, so no per-row objects are kept. Low-cardinality text columns are
+dictionary-encoded, which turns joins such as type code to type name into one
+lookup per distinct value. Speeches are harvested per plenary session in
+parallel and streamed as records.
+"""
+
+from __future__ import annotations
+
+import csv
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence
+
+from eduskunta_api import (
+    ApiError,
+    EduskuntaClient,
+    PartitionAxis,
+    _count_value,
+    _drain,
+    _with_conditions,
+    utc_now,
+)
+from eduskunta_records import iso_date, localised, record_value, scalar
+from eduskunta_reference import ReferenceRegistry, reference_names
+
+MATTER_COLUMNS = (
+    "tunnus",
+    "asiakirjatyyppikoodi",
+    "asiakirjatyyppi",
+    "asiatyyppi",
+    "valtiopaivavuosi",
+    "anto_pvm",
+    "tilanne",
+    "kasittely_paattynyt",
+)
+TABLE_FORMATS = ("csv", "parquet")
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+MAX_SESSION_NUMBER = 1024
+# The session probe asks whether any of this many consecutive sessions has
+# speeches, so a run of shorter gaps does not end the search early.
+SESSION_PROBE_WIDTH = 8
+
+
+class Categorical:
+    """Dictionary-encoded text column; code 0 stands for a missing value."""
+
+    def __init__(self) -> None:
+        self.codes = array("I")
+        self.categories: list[str | None] = [None]
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, value: str | None) -> None:
+        if value is None:
+            self.codes.append(0)
+            return
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.categories)
+            self.categories.append(value)
+        self.codes.append(code)
+
+    def mapped(self, lookup: Mapping[str, str]) -> "Categorical":
+        """Return a column sharing these codes with every category looked up."""
+
+        column = Categorical()
+        column.codes = self.codes
+        column.categories = [
+            None if category is None else lookup.get(category)
+            for category in self.categories
+        ]
+        return column
+
+    def values(self) -> Iterator[str | None]:
+        categories = self.categories
+        return (categories[code] for code in self.codes)
+
+
+class MatterColumns:
+    """Typed columns of ``valtiopaivaasia`` search records.
+
+    Dates are day numbers (``date.toordinal``) with 0 for a missing date, and
+    the year is an unsigned short with 0 for a missing year.
+    """
+
+    def __init__(self) -> None:
+        self.tunnus: list[str | None] = []
+        self.type_code = Categorical()
+        self.type_label = Categorical()
+        self.type_name = Categorical()
+        self.year = array("H")
+        self.submitted = array("i")
+        self.status = Categorical()
+        self.closed = array("i")
+
+    def __len__(self) -> int:
+        return len(self.tunnus)
+
+    def append(self, record: Mapping[str, Any]) -> None:
+        matter = record.get("valtiopaivaasia")
+        if not isinstance(matter, dict):
+            matter = record
+        decision = localised(matter.get("kokonaispaatosnimi"))
+        closed = None
+        if decision is None:
+            status = localised(matter.get("tila"))
+        else:
+            status = decision
+            # ISO dates order as text, so only the latest one is parsed.
+            events = localised(matter.get("kasittelyt")) or []
+            closed = max(
+                (
+                    day
+                    for event in events
+                    if isinstance(event, dict)
+                    for day in [iso_date(event.get("tapahtumapvm"))]
+                    if day is not None
+                ),
+                default=None,
+            )
+        year = localised(matter.get("valtiopaivavuosi"))
+        self.tunnus.append(scalar(matter.get("eduskuntatunnus")))
+        self.type_code.append(scalar(matter.get("asiakirjatyyppikoodi")))
+        self.type_label.append(scalar(matter.get("asiakirjatyyppinimi")))
+        self.year.append(int(year) if str(year or "").isdigit() else 0)
+        self.submitted.append(_day_number(iso_date(matter.get("laadintapvm"))))
+        self.status.append(None if status is None else str(status))
+        self.closed.append(_day_number(closed))
+
+    def join_type_names(self, names: Mapping[str, str]) -> None:
+        self.type_name = self.type_code.mapped(names)
+
+    def columns(self) -> dict[str, Any]:
+        type_name = self.type_name
+        if len(type_name) != len(self):
+            type_name = self.type_code.mapped({})
+        return dict(
+            zip(
+                MATTER_COLUMNS,
+                (
+                    self.tunnus,
+                    self.type_code,
+                    self.type_label,
+                    type_name,
+                    self.year,
+                    self.submitted,
+                    self.status,
+                    self.closed,
+                ),
+            )
+        )
+
+
+def _day_number(value: str | None) -> int:
+    if value is None:
+        return 0
+    try:
+        return date(int(value[:4]), int(value[5:7]), int(value[8:10])).toordinal()
+    except ValueError:
+        return 0
+
+
+def _matter_payload(
+    years: Sequence[int], types: Sequence[str] | None, payload: Mapping[str, Any] | None
+) -> dict[str, Any]:
+    request = dict(payload or {})
+    request["category"] = "valtiopaivaasia"
+    clauses = [request["expression"]] if request.get("expression") else []
+    years_clause = [
+        {"property": "valtiopaivavuosi.fi", "match": str(year)} for year in years
+    ]
+    clauses.append(years_clause[0] if len(years_clause) == 1 else {"or": years_clause})
+    if types:
+        matches = [
+            {"property": "asiakirjatyyppikoodi.fi", "match": code} for code in types
+        ]
+        clauses.append(matches[0] if len(matches) == 1 else {"or": matches})
+    request["expression"] = clauses[0] if len(clauses) == 1 else {"and": clauses}
+    return request
+
+
+def harvest_matters(
+    client: EduskuntaClient,
+    years: Sequence[int],
+    *,
+    types: Sequence[str] | None = None,
+    payload: Mapping[str, Any] | None = None,
+    method: str = "auto",
+    registry: ReferenceRegistry | None = None,
+) -> tuple[MatterColumns, dict[str, Any]]:
+    """Harvest matters of ``years`` (and ``types``) into typed columns.
+
+    The search is partitioned by ``valtiopaivavuosi`` only where a part would
+    exceed the API result limit. Type names come from ``registry`` when given
+    and otherwise from ``/reference-data/asiatyypit``. Returns the columns and
+    the audit trace.
+    """
+
+    if not years:
+        raise ValueError("harvest_matters needs at least one year")
+    ordered = sorted(set(years))
+    if ordered != list(range(ordered[0], ordered[-1] + 1)):
+        raise ValueError("years must form a contiguous range")
+    request = _matter_payload(ordered, types, payload)
+    axis = PartitionAxis(
+        "valtiopaivavuosi.fi", str(ordered[0]), str(ordered[-1] + 1), "match"
+    )
+    columns = MatterColumns()
+    trace: dict[str, Any] = {}
+    for record in client.iter_search(
+        request, method=method, partitions=[axis], trace=trace
+    ):
+        columns.append(record)
+    if registry is None:
+        reference = client.reference("asiatyypit")
+        columns.join_type_names(reference_names(reference["data"]))
+        trace["reference"] = reference["trace"]
+    else:
+        columns.join_type_names(registry.names("asiatyypit"))
+        trace["reference"] = registry.traces.get("asiatyypit")
+    trace["retrieved_at"] = utc_now()
+    return columns, trace
+
+
+def _speech_payload(
+    year: int,
+    types: Sequence[str] | None,
+    payload: Mapping[str, Any] | None,
+    speakers: Sequence[str] = (),
+) -> dict[str, Any]:
+    request = dict(payload or {})
+    request["category"] = "puheenvuoro"
+    clauses = [request["expression"]] if request.get("expression") else []
+    clauses.append({"property": "valtiopaivavuosi", "match": str(year)})
+    if types:
+        matches = [
+            {"property": "puheenvuorotyyppikoodi", "match": code} for code in types
+        ]
+        clauses.append(matches[0] if len(matches) == 1 else {"or": matches})
+    if speakers:
+        clauses.append(
+            {"termWithIds": {"term": "puhuja.henkilonro", "ids": list(speakers)}}
+        )
+    request["expression"] = clauses[0] if len(clauses) == 1 else {"and": clauses}
+    return request
+
+
+def _session_condition(numbers: Iterable[int]) -> dict[str, Any]:
+    """Match ``taysistuntonumero`` as text, as the search index stores it."""
+
+    matches = [
+        {"property": "taysistuntonumero", "match": str(number)} for number in numbers
+    ]
+    return matches[0] if len(matches) == 1 else {"or": matches}
+
+
+def speech_sessions(
+    client: EduskuntaClient,
+    payload: Mapping[str, Any],
+    *,
+    traces: list[dict[str, Any]] | None = None,
+) -> range:
+    """Return the session numbers 1..last that ``payload``'s speeches fall in.
+
+    ``taysistuntonumero`` is matched as text, so each probe counts the
+    speeches of a window of ``SESSION_PROBE_WIDTH`` sessions. A binary search
+    finds the last window with speeches, assuming no longer gap between
+    sessions, and a second one the last session inside it; a year costs about
+    a dozen count requests. Count traces are appended to ``traces``.
+    """
+
+    def any_in(low: int, high: int) -> bool:
+        condition = _session_condition(range(low, min(high, MAX_SESSION_NUMBER + 1)))
+        result = client.count(_with_conditions(payload, [condition]), method="auto")
+        if traces is not None:
+            traces.append(result["trace"])
+        return _count_value(result["data"]) > 0
+
+    def last_true(low: int, high: int, probe: Callable[[int], bool]) -> int:
+        while high - low > 1:
+            middle = (low + high) // 2
+            if probe(middle):
+                low = middle
+            else:
+                high = middle
+        return low
+
+    width = SESSION_PROBE_WIDTH
+    if not any_in(1, 1 + width):
+        return range(1, 1)
+    start = last_true(
+        1, MAX_SESSION_NUMBER + 1, lambda number: any_in(number, number + width)
+    )
+    end = start + width
+    last = last_true(start, end, lambda number: any_in(number, end))
+    return range(1, last + 1)
+
+
+def harvest_speeches(
+    client: EduskuntaClient,
+    year: int,
+    *,
+    speakers: Iterable[str] | None = None,
+    types: Sequence[str] | None = None,
+    payload: Mapping[str, Any] | None = None,
+    sessions: Iterable[int] | None = None,
+    workers: int = 4,
+    method: str = "auto",
+    ordered: bool = False,
+    summary: dict[str, Any] | None = None,
+) -> Iterator[Any]:
+    """Yield the ``puheenvuoro`` records of one valtiopäivävuosi.
+
+    A year can hold more than 10 000 speeches, so each plenary session is
+    searched on its own and ``workers`` sessions are fetched at once; the
+    client's rate limiter keeps them within the request budget. Sessions come
+    from :func:`speech_sessions` unless ``sessions`` is given. Records are
+    yielded as their session completes, or in session order when ``ordered``
+    is set, and each ``id`` only once. The session range is probed on the
+    year alone, since a sparse speaker or type leaves gaps the probe cannot
+    step over; afterwards the records received are checked against a count of
+    the whole search, and a difference marks the harvest incomplete. ``types`` filters
+    ``puheenvuorotyyppikoodi`` and ``speakers`` filter ``puhuja.henkilonro``
+    (``termWithIds``) in the search; speakers are matched locally as well, as
+    the speaker filter is not reliable in every index. A session that fails is
+    listed in ``summary["errors"]`` and does not stop the others. When
+    ``summary`` is given it is filled in at the end with the counts, session
+    traces and elapsed seconds.
+    """
+
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    summary = {} if summary is None else summary
+    started = time.perf_counter()
+    wanted = sorted({str(speaker) for speaker in speakers or ()})
+    base = _speech_payload(year, types, payload, wanted)
+    count_traces: list[dict[str, Any]] = []
+    year_only = _speech_payload(year, None, None)
+    numbers = list(
+        speech_sessions(client, year_only, traces=count_traces)
+        if sessions is None
+        else sessions
+    )
+
+    def fetch(number: int) -> dict[str, Any]:
+        trace: dict[str, Any] = {}
+        session_payload = _with_conditions(base, [_session_condition([number])])
+        try:
+            records = list(
+                client.iter_search(session_payload, method=method, trace=trace)
+            )
+        except (ApiError, ValueError, OSError) as exc:
+            return {"session": number, "error": str(exc)}
+        return {"session": number, "records": records, "trace": trace}
+
+    seen: set[str] = set()
+    speeches = duplicates = received = 0
+    session_traces: list[dict[str, Any]] = []
+    errors: list[dict[str, Any]] = []
+
+    def emit(item: dict[str, Any]) -> Iterator[Any]:
+        nonlocal speeches, duplicates, received
+        if "error" in item:
+            errors.append(item)
+            return
+        records = item["records"]
+        session_traces.append(
+            {
+                "session": item["session"],
+                "records": len(records),
+                "pages": item["trace"]["pages"],
+                "complete": item["trace"]["complete"],
+            }
+        )
+        for record in records:
+            identifier = record_value(record, "id")
+            if identifier is not None:
+                if str(identifier) in seen:
+                    duplicates += 1
+                    continue
+                seen.add(str(identifier))
+            received += 1
+            if wanted and str(record_value(record, "henkilonro")) not in wanted:
+                continue
+            speeches += 1
+            yield record
+
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future[dict[str, Any]]] = deque()
+        for number in numbers:
+            pending.append(pool.submit(fetch, number))
+            if len(pending) >= window:
+                for item in _drain(pending, ordered, until=window - 1):
+                    yield from emit(item)
+        for item in _drain(pending, ordered, until=0):
+            yield from emit(item)
+    expected = None
+    if sessions is None:
+        try:
+            result = client.count(base, method="auto")
+        except (ApiError, ValueError, OSError) as exc:
+            errors.append({"session": None, "error": str(exc)})
+        else:
+            count_traces.append(result["trace"])
+            expected = _count_value(result["data"])
+    elapsed = time.perf_counter() - started
+    summary.update(
+        valtiopaivavuosi=year,
+        sessions=len(numbers),
+        speeches=speeches,
+        duplicates=duplicates,
+        expected=expected,
+        errors=errors,
+        complete=not errors
+        and expected in (None, received)
+        and all(trace["complete"] for trace in session_traces),
+        seconds=round(elapsed, 3),
+        session_traces=sorted(session_traces, key=lambda trace: trace["session"]),
+        count_traces=count_traces,
+        retrieved_at=utc_now(),
+    )
+
+
+def write_table(
+    table: MatterColumns, path: str | Path, table_format: str | None = None
+) -> str:
+    """Write ``table`` as CSV or Parquet and return the format used.
+
+    The format follows the file extension unless ``table_format`` is given.
+    """
+
+    target = Path(path)
+    chosen = table_format or ("parquet" if target.suffix == ".parquet" else "csv")
+    if chosen not in TABLE_FORMATS:
+        raise ValueError(f"Unknown table format: {chosen}")
+    columns = table.columns()
+    if chosen == "parquet":
+        _write_parquet(columns, target)
+    else:
+        _write_csv(columns, target)
+    return chosen
+
+
+def _column_values(column: Any) -> Iterable[Any]:
+    if isinstance(column, Categorical):
+        return column.values()
+    if isinstance(column, array) and column.typecode == "i":
+        return (date.fromordinal(day).isoformat() if day else None for day in column)
+    if isinstance(column, array):
+        return (value or None for value in column)
+    return column
+
+
+def _write_csv(columns: Mapping[str, Any], target: Path) -> None:
+    with target.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        writer.writerows(zip(*(_column_values(column) for column in columns.values())))
+
+
+def _write_parquet(columns: Mapping[str, Any], target: Path) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet output needs pyarrow; write CSV instead") from None
+
+    arrays = {}
+    for name, column in columns.items():
+        if isinstance(column, Categorical):
+            indices = pa.array(column.codes, type=pa.uint32())
+            arrays[name] = pa.DictionaryArray.from_arrays(
+                pc.if_else(pc.equal(indices, 0), None, indices),
+                pa.array(column.categories, type=pa.string()),
+            )
+        elif isinstance(column, array) and column.typecode == "i":
+            days = pa.array(column, type=pa.int32())
+            days = pc.if_else(pc.equal(days, 0), None, days)
+            arrays[name] = pc.subtract(days, EPOCH_ORDINAL).cast(pa.date32())
+        elif isinstance(column, array):
+            values = pa.array(column, type=pa.uint16())
+            arrays[name] = pc.if_else(pc.equal(values, 0), None, values)
+        else:
+            arrays[name] = pa.array(column, type=pa.string())
+    pq.write_table(pa.table(arrays), target)
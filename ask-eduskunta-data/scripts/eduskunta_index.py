@@ -0,0 +1,454 @@
+"""Local full-text index over extracted document blocks and speeches.
+
+Uses only the Python standard library. ``document-text`` and
+``document-texts`` blocks and ``puheenvuoro`` records are split into Finnish
+word tokens, and every token's positions are kept per block as varint-coded
+gaps, so one term's postings are a short run of bytes. The vocabulary is
+sorted: a prefix query such as ``tietosuoj*`` is one ``bisect`` range and
+covers the inflected forms the API's fuzzy ``query`` misses. Each hit names
+the ``edktunnus`` or speech ``id`` and the block index to cite.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import struct
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Sequence
+
+from eduskunta_api import _atomic_write_bytes, extract_html_blocks, utc_now
+from eduskunta_records import localised, record_value, scalar
+
+MAGIC = b"EDKFTI1\n"
+# Words keep inner hyphens, colons and apostrophes: EU-asetus, EU:n, vaa'an.
+WORD = re.compile(r"[^\W_]+(?:[-:'’][^\W_]+)*")
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+MIN_PREFIX = 2
+
+
+def tokenize(text: str) -> list[str]:
+    """Split ``text`` into lower-case Finnish word tokens in reading order.
+
+    Text is NFC-normalised so that ä and ö stay single letters. A colon
+    starts a case ending (``EU:n``, ``HE:ssä``, ``5:n``), which is dropped;
+    a hyphenated compound gives one token per part; an apostrophe marking a
+    syllable break (``vaa'an``) is removed from the word.
+    """
+
+    tokens = []
+    for match in WORD.finditer(unicodedata.normalize("NFC", text).casefold()):
+        for part in match.group().split("-"):
+            word = part.split(":", 1)[0].replace("'", "").replace("’", "")
+            if word:
+                tokens.append(word)
+    return tokens
+
+
+def _varints(values: Iterable[int]) -> bytes:
+    out = bytearray()
+    for value in values:
+        while value > 0x7F:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _read_varints(data: bytes | memoryview) -> Iterator[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes | memoryview) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def speech_blocks(record: Any) -> list[str]:
+    """Return the paragraphs of a ``puheenvuoro`` record's text."""
+
+    if isinstance(record, dict) and isinstance(record.get("puheenvuoro"), dict):
+        if "puheenvuoro" in record["puheenvuoro"]:
+            record = record["puheenvuoro"]
+    if not isinstance(record, dict):
+        return []
+    text = localised(record.get("puheenvuoro"))
+    if isinstance(text, str):
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    xml = localised(record.get("puheenvuoroXml"))
+    if isinstance(xml, str):
+        return [block["text"] for block in extract_html_blocks(xml)]
+    return []
+
+
+class TextIndex:
+    """Sorted vocabulary with varint positional postings for every block.
+
+    ``sources`` describe the indexed documents and speeches; block ``n`` is
+    block number ``block_numbers[n]`` of source ``block_sources[n]``. The
+    postings of ``terms[t]`` are ``postings[offsets[t]:offsets[t + 1]]``:
+    per block, the block gap, the position count and the position gaps.
+    """
+
+    def __init__(
+        self,
+        *,
+        sources: Sequence[Mapping[str, Any]],
+        block_sources: array,
+        block_numbers: array,
+        terms: Sequence[str],
+        offsets: array,
+        postings: bytes,
+        source: str | None = None,
+    ) -> None:
+        self.sources = list(sources)
+        self.block_sources = block_sources
+        self.block_numbers = block_numbers
+        self.terms = list(terms)
+        self.offsets = offsets
+        self.postings = postings
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self.block_sources)
+
+    def expand(self, prefix: str) -> range:
+        """Indexes of the terms that start with ``prefix``."""
+
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + "\U0010ffff", start)
+        return range(start, end)
+
+    def postings_of(self, term_index: int) -> dict[int, list[int]]:
+        """Decode one term's postings into block -> positions."""
+
+        values = _read_varints(
+            memoryview(self.postings)[
+                self.offsets[term_index] : self.offsets[term_index + 1]
+            ]
+        )
+        result: dict[int, list[int]] = {}
+        block = 0
+        for gap in values:
+            block += gap
+            position = 0
+            positions = []
+            for _ in range(next(values)):
+                position += next(values)
+                positions.append(position)
+            result[block] = positions
+        return result
+
+    def _matches(self, token: str, prefix: bool) -> dict[int, list[int]]:
+        if not prefix:
+            term = bisect_left(self.terms, token)
+            found = term < len(self.terms) and self.terms[term] == token
+            return self.postings_of(term) if found else {}
+        if len(token) < MIN_PREFIX:
+            raise ValueError(f"Prefix needs at least {MIN_PREFIX} letters: {token}*")
+        merged: dict[int, list[int]] = {}
+        for term in self.expand(token):
+            for block, positions in self.postings_of(term).items():
+                merged.setdefault(block, []).extend(positions)
+        return {block: sorted(positions) for block, positions in merged.items()}
+
+    def _phrase(self, words: Sequence[tuple[str, bool]]) -> dict[int, list[int]]:
+        """Blocks where ``words`` occur at consecutive positions, by start."""
+
+        matches = [self._matches(token, prefix) for token, prefix in words]
+        if len(matches) == 1:
+            return matches[0]
+        result = {}
+        for block in set(matches[0]).intersection(*matches[1:]):
+            later = [set(match[block]) for match in matches[1:]]
+            starts = [
+                start
+                for start in matches[0][block]
+                if all(
+                    start + step in positions for step, positions in enumerate(later, 1)
+                )
+            ]
+            if starts:
+                result[block] = starts
+        return result
+
+    def search(self, query: str, *, limit: int | None = 20) -> dict[str, Any]:
+        """Find the blocks that match every part of ``query``.
+
+        Parts are words, ``prefix*`` words and ``"quoted phrases"``. A word
+        that tokenises into several tokens, like ``EU-asetus``, is a phrase.
+        Hits are ranked by the number of matched positions.
+        """
+
+        clauses = _parse_query(query)
+        if not clauses:
+            raise ValueError("Query has no words")
+        found: dict[int, list[int]] | None = None
+        for clause in clauses:
+            matches = self._phrase(clause)
+            if found is None:
+                found = matches
+            else:
+                found = {
+                    block: found[block] + matches[block]
+                    for block in found
+                    if block in matches
+                }
+            if not found:
+                break
+        ranked = sorted(
+            (found or {}).items(), key=lambda item: (-len(item[1]), item[0])
+        )
+        hits = []
+        for block, positions in ranked[:limit]:
+            source = self.sources[self.block_sources[block]]
+            hits.append(
+                {
+                    **source,
+                    "block": self.block_numbers[block],
+                    "score": len(positions),
+                    "positions": sorted(set(positions)),
+                }
+            )
+        return {"total": len(ranked), "hits": hits}
+
+    def summary(self) -> dict[str, Any]:
+        kinds: dict[str, int] = {}
+        for source in self.sources:
+            kinds[source["kind"]] = kinds.get(source["kind"], 0) + 1
+        return {
+            "sources": kinds,
+            "blocks": len(self),
+            "terms": len(self.terms),
+            "postings_bytes": len(self.postings),
+        }
+
+    def save(self, path: str | Path) -> None:
+        """Write a JSON header followed by the block, offset and posting arrays."""
+
+        header = json.dumps(
+            {
+                "sources": self.sources,
+                "terms": self.terms,
+                "blocks": len(self),
+                "postings_bytes": len(self.postings),
+                "created_at": utc_now(),
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        _atomic_write_bytes(
+            Path(path),
+            b"".join(
+                (
+                    MAGIC,
+                    struct.pack("<Q", len(header)),
+                    header,
+                    _little_endian(self.block_sources),
+                    _little_endian(self.block_numbers),
+                    _little_endian(self.offsets),
+                    self.postings,
+                )
+            ),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TextIndex":
+        data = Path(path).read_bytes()
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a text index file: {path}")
+        offset = len(MAGIC)
+        (header_size,) = struct.unpack_from("<Q", data, offset)
+        offset += 8
+        header = json.loads(data[offset : offset + header_size].decode("utf-8"))
+        offset += header_size
+        view = memoryview(data)
+        arrays = []
+        for typecode, count in (
+            ("I", header["blocks"]),
+            ("I", header["blocks"]),
+            ("Q", len(header["terms"]) + 1),
+        ):
+            size = count * array(typecode).itemsize
+            arrays.append(_from_little_endian(typecode, view[offset : offset + size]))
+            offset += size
+        if len(data) - offset != header["postings_bytes"]:
+            raise ValueError(f"Truncated text index file: {path}")
+        return cls(
+            sources=header["sources"],
+            block_sources=arrays[0],
+            block_numbers=arrays[1],
+            terms=header["terms"],
+            offsets=arrays[2],
+            postings=data[offset:],
+            source=str(path),
+        )
+
+
+def _parse_query(query: str) -> list[list[tuple[str, bool]]]:
+    """Split a query into clauses of ``(token, is_prefix)`` phrase words."""
+
+    clauses = []
+    for quoted, word in QUERY_PART.findall(query):
+        text = quoted if quoted else word
+        words: list[tuple[str, bool]] = []
+        for part in text.split():
+            tokens = tokenize(part)
+            words.extend((token, False) for token in tokens)
+            if tokens and part.endswith("*"):
+                words[-1] = (tokens[-1], True)
+        if words:
+            clauses.append(words)
+    return clauses
+
+
+class TextIndexBuilder:
+    """Collects blocks and produces a :class:`TextIndex`.
+
+    Postings are encoded as blocks arrive, so the builder holds bytes rather
+    than position lists. A document or speech seen again is skipped.
+    """
+
+    def __init__(self) -> None:
+        self.skipped = 0
+        self._sources: list[dict[str, Any]] = []
+        self._seen: set[tuple[str, str]] = set()
+        self._block_sources = array("I")
+        self._block_numbers = array("I")
+        self._postings: dict[str, bytearray] = {}
+        self._last_block: dict[str, int] = {}
+
+    def _add_source(self, source: dict[str, Any], blocks: Iterable[str]) -> int:
+        key = (source["kind"], source["identifier"])
+        if key in self._seen:
+            self.skipped += 1
+            return 0
+        self._seen.add(key)
+        source_index = len(self._sources)
+        self._sources.append(source)
+        added = 0
+        for number, text in enumerate(blocks):
+            positions: dict[str, list[int]] = {}
+            for position, token in enumerate(tokenize(text)):
+                positions.setdefault(token, []).append(position)
+            block = len(self._block_sources)
+            self._block_sources.append(source_index)
+            self._block_numbers.append(number)
+            added += 1
+            for token, found in positions.items():
+                gaps = [found[0]] + [b - a for a, b in zip(found, found[1:])]
+                gap = block - self._last_block.get(token, 0)
+                self._last_block[token] = block
+                self._postings.setdefault(token, bytearray()).extend(
+                    _varints([gap, len(found), *gaps])
+                )
+        return added
+
+    def add_document(self, document: Mapping[str, Any]) -> int:
+        """Index the ``data`` of a ``document-text`` envelope."""
+
+        source = {"kind": "document", "identifier": document["edktunnus"]}
+        if document.get("source_url"):
+            source["source_url"] = document["source_url"]
+        blocks = sorted(document.get("blocks") or (), key=lambda block: block["index"])
+        return self._add_source(source, [block["text"] for block in blocks])
+
+    def add_speech(self, record: Any) -> int:
+        """Index a ``puheenvuoro`` record; one block per paragraph."""
+
+        identifier = scalar(record_value(record, "id"))
+        blocks = speech_blocks(record)
+        if identifier is None or not blocks:
+            return 0
+        source = {"kind": "speech", "identifier": identifier}
+        matter = record_value(record, "asia")
+        if isinstance(matter, dict):
+            tunnus = scalar(record_value(matter, "eduskuntatunnus"))
+            if tunnus:
+                source["eduskuntatunnus"] = tunnus
+        speaker = scalar(record_value(record, "henkilonro"))
+        if speaker:
+            source["henkilonro"] = speaker
+        return self._add_source(source, blocks)
+
+    def add_item(self, item: Mapping[str, Any]) -> int:
+        """Index one saved JSON or NDJSON item; returns the blocks added.
+
+        Accepted are ``document-text``, ``document-texts`` and
+        ``matter-bundle`` output, ``puheenvuoro`` search envelopes and the
+        records written by ``harvest-speeches``. Trailers and error items
+        add nothing.
+        """
+
+        if "trailer" in item or "error" in item:
+            return 0
+        data = item.get("data")
+        if isinstance(data, dict) and "blocks" in data and "edktunnus" in data:
+            return self.add_document(data)
+        if isinstance(data, dict) and isinstance(data.get("document_texts"), dict):
+            return sum(map(self.add_document, data["document_texts"].values()))
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            return sum(map(self.add_speech, data["results"]))
+        if "trace" in item:
+            return 0
+        return self.add_speech(item)
+
+    def build(self) -> TextIndex:
+        terms = sorted(self._postings)
+        offsets = array("Q", [0])
+        for term in terms:
+            offsets.append(offsets[-1] + len(self._postings[term]))
+        return TextIndex(
+            sources=self._sources,
+            block_sources=array("I", self._block_sources),
+            block_numbers=array("I", self._block_numbers),
+            terms=terms,
+            offsets=offsets,
+            postings=b"".join(bytes(self._postings[term]) for term in terms),
+        )
+
+
+def query_index(
+    index: TextIndex, action: str, *, query: str | None = None, limit: int = 20
+) -> dict[str, Any]:
+    """Answer ``summary``, ``search`` or ``terms`` as an envelope."""
+
+    if action == "summary":
+        data: Any = index.summary()
+    elif action in {"search", "terms"}:
+        if not query:
+            raise ValueError(f"{action} needs --query")
+        if action == "search":
+            data = index.search(query, limit=limit)
+        else:
+            prefix = tokenize(query.rstrip("*"))
+            if len(prefix) != 1:
+                raise ValueError("terms needs one word prefix")
+            data = [index.terms[term] for term in index.expand(prefix[0])][:limit]
+    else:
+        raise ValueError(f"Unknown text-index action: {action}")
+    return {
+        "trace": {"source": "local", "index": index.source, "queried_at": utc_now()},
+        "request": {"action": action, "query": query, "limit": limit},
+        "data": data,
+    }
@@ -0,0 +1,91 @@
+"""Field helpers for Parliament of Finland Open Data API records.
+
+Uses only the Python standard library. Search results wrap their fields in a
+category object, detail responses do not, and many values are localised as
+``{"fi": ..., "sv": ...}``; these helpers read both shapes the same way and
+prefer the Finnish value.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterable
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def localised(value: Any) -> Any:
+    """Return the Finnish, else the Swedish, value of a localised object."""
+
+    if isinstance(value, dict) and ("fi" in value or "sv" in value):
+        return value.get("fi", value.get("sv"))
+    return value
+
+
+def scalar(value: Any) -> str | None:
+    """Return ``value`` as text, naming a coded object by its name or code.
+
+    Lists and objects without ``nimi``, ``lyhenne`` or ``koodi`` give ``None``.
+    """
+
+    value = localised(value)
+    if isinstance(value, dict):
+        for key in ("nimi", "lyhenne", "koodi"):
+            if key in value:
+                return scalar(value[key])
+        return None
+    if value is None or isinstance(value, list):
+        return None
+    return str(value)
+
+
+def iso_date(value: Any) -> str | None:
+    """Return ``YYYY-MM-DD`` for ISO or Finnish ``d.m.yyyy`` dates."""
+
+    value = localised(value)
+    if not isinstance(value, str) or len(value) < 8:
+        return None
+    if value[4:5] == "-":
+        return value[:10]
+    day, _, rest = value.partition(".")
+    month, _, year = rest.partition(".")
+    year = year[:4]
+    if not (day.isdigit() and month.isdigit() and year.isdigit()):
+        return None
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def record_value(record: Any, name: str, *, depth: int = 4) -> Any:
+    """Find the first ``name`` field in a search record.
+
+    Search results wrap their fields in a category object and localise many
+    values as ``{"fi": ..., "sv": ...}``; the Finnish value is preferred.
+    """
+
+    if depth < 0:
+        return None
+    if isinstance(record, dict):
+        if name in record:
+            return localised(record[name])
+        for value in record.values():
+            found = record_value(value, name, depth=depth - 1)
+            if found is not None:
+                return found
+    return None
+
+
+def first_scalar(record: Any, names: Iterable[str]) -> str | None:
+    """Return the first of ``names`` that has a :func:`scalar` value."""
+
+    for name in names:
+        value = scalar(record_value(record, name))
+        if value is not None:
+            return value
+    return None
+
+
+def record_date(record: Any, name: str) -> str | None:
+    value = record_value(record, name)
+    if isinstance(value, str) and ISO_DATE.match(value):
+        return value[:10]
+    return None
@@ -0,0 +1,262 @@
+"""Reference-data registry for the Parliament of Finland Open Data API.
+
+Uses only the Python standard library. All ``/reference-data`` tables are
+fetched concurrently in one call and kept as a versioned JSON snapshot, so
+later runs need no network for them. Codes are looked up through per-table
+dictionaries, and days are mapped to valtiopäivät and vaalikaudet through
+sorted period indexes searched with ``bisect``.
+"""
+
+from __future__ import annotations
+
+import json
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping
+
+from eduskunta_api import (
+    REFERENCE_NAMES,
+    ApiError,
+    EduskuntaClient,
+    _atomic_write_bytes,
+    _fingerprint,
+    utc_now,
+)
+from eduskunta_records import iso_date, scalar
+
+SNAPSHOT_VERSION = 1
+CODE_FIELDS = ("lyhenne", "koodi", "tunnus", "asiatyyppikoodi", "asiakirjatyyppikoodi")
+NAME_FIELDS = ("nimi", "selite", "asiatyyppi", "asiatyyppinimi", "asiakirjatyyppinimi")
+PERIOD_CODE_FIELDS = CODE_FIELDS + ("valtiopaivavuosi", "vaalikausi", "vuosi")
+START_FIELDS = ("alkupvm", "alkupaiva", "alkamispvm", "aloituspvm", "alku", "alkaa")
+END_FIELDS = ("loppupvm", "loppupaiva", "paattymispvm", "paattymispaiva", "loppu")
+
+
+def _items(data: Any) -> Iterator[dict[str, Any]]:
+    """Yield the entries of a ``/reference-data`` body, wrapped or not."""
+
+    items = data
+    if isinstance(data, dict):
+        items = next(
+            (value for value in data.values() if isinstance(value, list)), [data]
+        )
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict):
+            yield item
+
+
+def _first_text(item: Mapping[str, Any], fields: Iterable[str]) -> str | None:
+    return next((scalar(item[key]) for key in fields if scalar(item.get(key))), None)
+
+
+def reference_names(data: Any) -> dict[str, str]:
+    """Map codes to Finnish names in a ``/reference-data`` response body."""
+
+    names: dict[str, str] = {}
+    for item in _items(data):
+        code = _first_text(item, CODE_FIELDS)
+        name = _first_text(item, NAME_FIELDS)
+        if code and name:
+            names[code] = name
+    return names
+
+
+@dataclass(frozen=True)
+class Period:
+    """One valtiopäivät or vaalikausi; ``end`` is None while it is ongoing."""
+
+    code: str | None
+    name: str | None
+    start: str
+    end: str | None = None
+
+
+def reference_periods(data: Any) -> list[Period]:
+    """Return the dated entries of a ``/reference-data`` body as periods."""
+
+    periods = []
+    for item in _items(data):
+        start = next(
+            (day for key in START_FIELDS for day in [iso_date(item.get(key))] if day),
+            None,
+        )
+        if start is None:
+            continue
+        end = next(
+            (day for key in END_FIELDS for day in [iso_date(item.get(key))] if day),
+            None,
+        )
+        periods.append(
+            Period(
+                _first_text(item, PERIOD_CODE_FIELDS),
+                _first_text(item, NAME_FIELDS),
+                start,
+                end,
+            )
+        )
+    return periods
+
+
+class PeriodIndex:
+    """Periods sorted by start day; a day is found with one binary search.
+
+    ISO dates order as text, so days are compared as strings. Where periods
+    overlap, the one that started last wins.
+    """
+
+    def __init__(self, periods: Iterable[Period]) -> None:
+        self.periods = sorted(periods, key=lambda period: period.start)
+        self._starts = [period.start for period in self.periods]
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def find(self, day: str | date) -> Period | None:
+        key = day.isoformat() if isinstance(day, date) else iso_date(day)
+        if key is None:
+            raise ValueError(f"Not a date: {day!r}")
+        position = bisect_right(self._starts, key) - 1
+        if position < 0:
+            return None
+        period = self.periods[position]
+        if period.end is not None and key > period.end:
+            return None
+        return period
+
+
+class ReferenceRegistry:
+    """Reference-data tables with code and date lookups that need no network.
+
+    ``tables`` maps reference-data names to response bodies and ``traces`` to
+    the audit traces of the requests that fetched them. Lookup tables are
+    built on first use.
+    """
+
+    def __init__(
+        self,
+        tables: Mapping[str, Any],
+        *,
+        traces: Mapping[str, Any] | None = None,
+        retrieved_at: str | None = None,
+    ) -> None:
+        unknown = sorted(set(tables) - REFERENCE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown reference-data name: {', '.join(unknown)}")
+        self.tables = dict(tables)
+        self.traces = dict(traces or {})
+        self.retrieved_at = retrieved_at or utc_now()
+        self._names: dict[str, dict[str, str]] = {}
+        self._periods: dict[str, PeriodIndex] = {}
+
+    @classmethod
+    def fetch(
+        cls,
+        client: EduskuntaClient,
+        names: Iterable[str] = REFERENCE_NAMES,
+        *,
+        workers: int | None = None,
+    ) -> "ReferenceRegistry":
+        """Fetch ``names`` concurrently; fails unless every table arrives."""
+
+        wanted = sorted(set(names))
+        if not wanted:
+            raise ValueError("ReferenceRegistry.fetch needs at least one name")
+        unknown = sorted(set(wanted) - REFERENCE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown reference-data name: {', '.join(unknown)}")
+        tables: dict[str, Any] = {}
+        traces: dict[str, Any] = {}
+        errors = []
+        for item in client.batch(
+            "reference", wanted, workers=workers or len(wanted), ordered=True
+        ):
+            if "error" in item:
+                errors.append(f"{item['identifier']}: {item['error']}")
+                continue
+            tables[item["identifier"]] = item["data"]
+            traces[item["identifier"]] = item["trace"]
+        if errors:
+            raise ApiError(f"Reference data incomplete: {'; '.join(errors)}")
+        return cls(tables, traces=traces)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ReferenceRegistry":
+        snapshot = json.loads(Path(path).read_text(encoding="utf-8"))
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported reference snapshot version: {snapshot.get('version')}"
+            )
+        if snapshot.get("digest") != _fingerprint(snapshot.get("tables")):
+            raise ValueError(f"Reference snapshot does not match its digest: {path}")
+        return cls(
+            snapshot["tables"],
+            traces=snapshot.get("traces"),
+            retrieved_at=snapshot.get("retrieved_at"),
+        )
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the tables; equal digests mean unchanged reference data."""
+
+        return _fingerprint(self.tables)
+
+    def save(self, path: str | Path) -> None:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "retrieved_at": self.retrieved_at,
+            "digest": self.digest,
+            "tables": self.tables,
+            "traces": self.traces,
+        }
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(
+            target, json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+        )
+
+    def _table(self, table: str) -> Any:
+        if table not in self.tables:
+            raise ValueError(f"Reference table not loaded: {table}")
+        return self.tables[table]
+
+    def names(self, table: str) -> dict[str, str]:
+        """Code to Finnish name mapping of ``table``."""
+
+        names = self._names.get(table)
+        if names is None:
+            names = self._names[table] = reference_names(self._table(table))
+        return names
+
+    def name(self, table: str, code: str) -> str | None:
+        return self.names(table).get(code)
+
+    def periods(self, table: str) -> PeriodIndex:
+        index = self._periods.get(table)
+        if index is None:
+            index = self._periods[table] = PeriodIndex(
+                reference_periods(self._table(table))
+            )
+        return index
+
+    def valtiopaivat_on(self, day: str | date) -> Period | None:
+        """The valtiopäivät in session on ``day``, if any."""
+
+        return self.periods("valtiopaivat").find(day)
+
+    def vaalikausi_on(self, day: str | date) -> Period | None:
+        """The vaalikausi (electoral term) that ``day`` falls in, if any."""
+
+        return self.periods("vaalikaudet").find(day)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "retrieved_at": self.retrieved_at,
+            "digest": self.digest,
+            "tables": {
+                table: sum(1 for _ in _items(data))
+                for table, data in sorted(self.tables.items())
+            },
+        }
@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+"""Record/replay transports and a local stand-in for the Open Data API.
+
+Uses only the Python standard library. :class:`RecordingTransport` wraps a
+client transport and appends every exchange to an NDJSON cassette, and
+:class:`ReplayTransport` answers from a cassette without the network.
+:class:`StandInServer` serves ``/search`` pagination, ``/search/count``,
+``/aggregations/unique-by`` and detail endpoints over HTTP from a fixture
+corpus, with configurable latency, 302 redirects for large responses and
+``429`` with ``Retry-After`` once a request budget is spent. Harvest jobs and
+client throughput or concurrency changes can then be measured offline and
+repeatably without touching the shared API budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import gzip
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from eduskunta_api import (
+    DEFAULT_BASE_URL,
+    MAX_SEARCH_RESULTS,
+    HttpResponse,
+    PooledTransport,
+    Transport,
+    _atomic_write_bytes,
+    _header,
+)
+from eduskunta_records import localised
+
+API_PREFIX = urlsplit(DEFAULT_BASE_URL).path
+COMPUTED_PATHS = ("/search", "/search/count", "/aggregations/unique-by")
+DEFAULT_PAGE_SIZE = 100
+
+ExchangeKey = tuple[str, str, bytes | None]
+
+
+def _relative(url: str) -> str:
+    """Path and query of ``url`` below the API base path."""
+
+    parts = urlsplit(url)
+    path = parts.path
+    if path.startswith(API_PREFIX):
+        path = path[len(API_PREFIX) :] or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def _encode_body(body: bytes) -> dict[str, str]:
+    try:
+        return {"text": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(body).decode("ascii")}
+
+
+def _decode_body(value: Mapping[str, Any]) -> bytes:
+    if "json" in value:
+        return json.dumps(value["json"], ensure_ascii=False).encode("utf-8")
+    if "text" in value:
+        return value["text"].encode("utf-8")
+    return base64.b64decode(value["base64"])
+
+
+@dataclass(frozen=True)
+class Exchange:
+    """One recorded request and the response the transport returned."""
+
+    method: str
+    url: str
+    body: bytes | None
+    response: HttpResponse
+
+    @property
+    def key(self) -> ExchangeKey:
+        return self.method, _relative(self.url), self.body
+
+    def to_json(self) -> dict[str, Any]:
+        response = self.response
+        return {
+            "method": self.method,
+            "url": self.url,
+            "body": None if self.body is None else _encode_body(self.body),
+            "response": {
+                "status": response.status,
+                "headers": dict(response.headers),
+                "final_url": response.final_url,
+                "wire_bytes": response.wire_bytes,
+                **_encode_body(response.body),
+            },
+        }
+
+    @classmethod
+    def from_json(cls, value: Mapping[str, Any]) -> "Exchange":
+        response = value["response"]
+        return cls(
+            value["method"],
+            value["url"],
+            None if value.get("body") is None else _decode_body(value["body"]),
+            HttpResponse(
+                response["status"],
+                response.get("headers", {}),
+                _decode_body(response),
+                response.get("final_url", value["url"]),
+                response.get("wire_bytes"),
+            ),
+        )
+
+
+def read_cassette(path: str | Path) -> Iterator[Exchange]:
+    with Path(path).open(encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield Exchange.from_json(json.loads(line))
+
+
+class RecordingTransport:
+    """Wraps a transport and appends every exchange to an NDJSON cassette."""
+
+    def __init__(self, path: str | Path, transport: Transport | None = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.transport = transport or PooledTransport()
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> HttpResponse:
+        response = self.transport(method, url, body, headers, timeout)
+        line = json.dumps(
+            Exchange(method, url, body, response).to_json(), ensure_ascii=False
+        )
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+            self.recorded += 1
+        return response
+
+    def close(self) -> None:
+        close = getattr(self.transport, "close", None)
+        if close is not None:
+            close()
+
+
+class ReplayTransport:
+    """Answers requests from recorded exchanges without the network.
+
+    A request recorded several times gets its responses in recorded order
+    and then the last one again, so retries replay as they happened. A
+    request that was never recorded gets a 404 response.
+    """
+
+    def __init__(self, exchanges: Iterable[Exchange] | str | Path) -> None:
+        if isinstance(exchanges, (str, Path)):
+            exchanges = read_cassette(exchanges)
+        self._responses: dict[ExchangeKey, list[HttpResponse]] = {}
+        for exchange in exchanges:
+            self._responses.setdefault(exchange.key, []).append(exchange.response)
+        self._served: Counter[ExchangeKey] = Counter()
+        self._lock = threading.Lock()
+        self.misses = 0
+
+    def __call__(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> HttpResponse:
+        key = (method, _relative(url), body)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.misses += 1
+                message = f"Not in cassette: {method} {key[1]}".encode("utf-8")
+                return HttpResponse(404, {"Content-Type": "text/plain"}, message, url)
+            index = min(self._served[key], len(responses) - 1)
+            self._served[key] += 1
+        return responses[index]
+
+
+def _find(value: Any, name: str, depth: int = 4) -> Iterator[Any]:
+    """Values of every ``name`` field, looking inside category wrappers."""
+
+    if depth < 0:
+        return
+    if isinstance(value, dict):
+        if name in value:
+            yield value[name]
+            return
+        for item in value.values():
+            yield from _find(item, name, depth - 1)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _find(item, name, depth - 1)
+
+
+def _walk(value: Any, parts: Sequence[str]) -> Iterator[Any]:
+    if isinstance(value, list):
+        for item in value:
+            yield from _walk(item, parts)
+    elif not parts:
+        yield value
+    elif isinstance(value, dict) and parts[0] in value:
+        yield from _walk(value[parts[0]], parts[1:])
+
+
+def property_values(record: Any, path: str) -> list[Any]:
+    """Values at a dotted search ``property`` path; lists are flattened."""
+
+    first, *rest = path.split(".")
+    return [value for found in _find(record, first) for value in _walk(found, rest)]
+
+
+def _scalars(record: Any, path: str) -> list[Any]:
+    values = (localised(value) for value in property_values(record, path))
+    return [value for value in values if not isinstance(value, (dict, list))]
+
+
+def _text_match(value: Any, needle: Any) -> bool:
+    """Exact for single-token values such as codes, else word-prefix match."""
+
+    text, wanted = str(value).casefold(), str(needle).casefold()
+    words = text.split()
+    if len(words) <= 1:
+        return text == wanted
+    return all(any(word.startswith(part) for word in words) for part in wanted.split())
+
+
+def _number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def matches(record: Any, expression: Mapping[str, Any] | None) -> bool:
+    """Evaluate a search ``expression`` against one record.
+
+    An offline approximation of the API's operators: ``match`` is exact on
+    single-token values and a word-prefix match on longer text, and
+    ``match_phrase`` is a case-insensitive substring match.
+    """
+
+    if not expression:
+        return True
+    if "and" in expression:
+        return all(matches(record, item) for item in expression["and"])
+    if "or" in expression:
+        return any(matches(record, item) for item in expression["or"])
+    if "not" in expression:
+        return not matches(record, expression["not"])
+    if "ids" in expression:
+        wanted = {str(value) for value in expression["ids"]}
+        return any(str(value) in wanted for value in _scalars(record, "id"))
+    if "exists" in expression:
+        return any(
+            value is not None for value in _scalars(record, expression["exists"])
+        )
+    path = expression["property"]
+    if "with" in expression:
+        return any(
+            matches(item, expression["with"])
+            for item in property_values(record, path)
+            if isinstance(item, dict)
+        )
+    values = _scalars(record, path)
+    if "match" in expression:
+        return any(_text_match(value, expression["match"]) for value in values)
+    if "match_phrase" in expression:
+        phrase = str(expression["match_phrase"]).casefold()
+        return any(phrase in str(value).casefold() for value in values)
+    if "fromDate" in expression or "toDate" in expression:
+        low, high = expression.get("fromDate"), expression.get("toDate")
+        return any(
+            (low is None or low <= str(value)[:10])
+            and (high is None or str(value)[:10] < high)
+            for value in values
+        )
+    if "from" in expression or "to" in expression:
+        low, high = expression.get("from"), expression.get("to")
+        numbers = [number for number in map(_number, values) if number is not None]
+        return any(
+            (low is None or low <= number) and (high is None or number < high)
+            for number in numbers
+        )
+    if "boolValue" in expression:
+        wanted = str(bool(expression["boolValue"])).lower()
+        return any(str(value).lower() == wanted for value in values)
+    if "intValue" in expression:
+        return any(_number(value) == expression["intValue"] for value in values)
+    raise ValueError(f"Unsupported expression: {json.dumps(expression)}")
+
+
+class FixtureCorpus:
+    """Search records per category and detail response bodies per API path.
+
+    ``details`` keys are paths below the API base as the client sends them,
+    with identifiers percent-encoded, e.g. ``/valtiopaivaasiat/HE%201%2F2024%20vp``.
+    """
+
+    def __init__(
+        self,
+        records: Mapping[str, Iterable[Any]] | None = None,
+        details: Mapping[str, tuple[str, bytes]] | None = None,
+    ) -> None:
+        self.records = {
+            category: list(items) for category, items in (records or {}).items()
+        }
+        self.details = dict(details or {})
+
+    def add_detail(self, path: str, data: Any, content_type: str | None = None) -> None:
+        if isinstance(data, bytes):
+            body = data
+        elif isinstance(data, str):
+            body = data.encode("utf-8")
+        else:
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.details[path] = (content_type or "application/json", body)
+
+    def search(self, payload: Mapping[str, Any]) -> list[Any]:
+        """All records matching ``payload``, sorted; no paging."""
+
+        category = payload.get("category")
+        if category is None:
+            pool = [record for items in self.records.values() for record in items]
+        else:
+            pool = self.records.get(category, [])
+        words = str(payload.get("query") or "").casefold().split()
+        found = [
+            record
+            for record in pool
+            if matches(record, payload.get("expression"))
+            and all(
+                word in json.dumps(record, ensure_ascii=False).casefold()
+                for word in words
+            )
+        ]
+        for order in reversed(payload.get("sort") or []):
+            found.sort(
+                key=lambda record: [
+                    str(value) for value in _scalars(record, order["property"])
+                ],
+                reverse=not order.get("ascending", True),
+            )
+        return found
+
+    def search_page(self, payload: Mapping[str, Any]) -> dict[str, Any]:
+        start = int(payload.get("startFromIndex", 0))
+        size = int(payload.get("maxResults", DEFAULT_PAGE_SIZE))
+        if start < 0 or size < 0 or start + size > MAX_SEARCH_RESULTS:
+            raise ValueError(f"Result window exceeds {MAX_SEARCH_RESULTS} records")
+        found = self.search(payload)
+        page = found[start : start + size]
+        return {
+            "results": page,
+            "searchMetadata": {
+                "totalResultCount": len(found),
+                "actualResultCount": len(page),
+                "requestedResultCount": size,
+                "startFromIndex": start,
+                "maxScore": 1.0,
+            },
+        }
+
+    def count(self, payload: Mapping[str, Any]) -> dict[str, Any]:
+        return {"count": len(self.search(payload))}
+
+    def unique_by(self, payload: Mapping[str, Any]) -> dict[str, Any]:
+        """Distinct value combinations of ``agg.unique.terms`` with counts."""
+
+        terms = payload["agg"]["unique"]["terms"]
+        counts: Counter[tuple[Any, ...]] = Counter()
+        for record in self.search(payload):
+            counts[
+                tuple(next(iter(_scalars(record, term)), None) for term in terms)
+            ] += 1
+        return {
+            "results": [
+                {**dict(zip(terms, values)), "count": count}
+                for values, count in sorted(
+                    counts.items(), key=lambda item: (-item[1], str(item[0]))
+                )
+            ]
+        }
+
+    @classmethod
+    def from_exchanges(cls, exchanges: Iterable[Exchange]) -> "FixtureCorpus":
+        """Build a corpus from successful recorded exchanges.
+
+        Search pages contribute their records, deduplicated per category;
+        other GET responses become detail bodies. Counts and aggregations are
+        recomputed from the records, so they are not taken over.
+        """
+
+        corpus = cls()
+        seen: dict[str, set[str]] = {}
+        for exchange in exchanges:
+            response = exchange.response
+            if response.status != 200:
+                continue
+            relative = _relative(exchange.url)
+            path, _, query = relative.partition("?")
+            if path == "/search":
+                if exchange.method == "GET":
+                    payload = json.loads(parse_qs(query)["q"][0])
+                else:
+                    payload = json.loads(exchange.body or b"{}")
+                category = payload.get("category", "")
+                keys = seen.setdefault(category, set())
+                items = corpus.records.setdefault(category, [])
+                for record in json.loads(response.body).get("results", []):
+                    key = json.dumps(record, sort_keys=True, ensure_ascii=False)
+                    if key not in keys:
+                        keys.add(key)
+                        items.append(record)
+            elif exchange.method == "GET" and path not in COMPUTED_PATHS:
+                content_type = _header(response.headers, "Content-Type")
+                corpus.add_detail(relative, response.body, content_type)
+        return corpus
+
+    @classmethod
+    def load(cls, path: str | Path) -> "FixtureCorpus":
+        """Read a corpus JSON file or, for ``.ndjson``, a recorded cassette."""
+
+        if Path(path).suffix == ".ndjson":
+            return cls.from_exchanges(read_cassette(path))
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        corpus = cls(data.get("records"))
+        for detail_path, value in (data.get("details") or {}).items():
+            corpus.add_detail(
+                detail_path, _decode_body(value), value.get("content_type")
+            )
+        return corpus
+
+    def save(self, path: str | Path) -> None:
+        data = {
+            "records": self.records,
+            "details": {
+                detail_path: {"content_type": content_type, **_encode_body(body)}
+                for detail_path, (content_type, body) in sorted(self.details.items())
+            },
+        }
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(
+            target, json.dumps(data, ensure_ascii=False).encode("utf-8")
+        )
+
+
+@dataclass(frozen=True)
+class RequestBudget:
+    """At most ``requests`` per sliding ``window`` of seconds; then 429."""
+
+    requests: int
+    window: float
+
+
+def parse_budget(spec: str) -> tuple[str, RequestBudget]:
+    """Parse ``METHOD=REQUESTS/SECONDS``, e.g. ``POST=450/3000``."""
+
+    method, _, rest = spec.partition("=")
+    requests, _, window = rest.partition("/")
+    try:
+        budget = RequestBudget(int(requests), float(window))
+    except ValueError:
+        raise ValueError(f"Budget must look like POST=450/3000: {spec}") from None
+    return method.strip().upper(), budget
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._reply(*self.server.respond("GET", self.path, None))
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(*self.server.respond("POST", self.path, body))
+
+    def _reply(self, status: int, headers: Mapping[str, str], body: bytes) -> None:
+        if (
+            self.server.compress
+            and len(body) > 1024
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        ):
+            body = gzip.compress(body, compresslevel=1)
+            headers = {**headers, "Content-Encoding": "gzip"}
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local HTTP server that answers like the Open Data API from a corpus.
+
+    Every response waits ``latency`` seconds. A body larger than
+    ``redirect_bytes`` is served through a 302 redirect to a one-time blob
+    URL, as the API does for large results. ``budgets`` limit requests per
+    HTTP method; a request over its budget gets 429 with ``Retry-After``.
+    ``stats`` counts requests per route and the 302 and 429 responses.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        corpus: FixtureCorpus,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        redirect_bytes: int | None = None,
+        budgets: Mapping[str, RequestBudget] | None = None,
+        compress: bool = True,
+        clock: Any = time.monotonic,
+    ) -> None:
+        super().__init__((host, port), _StandInHandler)
+        self.corpus = corpus
+        self.latency = latency
+        self.redirect_bytes = redirect_bytes
+        self.budgets = dict(budgets or {})
+        self.compress = compress
+        self.clock = clock
+        self.stats: Counter[str] = Counter()
+        self._admitted: dict[str, deque[float]] = {}
+        self._blobs: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def _retry_after(self, method: str) -> float | None:
+        """Admit one request, or return how long until the budget allows it."""
+
+        budget = self.budgets.get(method)
+        if budget is None:
+            return None
+        now = self.clock()
+        with self._lock:
+            admitted = self._admitted.setdefault(method, deque())
+            while admitted and admitted[0] <= now - budget.window:
+                admitted.popleft()
+            if len(admitted) >= budget.requests:
+                return admitted[0] + budget.window - now
+            admitted.append(now)
+        return None
+
+    def respond(
+        self, method: str, target: str, body: bytes | None
+    ) -> tuple[int, dict[str, str], bytes]:
+        relative = _relative(target)
+        path, _, query = relative.partition("?")
+        with self._lock:
+            self.stats[f"{method} {path}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if path.startswith("/blobs/"):
+            with self._lock:
+                blob = self._blobs.pop(path, None)
+            if blob is None:
+                return 404, {"Content-Type": "text/plain"}, b"Blob expired"
+            return 200, {"Content-Type": "application/json"}, blob
+        wait = self._retry_after(method)
+        if wait is not None:
+            with self._lock:
+                self.stats["429"] += 1
+            return (
+                429,
+                {
+                    "Content-Type": "application/json",
+                    "Retry-After": str(math.ceil(wait)),
+                },
+                b'{"message": "Too Many Requests"}',
+            )
+        try:
+            if path in COMPUTED_PATHS:
+                if method == "GET":
+                    payload = json.loads(parse_qs(query)["q"][0])
+                else:
+                    payload = json.loads(body or b"{}")
+                handler = {
+                    "/search": self.corpus.search_page,
+                    "/search/count": self.corpus.count,
+                    "/aggregations/unique-by": self.corpus.unique_by,
+                }[path]
+                content_type = "application/json"
+                data = json.dumps(handler(payload), ensure_ascii=False).encode("utf-8")
+            elif method == "GET" and relative in self.corpus.details:
+                content_type, data = self.corpus.details[relative]
+            else:
+                return 404, {"Content-Type": "text/plain"}, b"Not in corpus"
+        except (KeyError, TypeError, ValueError) as exc:
+            message = json.dumps({"message": str(exc)}).encode("utf-8")
+            return 400, {"Content-Type": "application/json"}, message
+        if self.redirect_bytes is not None and len(data) > self.redirect_bytes:
+            with self._lock:
+                self.stats["302"] += 1
+                location = f"/blobs/{self.stats['302']}.json"
+                self._blobs[location] = data
+            return 302, {"Location": f"{API_PREFIX}{location}"}, b""
+        return 200, {"Content-Type": content_type}, data
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Serve a corpus or cassette over HTTP")
+    serve.add_argument(
+        "corpus", help="Corpus JSON file, or a recorded .ndjson cassette"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds before each response"
+    )
+    serve.add_argument(
+        "--redirect-bytes",
+        type=int,
+        help="Serve larger bodies through a 302 redirect",
+    )
+    serve.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="METHOD=REQUESTS/SECONDS",
+        help="Answer 429 with Retry-After beyond this budget; repeatable",
+    )
+
+    corpus = sub.add_parser("corpus", help="Turn a recorded cassette into a corpus")
+    corpus.add_argument("cassette", help="NDJSON cassette written by --record")
+    corpus.add_argument("output", help="Corpus JSON path")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "corpus":
+            corpus = FixtureCorpus.from_exchanges(read_cassette(args.cassette))
+            corpus.save(args.output)
+            summary = {
+                "records": {name: len(items) for name, items in corpus.records.items()},
+                "details": len(corpus.details),
+            }
+            print(json.dumps(summary, ensure_ascii=False))
+            return 0
+        budgets = dict(parse_budget(spec) for spec in args.budget)
+        server = StandInServer(
+            FixtureCorpus.load(args.corpus),
+            host=args.host,
+            port=args.port,
+            latency=args.latency,
+            redirect_bytes=args.redirect_bytes,
+            budgets=budgets,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    print(f"Serving {server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(dict(server.stats), ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,728 @@
+"""Local SQLite mirror of Parliament of Finland Open Data API records.
+
+Uses only the Python standard library. ``sync`` adds to one mirror per search
+category the records dated after the stored high-water mark, less a lookback;
+edits to older records are not picked up. ``ingest`` normalises audit envelopes from the other commands
+into indexed tables, and ``query`` answers from them without API calls. Every
+normalised row points at the retrieval trace it came from.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping
+from urllib.parse import urlparse
+
+from eduskunta_api import (
+    DEFAULT_BASE_URL,
+    EduskuntaClient,
+    PartitionAxis,
+    _with_conditions,
+    utc_now,
+)
+from eduskunta_records import first_scalar, localised, record_date, record_value, scalar
+
+
+@dataclass(frozen=True)
+class SyncSpec:
+    category: str
+    date_property: str
+    id_field: str
+
+
+SYNC_SPECS = {
+    "valtiopaivaasia": SyncSpec("valtiopaivaasia", "laadintapvm", "eduskuntatunnus"),
+    "puheenvuoro": SyncSpec("puheenvuoro", "aloitushetki", "id"),
+    "aanestys": SyncSpec("aanestys", "istuntopvm", "id"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    category TEXT NOT NULL,
+    id TEXT NOT NULL,
+    body TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    record_date TEXT,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (category, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    category TEXT PRIMARY KEY,
+    property TEXT NOT NULL,
+    high_water TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    trace TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS traces (
+    trace_id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    retrieved_at TEXT,
+    request TEXT,
+    trace TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matters (
+    eduskuntatunnus TEXT PRIMARY KEY,
+    asiakirjatyyppikoodi TEXT,
+    nimeke TEXT,
+    laadintapvm TEXT,
+    tila TEXT,
+    kokonaispaatosnimi TEXT,
+    body TEXT NOT NULL,
+    trace_id INTEGER REFERENCES traces (trace_id)
+);
+CREATE INDEX IF NOT EXISTS matters_type ON matters (asiakirjatyyppikoodi, laadintapvm);
+CREATE TABLE IF NOT EXISTS documents (
+    edktunnus TEXT PRIMARY KEY,
+    eduskuntatunnus TEXT,
+    asiakirjatyyppinimi TEXT,
+    laadintapvm TEXT,
+    body TEXT NOT NULL,
+    trace_id INTEGER REFERENCES traces (trace_id)
+);
+CREATE INDEX IF NOT EXISTS documents_matter ON documents (eduskuntatunnus);
+CREATE TABLE IF NOT EXISTS mps (
+    henkilonro TEXT PRIMARY KEY,
+    etunimi TEXT,
+    sukunimi TEXT,
+    eduskuntaryhma TEXT,
+    body TEXT NOT NULL,
+    trace_id INTEGER REFERENCES traces (trace_id)
+);
+CREATE INDEX IF NOT EXISTS mps_name ON mps (sukunimi, etunimi);
+CREATE TABLE IF NOT EXISTS votes (
+    vote_id TEXT PRIMARY KEY,
+    session_id TEXT,
+    istuntopvm TEXT,
+    eduskuntatunnus TEXT,
+    otsikko TEXT,
+    mitatoity INTEGER,
+    body TEXT NOT NULL,
+    trace_id INTEGER REFERENCES traces (trace_id)
+);
+CREATE INDEX IF NOT EXISTS votes_session ON votes (session_id);
+CREATE INDEX IF NOT EXISTS votes_matter ON votes (eduskuntatunnus);
+CREATE TABLE IF NOT EXISTS ballots (
+    vote_id TEXT NOT NULL,
+    henkilonro TEXT NOT NULL,
+    ballot TEXT,
+    eduskuntaryhma TEXT,
+    trace_id INTEGER REFERENCES traces (trace_id),
+    PRIMARY KEY (vote_id, henkilonro)
+);
+CREATE INDEX IF NOT EXISTS ballots_person ON ballots (henkilonro);
+CREATE TABLE IF NOT EXISTS speeches (
+    id TEXT PRIMARY KEY,
+    valtiopaivavuosi TEXT,
+    taysistuntonumero TEXT,
+    henkilonro TEXT,
+    eduskuntatunnus TEXT,
+    aloitushetki TEXT,
+    puheenvuorotyyppikoodi TEXT,
+    body TEXT NOT NULL,
+    trace_id INTEGER REFERENCES traces (trace_id)
+);
+CREATE INDEX IF NOT EXISTS speeches_session
+    ON speeches (valtiopaivavuosi, taysistuntonumero);
+CREATE INDEX IF NOT EXISTS speeches_person ON speeches (henkilonro);
+CREATE INDEX IF NOT EXISTS speeches_matter ON speeches (eduskuntatunnus);
+"""
+
+# Field names used inside per-MP vote events; the first one present wins.
+BALLOT_FIELDS = ("aani", "aanestyskanta", "kanta", "vote")
+GROUP_FIELDS = ("eduskuntaryhma", "ryhma", "ryhmaLyhenne")
+
+QUERIES = {
+    "matter": "SELECT * FROM matters WHERE eduskuntatunnus = :id",
+    "matter-documents": (
+        "SELECT edktunnus, asiakirjatyyppinimi, laadintapvm, trace_id "
+        "FROM documents WHERE eduskuntatunnus = :id ORDER BY laadintapvm"
+    ),
+    "matter-votes": (
+        "SELECT vote_id, session_id, istuntopvm, otsikko, mitatoity, trace_id "
+        "FROM votes WHERE eduskuntatunnus = :id ORDER BY istuntopvm, vote_id"
+    ),
+    "matter-ballots": (
+        "SELECT v.vote_id, v.otsikko, b.henkilonro, m.etunimi, m.sukunimi, "
+        "b.eduskuntaryhma, b.ballot, b.trace_id FROM votes v "
+        "JOIN ballots b ON b.vote_id = v.vote_id "
+        "LEFT JOIN mps m ON m.henkilonro = b.henkilonro "
+        "WHERE v.eduskuntatunnus = :id AND (:ballot IS NULL OR b.ballot = :ballot) "
+        "ORDER BY v.vote_id, m.sukunimi, m.etunimi"
+    ),
+    "vote-ballots": (
+        "SELECT b.henkilonro, m.etunimi, m.sukunimi, b.eduskuntaryhma, b.ballot, "
+        "b.trace_id FROM ballots b LEFT JOIN mps m ON m.henkilonro = b.henkilonro "
+        "WHERE b.vote_id = :id AND (:ballot IS NULL OR b.ballot = :ballot) "
+        "ORDER BY m.sukunimi, m.etunimi"
+    ),
+    "session-votes": (
+        "SELECT vote_id, eduskuntatunnus, otsikko, mitatoity, trace_id "
+        "FROM votes WHERE session_id = :id ORDER BY vote_id"
+    ),
+    "mp": "SELECT * FROM mps WHERE henkilonro = :id",
+    "mp-ballots": (
+        "SELECT b.vote_id, v.istuntopvm, v.eduskuntatunnus, v.otsikko, b.ballot, "
+        "b.trace_id FROM ballots b LEFT JOIN votes v ON v.vote_id = b.vote_id "
+        "WHERE b.henkilonro = :id ORDER BY v.istuntopvm, b.vote_id"
+    ),
+    "mp-speeches": (
+        "SELECT id, valtiopaivavuosi, taysistuntonumero, eduskuntatunnus, "
+        "aloitushetki, puheenvuorotyyppikoodi, trace_id FROM speeches "
+        "WHERE henkilonro = :id ORDER BY aloitushetki"
+    ),
+}
+
+
+def _entities(data: Any, marker: str) -> list[dict[str, Any]]:
+    """Return the entity objects in a detail response body.
+
+    An object carrying ``marker`` is one entity; otherwise the first list of
+    objects inside a wrapper is taken.
+    """
+
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    if not isinstance(data, dict):
+        return []
+    if record_value(data, marker, depth=1) is not None:
+        return [data]
+    for value in data.values():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            return _entities(value, marker)
+    return [data]
+
+
+class LocalStore:
+    """SQLite database holding mirrored records and sync high-water marks."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "LocalStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def upsert(
+        self, category: str, identifier: str, record: Any, day: str | None
+    ) -> str:
+        """Store a record and report whether it was new, changed or unchanged."""
+
+        body = json.dumps(record, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        row = self.connection.execute(
+            "SELECT hash FROM records WHERE category = ? AND id = ?",
+            (category, identifier),
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            return "unchanged"
+        self.connection.execute(
+            "INSERT INTO records (category, id, body, hash, record_date, synced_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (category, id) DO UPDATE SET body = excluded.body, "
+            "hash = excluded.hash, record_date = excluded.record_date, "
+            "synced_at = excluded.synced_at",
+            (category, identifier, body, digest, day, utc_now()),
+        )
+        return "new" if row is None else "changed"
+
+    def high_water(self, category: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT high_water FROM sync_state WHERE category = ?", (category,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water(
+        self, category: str, prop: str, value: str, trace: Mapping[str, Any]
+    ) -> None:
+        self.connection.execute(
+            "INSERT INTO sync_state (category, property, high_water, synced_at, trace) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (category) DO UPDATE SET property = excluded.property, "
+            "high_water = excluded.high_water, synced_at = excluded.synced_at, "
+            "trace = excluded.trace",
+            (category, prop, value, utc_now(), json.dumps(trace, ensure_ascii=False)),
+        )
+
+    def add_trace(
+        self, source: str, trace: Mapping[str, Any], request: Any = None
+    ) -> int:
+        cursor = self.connection.execute(
+            "INSERT INTO traces (source, retrieved_at, request, trace) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                source,
+                trace.get("retrieved_at"),
+                json.dumps(request, ensure_ascii=False),
+                json.dumps(trace, ensure_ascii=False),
+            ),
+        )
+        return int(cursor.lastrowid)
+
+    def update_trace(self, trace_id: int, trace: Mapping[str, Any]) -> None:
+        self.connection.execute(
+            "UPDATE traces SET retrieved_at = ?, trace = ? WHERE trace_id = ?",
+            (
+                trace.get("retrieved_at"),
+                json.dumps(trace, ensure_ascii=False),
+                trace_id,
+            ),
+        )
+
+    def index_record(self, category: str, record: Any, trace_id: int) -> None:
+        """Normalise one search result of ``category`` into its table."""
+
+        indexer = {
+            "valtiopaivaasia": self.index_matter,
+            "asiakirja": self.index_document,
+            "kansanedustaja": self.index_mp,
+            "aanestys": self.index_vote,
+            "puheenvuoro": self.index_speech,
+        }.get(category)
+        if indexer is not None:
+            indexer(record, trace_id)
+
+    def _replace(self, table: str, row: Mapping[str, Any]) -> None:
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{name}" for name in row)
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})", row
+        )
+
+    def index_matter(self, record: Any, trace_id: int) -> None:
+        identifier = scalar(record_value(record, "eduskuntatunnus"))
+        if identifier is None:
+            return
+        self._replace(
+            "matters",
+            {
+                "eduskuntatunnus": identifier,
+                "asiakirjatyyppikoodi": scalar(
+                    record_value(record, "asiakirjatyyppikoodi")
+                ),
+                "nimeke": first_scalar(record, ("nimeke", "nimeketeksti", "otsikko")),
+                "laadintapvm": record_date(record, "laadintapvm"),
+                "tila": scalar(record_value(record, "tila")),
+                "kokonaispaatosnimi": scalar(
+                    record_value(record, "kokonaispaatosnimi")
+                ),
+                "body": json.dumps(record, ensure_ascii=False),
+                "trace_id": trace_id,
+            },
+        )
+
+    def index_document(self, record: Any, trace_id: int) -> None:
+        identifier = scalar(record_value(record, "edktunnus"))
+        if identifier is None:
+            return
+        self._replace(
+            "documents",
+            {
+                "edktunnus": identifier,
+                "eduskuntatunnus": scalar(record_value(record, "eduskuntatunnus")),
+                "asiakirjatyyppinimi": scalar(
+                    record_value(record, "asiakirjatyyppinimi")
+                ),
+                "laadintapvm": record_date(record, "laadintapvm"),
+                "body": json.dumps(record, ensure_ascii=False),
+                "trace_id": trace_id,
+            },
+        )
+
+    def index_mp(self, record: Any, trace_id: int) -> None:
+        identifier = scalar(record_value(record, "henkilonro"))
+        if identifier is None:
+            return
+        self._replace(
+            "mps",
+            {
+                "henkilonro": identifier,
+                "etunimi": first_scalar(record, ("kutsumanimi", "etunimi", "etunimet")),
+                "sukunimi": scalar(record_value(record, "sukunimi")),
+                "eduskuntaryhma": first_scalar(
+                    record, ("viimeisinEduskuntaryhma", "eduskuntaryhma")
+                ),
+                "body": json.dumps(record, ensure_ascii=False),
+                "trace_id": trace_id,
+            },
+        )
+
+    def index_vote(self, record: Any, trace_id: int) -> None:
+        identifier = scalar(record_value(record, "id"))
+        if identifier is None:
+            return
+        cancelled = localised(record_value(record, "aanestysmitatoity"))
+        self._replace(
+            "votes",
+            {
+                "vote_id": identifier,
+                "session_id": first_scalar(
+                    record, ("istunnonTunniste", "istuntotunnus")
+                ),
+                "istuntopvm": record_date(record, "istuntopvm"),
+                "eduskuntatunnus": scalar(record_value(record, "eduskuntatunnus")),
+                "otsikko": first_scalar(record, ("aanestysotsikko", "otsikko")),
+                "mitatoity": None if cancelled is None else int(bool(cancelled)),
+                "body": json.dumps(record, ensure_ascii=False),
+                "trace_id": trace_id,
+            },
+        )
+        events = localised(record_value(record, "aanestystapahtumat"))
+        if not isinstance(events, list):
+            return
+        rows = []
+        for event in events:
+            person = scalar(record_value(event, "henkilonro"))
+            if person is None:
+                continue
+            rows.append(
+                (
+                    identifier,
+                    person,
+                    first_scalar(event, BALLOT_FIELDS),
+                    first_scalar(event, GROUP_FIELDS),
+                    trace_id,
+                )
+            )
+        self.connection.execute("DELETE FROM ballots WHERE vote_id = ?", (identifier,))
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO ballots "
+            "(vote_id, henkilonro, ballot, eduskuntaryhma, trace_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def index_speech(self, record: Any, trace_id: int) -> None:
+        identifier = scalar(record_value(record, "id"))
+        if identifier is None:
+            return
+        matter = record_value(record, "asia")
+        self._replace(
+            "speeches",
+            {
+                "id": identifier,
+                "valtiopaivavuosi": scalar(record_value(record, "valtiopaivavuosi")),
+                "taysistuntonumero": scalar(record_value(record, "taysistuntonumero")),
+                "henkilonro": scalar(record_value(record, "henkilonro")),
+                "eduskuntatunnus": scalar(
+                    record_value(
+                        matter if isinstance(matter, dict) else record,
+                        "eduskuntatunnus",
+                    )
+                ),
+                "aloitushetki": scalar(record_value(record, "aloitushetki")),
+                "puheenvuorotyyppikoodi": scalar(
+                    record_value(record, "puheenvuorotyyppikoodi")
+                ),
+                "body": json.dumps(record, ensure_ascii=False),
+                "trace_id": trace_id,
+            },
+        )
+
+    def ingest(self, envelope: Mapping[str, Any]) -> dict[str, int]:
+        """Normalise an audit envelope from ``search``, ``matter``, ``mps`` etc."""
+
+        trace = envelope.get("trace") or {}
+        request = envelope.get("request")
+        data = envelope.get("data")
+        counts: dict[str, int] = {}
+        if "error" in envelope or not isinstance(trace, dict):
+            return counts
+        if "pages" in trace or isinstance(data, dict) and "results" in data:
+            category = (
+                (request or {}).get("category") if isinstance(request, dict) else None
+            )
+            results = data.get("results") if isinstance(data, dict) else None
+            if not category or not isinstance(results, list):
+                return counts
+            trace_id = self.add_trace(f"search:{category}", trace, request)
+            for record in results:
+                self.index_record(category, record, trace_id)
+            counts[category] = len(results)
+            return counts
+
+        kind = _detail_kind(str(trace.get("url", "")))
+        if kind is None or not isinstance(data, (dict, list)):
+            return counts
+        category, marker = kind
+        trace_id = self.add_trace(f"detail:{category}", trace, request)
+        entities = _entities(data, marker)
+        for entity in entities:
+            self.index_record(category, entity, trace_id)
+        counts[category] = len(entities)
+        return counts
+
+    def query(self, name: str, **params: Any) -> dict[str, Any]:
+        if name not in QUERIES:
+            raise ValueError(f"Unknown query: {name}")
+        values = {"id": None, "ballot": None, **params}
+        return self._answer(QUERIES[name], values, {"query": name, **params})
+
+    def sql(self, statement: str) -> dict[str, Any]:
+        """Run a read-only SQL statement against the mirror."""
+
+        readonly = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            return self._answer(statement, {}, {"sql": statement}, readonly)
+        finally:
+            readonly.close()
+
+    def _answer(
+        self,
+        statement: str,
+        params: Mapping[str, Any],
+        request: Mapping[str, Any],
+        connection: sqlite3.Connection | None = None,
+    ) -> dict[str, Any]:
+        cursor = (connection or self.connection).execute(statement, params)
+        columns = [column[0] for column in cursor.description or ()]
+        rows = []
+        for values in cursor:
+            row = dict(zip(columns, values))
+            if isinstance(row.get("body"), str):
+                row["body"] = json.loads(row["body"])
+            rows.append(row)
+        trace_ids = sorted({row["trace_id"] for row in rows if row.get("trace_id")})
+        provenance = []
+        if trace_ids:
+            placeholders = ", ".join("?" * len(trace_ids))
+            for trace_id, source, retrieved_at, trace in self.connection.execute(
+                "SELECT trace_id, source, retrieved_at, trace FROM traces "
+                f"WHERE trace_id IN ({placeholders})",
+                trace_ids,
+            ):
+                provenance.append(
+                    {
+                        "trace_id": trace_id,
+                        "source": source,
+                        "retrieved_at": retrieved_at,
+                        "trace": json.loads(trace),
+                    }
+                )
+        return {
+            "trace": {
+                "source": "local",
+                "store": str(self.path),
+                "answered_at": utc_now(),
+                "provenance": provenance,
+            },
+            "request": dict(request),
+            "data": rows,
+        }
+
+    def records(self, category: str) -> list[Any]:
+        return [
+            json.loads(body)
+            for (body,) in self.connection.execute(
+                "SELECT body FROM records WHERE category = ? ORDER BY id", (category,)
+            )
+        ]
+
+
+DETAIL_ROUTES = (
+    ("/valtiopaivaasiat/", ("valtiopaivaasia", "eduskuntatunnus")),
+    ("/asiakirjat/", ("asiakirja", "edktunnus")),
+    ("/kansanedustajat", ("kansanedustaja", "henkilonro")),
+    ("/taysistunnot/aanestykset/", ("aanestys", "aanestystapahtumat")),
+    ("/taysistunnot/istunnon-aanestykset/", ("aanestys", "aanestystapahtumat")),
+    ("/taysistunnot/asian-aanestykset/", ("aanestys", "aanestystapahtumat")),
+    ("/taysistunnot/uusimmat-aanestykset", ("aanestys", "aanestystapahtumat")),
+)
+
+API_PATH = urlparse(DEFAULT_BASE_URL).path
+
+
+def _detail_kind(url: str) -> tuple[str, str] | None:
+    """Match the path after the API base against ``DETAIL_ROUTES`` by segment."""
+
+    route = urlparse(url).path
+    if route.startswith(API_PATH + "/"):
+        route = route[len(API_PATH) :]
+    for prefix, kind in DETAIL_ROUTES:
+        stem = prefix.rstrip("/")
+        if route == stem or route.startswith(stem + "/"):
+            return kind
+    return None
+
+
+def read_items(path: str | Path) -> Iterator[Any]:
+    """Read one JSON value, or NDJSON with one value per line, as saved."""
+
+    text = Path(path).read_text(encoding="utf-8")
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+        return
+    yield value
+
+
+def read_envelopes(
+    path: str | Path, category: str | None = None
+) -> Iterator[dict[str, Any]]:
+    """Read one JSON envelope, or NDJSON with one envelope per line.
+
+    Bare records written by a streaming command are gathered into one search
+    envelope per stream, under the category of the stream's trailer request
+    or ``category``; records whose category cannot be told raise
+    :class:`ValueError` instead of being dropped.
+    """
+
+    records: list[Any] = []
+    for item in read_items(path):
+        if not isinstance(item, dict):
+            continue
+        if "trailer" in item:
+            if records:
+                yield _stream_envelope(path, records, item["trailer"], category)
+                records = []
+        elif "data" in item or "error" in item:
+            yield item
+        else:
+            records.append(item)
+    if records:
+        yield _stream_envelope(path, records, {}, category)
+
+
+def _stream_envelope(
+    path: str | Path,
+    records: list[Any],
+    trailer: Mapping[str, Any],
+    category: str | None,
+) -> dict[str, Any]:
+    request = trailer.get("request")
+    request = dict(request) if isinstance(request, dict) else {}
+    category = request.get("category") or category
+    if not category:
+        raise ValueError(
+            f"{path}: {len(records)} streamed records have no category; "
+            "pass --category"
+        )
+    request["category"] = category
+    trace = trailer.get("trace") or {"summary": trailer.get("summary")}
+    return {"trace": trace, "request": request, "data": {"results": records}}
+
+
+def ingest(
+    store: LocalStore, paths: Iterable[str], *, category: str | None = None
+) -> dict[str, Any]:
+    totals: dict[str, int] = {}
+    envelopes = 0
+    with store.connection:
+        for path in paths:
+            for envelope in read_envelopes(path, category):
+                envelopes += 1
+                for name, count in store.ingest(envelope).items():
+                    totals[name] = totals.get(name, 0) + count
+    return {
+        "trace": {
+            "source": "local",
+            "store": str(store.path),
+            "ingested_at": utc_now(),
+        },
+        "request": {"files": list(paths), "category": category},
+        "data": {"envelopes": envelopes, "records": totals},
+    }
+
+
+def sync(
+    client: EduskuntaClient,
+    store: LocalStore,
+    category: str,
+    *,
+    since: str | None = None,
+    lookback_days: int = 1,
+    payload: Mapping[str, Any] | None = None,
+    date_property: str | None = None,
+    today: date | None = None,
+) -> dict[str, Any]:
+    """Fetch records dated within the window and upsert them.
+
+    The window is chosen by each record's own date property, as the API has no
+    modification time to search on. It starts ``lookback_days`` before the
+    stored mark, so records published late or edited within those days are seen
+    again; edits to records dated before the window are not. Unchanged records
+    are detected by content hash. ``since`` sets the start of the first sync
+    and overrides the stored mark.
+    """
+
+    if category not in SYNC_SPECS:
+        raise ValueError(f"Unknown sync category: {category}")
+    spec = SYNC_SPECS[category]
+    prop = date_property or spec.date_property
+    previous = store.high_water(category)
+    if since is not None:
+        start = date.fromisoformat(since)
+    elif previous is not None:
+        start = date.fromisoformat(previous) - timedelta(days=max(0, lookback_days))
+    else:
+        raise ValueError(f"No previous sync for {category}; pass --since YYYY-MM-DD")
+    end = (today or date.today()) + timedelta(days=1)
+    if end <= start:
+        raise ValueError(f"Sync window {start}..{end} is empty")
+
+    base_payload = dict(payload or {})
+    base_payload["category"] = category
+    window = {
+        "property": prop,
+        "fromDate": start.isoformat(),
+        "toDate": end.isoformat(),
+    }
+    request = _with_conditions(base_payload, [window])
+    trace: dict[str, Any] = {}
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "skipped": 0}
+    high_water = previous
+    with store.connection:
+        trace_id = store.add_trace(f"sync:{category}", trace, request)
+        for record in client.iter_search(
+            request,
+            partitions=[
+                PartitionAxis(prop, start.isoformat(), end.isoformat(), "date")
+            ],
+            trace=trace,
+        ):
+            identifier = record_value(record, spec.id_field)
+            if identifier is None:
+                counts["skipped"] += 1
+                continue
+            day = record_date(record, prop)
+            status = store.upsert(category, str(identifier), record, day)
+            counts[status] += 1
+            if status != "unchanged":
+                store.index_record(category, record, trace_id)
+            if day is not None and (high_water is None or day > high_water):
+                high_water = day
+        if not trace.get("complete"):
+            raise ValueError(
+                f"Sync of {category} was incomplete; no changes were stored"
+            )
+        store.update_trace(trace_id, trace)
+        store.set_high_water(category, prop, high_water or start.isoformat(), trace)
+
+    return {
+        "trace": trace,
+        "request": request,
+        "data": {
+            "category": category,
+            "property": prop,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "previous_high_water": previous,
+            "high_water": high_water or start.isoformat(),
+            **counts,
+        },
+    }
@@ -0,0 +1,419 @@
+"""Dense vote matrices for cohesion, agreement and turnout analyses.
+
+Uses only the Python standard library. Vote detail envelopes
+(``session-votes``, ``matter-votes``, ``vote``) are folded into one byte per
+vote and MP, next to a parallel matrix of parliamentary-group codes taken from
+each ballot. A matrix is saved as a single file and opened with ``mmap``, so a
+whole electoral term loads without parsing JSON. Queries work on whole rows
+and columns with ``bytes.count``, ``bytes.translate`` and integer bit
+operations instead of Python loops over ballots.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Sequence
+
+from eduskunta_api import utc_now
+from eduskunta_records import first_scalar, localised, record_date, record_value, scalar
+from eduskunta_store import BALLOT_FIELDS, GROUP_FIELDS, _entities
+
+MISSING, YES, NO, ABSTAIN, ABSENT = 0, 1, 2, 3, 4
+BALLOT_NAMES = {YES: "Jaa", NO: "Ei", ABSTAIN: "Tyhjää", ABSENT: "Poissa"}
+BALLOT_CODES = {
+    "jaa": YES,
+    "ja": YES,
+    "yes": YES,
+    "ei": NO,
+    "nej": NO,
+    "no": NO,
+    "tyhjää": ABSTAIN,
+    "tyhjaa": ABSTAIN,
+    "blank": ABSTAIN,
+    "poissa": ABSENT,
+    "frånvarande": ABSENT,
+    "absent": ABSENT,
+}
+MAGIC = b"EDKVMX1\n"
+# Group codes share a byte with the ballot code in combined(): 5 bits + 3 bits.
+MAX_GROUPS = 31
+
+
+def _translate(code: int) -> bytes:
+    """A ``bytes.translate`` table mapping ``code`` to 1 and the rest to 0."""
+
+    return bytes(1 if value == code else 0 for value in range(256))
+
+
+CAST_MASKS = {code: _translate(code) for code in (YES, NO, ABSTAIN)}
+
+
+class VoteMatrix:
+    """Votes × MPs matrix of ballot codes with vote, session and group indexes.
+
+    ``ballots`` and ``groups`` are row-major byte buffers of ``len(vote_ids)``
+    rows and ``len(members)`` columns; they may be ``bytes`` or an ``mmap``.
+    Group code 0 means the MP has no ballot in that vote.
+    """
+
+    def __init__(
+        self,
+        *,
+        vote_ids: Sequence[str],
+        sessions: Sequence[str | None],
+        dates: Sequence[str | None],
+        members: Sequence[str],
+        group_names: Sequence[str | None],
+        ballots: Any,
+        groups: Any,
+        source: str | None = None,
+    ) -> None:
+        self.vote_ids = list(vote_ids)
+        self.sessions = list(sessions)
+        self.dates = list(dates)
+        self.members = list(members)
+        self.group_names = list(group_names)
+        self.ballots = ballots
+        self.groups = groups
+        self.source = source
+        self._vote_index = {vote: row for row, vote in enumerate(self.vote_ids)}
+        self._member_index = {member: col for col, member in enumerate(self.members)}
+        self._group_index = {
+            name: code for code, name in enumerate(self.group_names) if name
+        }
+        self._combined: bytes | None = None
+        self._file: Any = None
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.vote_ids), len(self.members)
+
+    def row(self, vote_id: str) -> bytes:
+        width = len(self.members)
+        start = self._vote_index[vote_id] * width
+        return bytes(self.ballots[start : start + width])
+
+    def column(self, henkilonro: str) -> bytes:
+        if henkilonro not in self._member_index:
+            raise ValueError(f"Unknown member: {henkilonro}")
+        width = len(self.members)
+        column = self._member_index[henkilonro]
+        return bytes(memoryview(self.ballots)[column::width])
+
+    def _group_codes(self, groups: str | Iterable[str]) -> list[int]:
+        names = [groups] if isinstance(groups, str) else list(groups)
+        unknown = [name for name in names if name not in self._group_index]
+        if unknown:
+            raise ValueError(f"Unknown group: {', '.join(unknown)}")
+        return [self._group_index[name] for name in names]
+
+    def combined(self) -> bytes:
+        """Return ``group << 3 | ballot`` for every cell, computed once.
+
+        Both buffers are turned into integers and merged with one shift and
+        one OR; no cell overflows its byte because groups fit in five bits.
+        """
+
+        if self._combined is None:
+            size = len(self.ballots)
+            merged = int.from_bytes(self.groups[:size], "big") << 3
+            merged |= int.from_bytes(self.ballots[:size], "big")
+            self._combined = merged.to_bytes(size, "big")
+        return self._combined
+
+    def turnout(self) -> list[float | None]:
+        """Share of MPs with a ballot who were not absent, per vote."""
+
+        width = len(self.members)
+        result: list[float | None] = []
+        for row in range(len(self.vote_ids)):
+            cells = bytes(self.ballots[row * width : (row + 1) * width])
+            seated = width - cells.count(MISSING)
+            present = seated - cells.count(ABSENT)
+            result.append(present / seated if seated else None)
+        return result
+
+    def cohesion(self, groups: str | Iterable[str]) -> list[float | None]:
+        """Rice index ``|yes - no| / (yes + no)`` of ``groups`` per vote.
+
+        Several groups are treated as one bloc, e.g. the government parties.
+        Votes where the bloc cast no yes or no ballots give ``None``.
+        """
+
+        codes = self._group_codes(groups)
+        combined = self.combined()
+        width = len(self.members)
+        yes_keys = [bytes([code << 3 | YES]) for code in codes]
+        no_keys = [bytes([code << 3 | NO]) for code in codes]
+        result: list[float | None] = []
+        for row in range(len(self.vote_ids)):
+            cells = combined[row * width : (row + 1) * width]
+            yes = sum(cells.count(key) for key in yes_keys)
+            no = sum(cells.count(key) for key in no_keys)
+            result.append(abs(yes - no) / (yes + no) if yes + no else None)
+        return result
+
+    def group_cohesion(self) -> dict[str, float | None]:
+        """Mean Rice index of every group over the votes it took part in."""
+
+        summary: dict[str, float | None] = {}
+        for name in self.group_names:
+            if not name:
+                continue
+            values = [value for value in self.cohesion(name) if value is not None]
+            summary[name] = sum(values) / len(values) if values else None
+        return summary
+
+    def agreement(self, henkilonro: str) -> dict[str, dict[str, Any]]:
+        """How often every other MP cast the same yes, no or blank ballot.
+
+        Only votes where both MPs voted yes, no or blank are compared.
+        """
+
+        column = self.column(henkilonro)
+        masks = {
+            code: int.from_bytes(column.translate(table), "big")
+            for code, table in CAST_MASKS.items()
+        }
+        voted = masks[YES] | masks[NO] | masks[ABSTAIN]
+        result: dict[str, dict[str, Any]] = {}
+        for other in self.members:
+            if other == henkilonro:
+                continue
+            other_column = self.column(other)
+            same = 0
+            other_voted = 0
+            for code, mask in masks.items():
+                other_mask = int.from_bytes(
+                    other_column.translate(CAST_MASKS[code]), "big"
+                )
+                same += (mask & other_mask).bit_count()
+                other_voted |= other_mask
+            compared = (voted & other_voted).bit_count()
+            result[other] = {
+                "compared": compared,
+                "agreed": same,
+                "share": same / compared if compared else None,
+            }
+        return result
+
+    def save(self, path: str | Path) -> None:
+        """Write the matrix as a header followed by the two byte buffers."""
+
+        header = json.dumps(
+            {
+                "shape": list(self.shape),
+                "vote_ids": self.vote_ids,
+                "sessions": self.sessions,
+                "dates": self.dates,
+                "members": self.members,
+                "group_names": self.group_names,
+                "created_at": utc_now(),
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        target = Path(path)
+        temporary = target.with_name(f".{target.name}.tmp")
+        with temporary.open("wb") as handle:
+            handle.write(MAGIC)
+            handle.write(struct.pack("<Q", len(header)))
+            handle.write(header)
+            handle.write(self.ballots)
+            handle.write(self.groups)
+        temporary.replace(target)
+
+    @classmethod
+    def open(cls, path: str | Path) -> "VoteMatrix":
+        """Memory-map a saved matrix; the ballots are paged in on demand."""
+
+        handle = Path(path).open("rb")
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            handle.close()
+            raise ValueError(f"Empty vote matrix file: {path}") from None
+        if mapped[: len(MAGIC)] != MAGIC:
+            mapped.close()
+            handle.close()
+            raise ValueError(f"Not a vote matrix file: {path}")
+        offset = len(MAGIC)
+        (header_size,) = struct.unpack_from("<Q", mapped, offset)
+        offset += 8
+        header = json.loads(mapped[offset : offset + header_size].decode("utf-8"))
+        offset += header_size
+        rows, columns = header["shape"]
+        size = rows * columns
+        view = memoryview(mapped)
+        matrix = cls(
+            vote_ids=header["vote_ids"],
+            sessions=header["sessions"],
+            dates=header["dates"],
+            members=header["members"],
+            group_names=header["group_names"],
+            ballots=view[offset : offset + size],
+            groups=view[offset + size : offset + 2 * size],
+            source=str(path),
+        )
+        matrix._file = (handle, mapped, view)
+        return matrix
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        handle, mapped, view = self._file
+        self._file = None
+        for buffer in (self.ballots, self.groups):
+            if isinstance(buffer, memoryview):
+                buffer.release()
+        self.ballots = self.groups = b""
+        view.release()
+        mapped.close()
+        handle.close()
+
+    def __enter__(self) -> "VoteMatrix":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class VoteMatrixBuilder:
+    """Collects vote detail envelopes and produces a :class:`VoteMatrix`.
+
+    Later copies of the same vote replace earlier ones. Cancelled votes
+    (``aanestysmitatoity``) are skipped unless ``keep_cancelled`` is set.
+    Ballot values outside ``BALLOT_CODES`` are stored as ``MISSING``, not as
+    absences, and counted by value in ``unknown_ballots``.
+    """
+
+    def __init__(self, *, keep_cancelled: bool = False) -> None:
+        self.keep_cancelled = keep_cancelled
+        self.skipped = 0
+        self.unknown_ballots: dict[str, int] = {}
+        # vote id -> (session, date, {member column: (ballot, group code)})
+        self._votes: dict[str, tuple[Any, Any, dict[int, tuple[int, int]]]] = {}
+        self._members: dict[str, int] = {}
+        self._groups: dict[str, int] = {}
+
+    def add_envelope(self, envelope: Mapping[str, Any]) -> int:
+        if "error" in envelope:
+            return 0
+        added = 0
+        for entity in _entities(envelope.get("data"), "aanestystapahtumat"):
+            added += self.add_vote(entity)
+        return added
+
+    def add_vote(self, record: Any) -> int:
+        identifier = scalar(record_value(record, "id"))
+        events = localised(record_value(record, "aanestystapahtumat"))
+        if identifier is None or not isinstance(events, list):
+            return 0
+        if not self.keep_cancelled and localised(
+            record_value(record, "aanestysmitatoity")
+        ) in (True, 1, "1", "true", "True"):
+            self.skipped += 1
+            return 0
+        cells: dict[int, tuple[int, int]] = {}
+        for event in events:
+            person = scalar(record_value(event, "henkilonro"))
+            if person is None:
+                continue
+            ballot = (first_scalar(event, BALLOT_FIELDS) or "").strip().lower()
+            code = BALLOT_CODES.get(ballot, MISSING)
+            if code == MISSING:
+                self.unknown_ballots[ballot] = self.unknown_ballots.get(ballot, 0) + 1
+            column = self._members.setdefault(person, len(self._members))
+            cells[column] = (code, self._group_code(first_scalar(event, GROUP_FIELDS)))
+        self._votes[identifier] = (
+            first_scalar(record, ("istunnonTunniste", "istuntotunnus")),
+            record_date(record, "istuntopvm"),
+            cells,
+        )
+        return 1
+
+    def _group_code(self, name: str | None) -> int:
+        if not name:
+            return 0
+        code = self._groups.get(name)
+        if code is None:
+            if len(self._groups) >= MAX_GROUPS:
+                raise ValueError(f"More than {MAX_GROUPS} parliamentary groups")
+            code = self._groups[name] = len(self._groups) + 1
+        return code
+
+    def build(self) -> VoteMatrix:
+        """Order votes by session date and identifier and fill the matrix."""
+
+        order = sorted(self._votes, key=lambda vote: (self._votes[vote][1] or "", vote))
+        width = len(self._members)
+        ballots = bytearray(len(order) * width)
+        groups = bytearray(len(order) * width)
+        for row, vote in enumerate(order):
+            base = row * width
+            for column, (ballot, group) in self._votes[vote][2].items():
+                ballots[base + column] = ballot
+                groups[base + column] = group
+        group_names: list[str | None] = [None] * (len(self._groups) + 1)
+        for name, code in self._groups.items():
+            group_names[code] = name
+        return VoteMatrix(
+            vote_ids=order,
+            sessions=[self._votes[vote][0] for vote in order],
+            dates=[self._votes[vote][1] for vote in order],
+            members=list(self._members),
+            group_names=group_names,
+            ballots=bytes(ballots),
+            groups=bytes(groups),
+        )
+
+
+def query_matrix(
+    matrix: VoteMatrix,
+    action: str,
+    *,
+    groups: Sequence[str] = (),
+    member: str | None = None,
+) -> dict[str, Any]:
+    """Answer ``summary``, ``turnout``, ``cohesion`` or ``agreement`` as an envelope."""
+
+    if action == "summary":
+        data: Any = {
+            "votes": matrix.shape[0],
+            "members": matrix.shape[1],
+            "groups": [name for name in matrix.group_names if name],
+            "first_date": next((day for day in matrix.dates if day), None),
+            "last_date": next((day for day in reversed(matrix.dates) if day), None),
+        }
+    elif action == "turnout":
+        data = _per_vote(matrix, matrix.turnout())
+    elif action == "cohesion":
+        data = (
+            _per_vote(matrix, matrix.cohesion(groups))
+            if groups
+            else matrix.group_cohesion()
+        )
+    elif action == "agreement":
+        if not member:
+            raise ValueError("agreement needs --member")
+        data = matrix.agreement(member)
+    else:
+        raise ValueError(f"Unknown vote-matrix action: {action}")
+    return {
+        "trace": {"source": "local", "matrix": matrix.source, "queried_at": utc_now()},
+        "request": {"action": action, "groups": list(groups), "member": member},
+        "data": data,
+    }
+
+
+def _per_vote(
+    matrix: VoteMatrix, values: Sequence[float | None]
+) -> list[dict[str, Any]]:
+    return [
+        {"vote_id": vote, "session": session, "date": day, "value": value}
+        for vote, session, day, value in zip(
+            matrix.vote_ids, matrix.sessions, matrix.dates, values
+        )
+    ]
@@ -1,15 +1,39 @@
 from __future__ import annotations
 
 import json
+import random
+import tempfile
+import gzip
+import threading
+import time
 import unittest
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 from urllib.parse import parse_qs, urlparse
 
+import eduskunta_api
 from eduskunta_api import (
+    BlockHTMLParser,
+    BucketSpec,
+    ApiError,
     EduskuntaClient,
+    HarvestCheckpoint,
     HttpResponse,
+    PartitionAxis,
+    PooledTransport,
+    RateLimiter,
+    ResponseCache,
+    ResponseMemo,
+    RunMetrics,
     SearchLimitError,
+    StreamingBlockExtractor,
     encode_path_identifier,
     extract_html_blocks,
+    iter_html_blocks,
+    parse_count_axis,
+    parse_partition_axis,
     public_document_url,
     public_matter_url,
 )
@@ -48,6 +72,171 @@ class FakeSearchTransport:
         )
 
 
+def _matches(record, expression):
+    if not expression:
+        return True
+    if "and" in expression:
+        return all(_matches(record, item) for item in expression["and"])
+    if "or" in expression:
+        return any(_matches(record, item) for item in expression["or"])
+    if "ids" in expression:
+        return record["id"] in expression["ids"]
+    if "termWithIds" in expression:
+        value = record
+        for key in expression["termWithIds"]["term"].split("."):
+            value = value[key]
+        return str(value) in expression["termWithIds"]["ids"]
+    value = record[expression["property"]]
+    if "match" in expression:
+        return str(value) == expression["match"]
+    if "fromDate" in expression:
+        return expression["fromDate"] <= value[:10] < expression["toDate"]
+    return expression["from"] <= value < expression["to"]
+
+
+class FakeRecordTransport:
+    """Serves /search and /search/count over an in-memory record list."""
+
+    def __init__(self, records) -> None:
+        self.records = records
+        self.calls: list[dict[str, object]] = []
+
+    def __call__(self, method, url, body, headers, timeout):
+        if method == "GET":
+            payload = json.loads(parse_qs(urlparse(url).query)["q"][0])
+        else:
+            payload = json.loads(body.decode("utf-8"))
+        path = urlparse(url).path
+        self.calls.append({"method": method, "path": path, "payload": payload})
+        matched = [r for r in self.records if _matches(r, payload.get("expression"))]
+        if path.endswith("/search/count"):
+            response = {"count": len(matched)}
+        else:
+            start = int(payload.get("startFromIndex", 0))
+            size = int(payload.get("maxResults", 100))
+            response = {
+                "results": matched[start : start + size],
+                "searchMetadata": {
+                    "totalResultCount": len(matched),
+                    "actualResultCount": len(matched[start : start + size]),
+                    "startFromIndex": start,
+                },
+            }
+        return HttpResponse(
+            status=200,
+            headers={"Content-Type": "application/json"},
+            body=json.dumps(response).encode("utf-8"),
+            final_url=url,
+        )
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path, "padding": "x" * 4000}).encode("utf-8")
+        encodings = self.headers.get("Accept-Encoding", "")
+        if self.path.endswith("/deflate") and "deflate" in encodings:
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            raw = compressor.compress(body) + compressor.flush()
+            self._reply(200, raw, [("Content-Encoding", "deflate")])
+        elif "gzip" in encodings:
+            self._reply(200, gzip.compress(body), [("Content-Encoding", "gzip")])
+        else:
+            self._reply(200, body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply(302, headers=[("Location", "/blob/result.json")])
+
+
+class LocalServerTestCase(unittest.TestCase):
+    def setUp(self):
+        KeepAliveHandler.connections = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PooledTransportTests(LocalServerTestCase):
+    def test_connections_are_reused(self):
+        transport = PooledTransport()
+        client = EduskuntaClient(self.base_url, transport=transport)
+        client.matter("HE 1/2020 vp")
+        client.mps()
+        transport.close()
+
+        self.assertEqual(KeepAliveHandler.connections, 1)
+        self.assertEqual(transport.connections_opened, 1)
+
+    def test_post_redirect_is_followed_with_get(self):
+        transport = PooledTransport()
+        client = EduskuntaClient(self.base_url, transport=transport)
+        result = client.count({"category": "valtiopaivaasia"})
+        transport.close()
+
+        self.assertEqual(result["data"]["path"], "/blob/result.json")
+        self.assertTrue(result["trace"]["final_url"].endswith("/blob/result.json"))
+
+    def test_compressed_bodies_are_decoded_and_measured(self):
+        transport = PooledTransport()
+        client = EduskuntaClient(self.base_url, transport=transport)
+        gzipped = client.mps()
+        deflated = transport("GET", f"{self.base_url}/raw/deflate", None, {}, 5.0)
+        transport.close()
+
+        self.assertEqual(gzipped["data"]["path"], "/kansanedustajat")
+        self.assertLess(gzipped["trace"]["wire_bytes"], gzipped["trace"]["decoded_bytes"])
+        self.assertEqual(json.loads(deflated.body)["path"], "/raw/deflate")
+        self.assertNotIn("Content-Encoding", deflated.headers)
+
+    def test_trace_records_phase_timings_and_bytes(self):
+        transport = PooledTransport()
+        client = EduskuntaClient(self.base_url, transport=transport)
+        result = client.count({"category": "valtiopaivaasia"})
+        transport.close()
+
+        trace = result["trace"]
+        self.assertEqual(
+            set(trace["timings"]), {"connect", "ttfb", "download", "decode", "total"}
+        )
+        self.assertGreaterEqual(trace["timings"]["total"], trace["timings"]["ttfb"])
+        self.assertEqual(trace["request_bytes"], len(b'{"category":"valtiopaivaasia"}'))
+        self.assertEqual(trace["retries"], [])
+        self.assertEqual(trace["sleep_seconds"], 0.0)
+
+    def test_idle_connections_are_evicted(self):
+        now = [0.0]
+        transport = PooledTransport(idle_timeout=5, clock=lambda: now[0])
+        client = EduskuntaClient(self.base_url, transport=transport)
+        client.mps()
+        now[0] += 10
+        client.mps()
+        transport.close()
+
+        self.assertEqual(transport.connections_opened, 2)
+
+
 class ApiHelperTests(unittest.TestCase):
     def test_path_encoding_encodes_space_and_slash(self):
         self.assertEqual(encode_path_identifier("HE 60/2018 vp"), "HE%2060%2F2018%20vp")
@@ -74,6 +263,124 @@ class ApiHelperTests(unittest.TestCase):
         self.assertEqual(len(transport.calls), 3)
         self.assertTrue(result["trace"]["complete"])
 
+    def test_iter_search_streams_pages_and_fills_trace(self):
+        transport = FakeSearchTransport(total=5)
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+        trace: dict[str, object] = {}
+        stream = client.iter_search(
+            {"category": "valtiopaivaasia"}, method="get", page_size=2, trace=trace
+        )
+
+        first = next(stream)
+        self.assertEqual(first["id"], "0")
+        self.assertEqual(len(transport.calls), 1)
+        self.assertEqual([row["id"] for row in stream], ["1", "2", "3", "4"])
+        self.assertTrue(trace["complete"])
+        self.assertEqual(trace["totalResultCount"], 5)
+        self.assertEqual(len(trace["pages"]), 3)
+
+    def test_stream_command_writes_records_and_trailer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            payload_path = f"{directory}/query.json"
+            output_path = f"{directory}/out.ndjson"
+            with open(payload_path, "w", encoding="utf-8") as handle:
+                json.dump({"category": "valtiopaivaasia"}, handle)
+            with mock.patch.object(
+                eduskunta_api, "PooledTransport", lambda: FakeSearchTransport(3)
+            ):
+                code = eduskunta_api.main(
+                    [
+                        "--output", output_path,
+                        "--rate-state", f"{directory}/rate.json",
+                        "search", "--payload", payload_path, "--all", "--stream",
+                        "--method", "get", "--page-size", "2",
+                    ]
+                )
+            with open(output_path, encoding="utf-8") as handle:
+                lines = [json.loads(line) for line in handle]
+
+        self.assertEqual(code, 0)
+        self.assertEqual([line.get("id") for line in lines[:3]], ["0", "1", "2"])
+        self.assertTrue(lines[-1]["trailer"]["trace"]["complete"])
+
+    def test_checkpointed_search_resumes_after_failure(self):
+        transport = FakeSearchTransport(total=5)
+
+        def failing(method, url, body, headers, timeout):
+            if len(transport.calls) == 2:
+                return HttpResponse(400, {}, b"broken", url)
+            return transport(method, url, body, headers, timeout)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = HarvestCheckpoint(f"{directory}/harvest.json")
+            client = EduskuntaClient(transport=failing, sleeper=lambda _: None)
+            with self.assertRaises(ApiError):
+                client.search_all(
+                    {"category": "valtiopaivaasia"},
+                    method="get",
+                    page_size=2,
+                    checkpoint=checkpoint,
+                )
+            client.transport = transport
+            result = client.search_all(
+                {"category": "valtiopaivaasia"},
+                method="get",
+                page_size=2,
+                checkpoint=checkpoint,
+            )
+
+        self.assertEqual([row["id"] for row in result["data"]["results"]], ["0", "1", "2", "3", "4"])
+        self.assertEqual(
+            [call["payload"]["startFromIndex"] for call in transport.calls], [0, 2, 4]
+        )
+        self.assertEqual(len(result["trace"]["pages"]), 3)
+        self.assertTrue(result["trace"]["complete"])
+        self.assertEqual(result["trace"]["resumed"]["changes"], [])
+
+    def test_checkpoint_restarts_when_upstream_total_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = HarvestCheckpoint(f"{directory}/harvest.json")
+            client = EduskuntaClient(
+                transport=FakeSearchTransport(total=5), sleeper=lambda _: None
+            )
+            stream = client.iter_search(
+                {"category": "valtiopaivaasia"},
+                method="get",
+                page_size=2,
+                checkpoint=checkpoint,
+            )
+            self.assertEqual([next(stream)["id"], next(stream)["id"]], ["0", "1"])
+            stream.close()
+
+            client.transport = FakeSearchTransport(total=6)
+            trace: dict[str, object] = {}
+            rows = list(
+                client.iter_search(
+                    {"category": "valtiopaivaasia"},
+                    method="get",
+                    page_size=2,
+                    checkpoint=checkpoint,
+                    trace=trace,
+                )
+            )
+
+        self.assertEqual([row["id"] for row in rows], [str(index) for index in range(6)])
+        self.assertEqual(
+            trace["resumed"]["changes"],
+            [{"conditions": [], "previous": 5, "current": 6}],
+        )
+        self.assertTrue(trace["complete"])
+
+    def test_checkpoint_rejects_a_different_request(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = HarvestCheckpoint(f"{directory}/harvest.json")
+            client = EduskuntaClient(
+                transport=FakeSearchTransport(total=1), sleeper=lambda _: None
+            )
+            client.search_all({"category": "aanestys"}, checkpoint=checkpoint)
+            with self.assertRaises(ValueError):
+                client.search_all({"category": "puheenvuoro"}, checkpoint=checkpoint)
+
     def test_search_all_refuses_more_than_api_limit(self):
         transport = FakeSearchTransport(total=10_001)
         client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
@@ -81,6 +388,152 @@ class ApiHelperTests(unittest.TestCase):
         with self.assertRaises(SearchLimitError):
             client.search_all({"category": "puheenvuoro"}, method="get")
 
+    def test_search_all_partitions_until_every_part_fits(self):
+        records = [
+            {"id": f"{year}-{number}", "vuosi": year, "nro": number}
+            for year in (2023, 2024)
+            for number in range(1, 9)
+        ]
+        transport = FakeRecordTransport(records)
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+        result = client.search_all(
+            {"category": "puheenvuoro"},
+            method="get",
+            max_records=3,
+            partitions=[
+                PartitionAxis("vuosi", "2023", "2025", "match"),
+                PartitionAxis("nro", "1", "9"),
+            ],
+        )
+
+        ids = [row["id"] for row in result["data"]["results"]]
+        self.assertEqual(sorted(ids), sorted(record["id"] for record in records))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(result["trace"]["partition_check"]["consistent"])
+        self.assertTrue(result["trace"]["complete"])
+        self.assertTrue(all(part["count"] <= 3 for part in result["trace"]["partitions"]))
+
+    def test_wide_match_partition_is_split_into_short_value_runs(self):
+        records = [{"id": str(number), "nro": number} for number in range(1, 200)]
+        transport = FakeRecordTransport(records)
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+
+        result = client.search_all(
+            {"category": "puheenvuoro"},
+            max_records=50,
+            partitions=[parse_partition_axis("nro:match=1:200")],
+        )
+
+        pages = [call for call in transport.calls if call["path"].endswith("/search")]
+        widths = [
+            len(call["payload"]["expression"].get("or", [None])) for call in pages
+        ]
+        self.assertEqual(len(result["data"]["results"]), 199)
+        self.assertTrue(result["trace"]["complete"])
+        self.assertEqual({call["method"] for call in pages}, {"GET"})
+        self.assertLessEqual(max(widths), eduskunta_api.MAX_MATCH_VALUES)
+        with self.assertRaises(ValueError):
+            PartitionAxis("nro", "1", "200", "match").condition(1, 200)
+
+    def test_partition_check_reports_uncovered_records(self):
+        records = [{"id": str(number), "nro": number} for number in range(1, 6)]
+        client = EduskuntaClient(
+            transport=FakeRecordTransport(records), sleeper=lambda _: None
+        )
+        result = client.search_all(
+            {"category": "puheenvuoro"},
+            method="get",
+            max_records=2,
+            partitions=[PartitionAxis("nro", "1", "5")],
+        )
+
+        self.assertFalse(result["trace"]["partition_check"]["consistent"])
+        self.assertFalse(result["trace"]["complete"])
+
+    def test_parse_partition_axis_infers_kind(self):
+        self.assertEqual(parse_partition_axis("valtiopaivavuosi=2024:2025").kind, "match")
+        self.assertEqual(parse_partition_axis("istuntopvm=2024-01-01:2025-01-01").kind, "date")
+        self.assertEqual(parse_partition_axis("taysistuntonumero=1:200").kind, "match")
+        self.assertEqual(parse_partition_axis("syntymavuosi=1950:2000").kind, "int")
+        with self.assertRaises(ValueError):
+            parse_partition_axis("taysistuntonumero")
+
+    def test_count_matrix_counts_cells_over_get_and_checks_the_total(self):
+        records = [
+            {"id": f"{year}-{kind}-{number}", "vuosi": str(year), "tyyppi": kind}
+            for year in (2023, 2024)
+            for kind in ("HE", "LA")
+            for number in range(year - 2020 + (kind == "LA"))
+        ]
+        transport = FakeRecordTransport(records)
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+
+        result = client.count_matrix(
+            {"category": "valtiopaivaasia"},
+            [parse_count_axis("vuosi=2023:2025"), parse_count_axis("tyyppi=HE,LA")],
+        )
+
+        self.assertEqual(
+            [(row["vuosi"], row["tyyppi"], row["count"]) for row in result["data"]],
+            [("2023", "HE", 3), ("2023", "LA", 4), ("2024", "HE", 4), ("2024", "LA", 5)],
+        )
+        self.assertEqual(len(result["trace"]["cells"]), 4)
+        self.assertEqual(
+            result["trace"]["total_check"],
+            {"total_count": 16, "cell_sum": 16, "consistent": True},
+        )
+        self.assertEqual({call["method"] for call in transport.calls}, {"GET"})
+        self.assertTrue(all(call["payload"]["maxResults"] == 1 for call in transport.calls))
+
+    def test_count_matrix_can_use_the_count_endpoint(self):
+        transport = FakeRecordTransport([{"id": "1", "tyyppi": "HE"}])
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+
+        result = client.count_matrix(
+            {"category": "valtiopaivaasia"},
+            [parse_count_axis("tyyppi=HE")],
+            method="post",
+            check_total=False,
+        )
+
+        self.assertEqual(result["data"], [{"tyyppi": "HE", "count": 1}])
+        self.assertNotIn("total_check", result["trace"])
+        self.assertEqual(transport.calls[0]["path"], "/api/v1/search/count")
+
+    def test_lookup_ids_stays_on_get_and_keeps_input_order(self):
+        records = [{"id": f"asia-{number:05d}"} for number in range(200)]
+        transport = FakeRecordTransport(records)
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+        wanted = [f"asia-{number:05d}" for number in range(199, -1, -2)]
+
+        result = client.lookup_ids(
+            {"category": "valtiopaivaasia", "maxResults": 5},
+            wanted + wanted[:3] + ["asia-99999"],
+            workers=3,
+        )
+
+        self.assertEqual([record["id"] for record in result["data"]["results"]], wanted)
+        self.assertEqual(result["data"]["missing"], ["asia-99999"])
+        self.assertTrue(result["trace"]["complete"])
+        self.assertGreater(len(transport.calls), 1)
+        self.assertEqual(sum(result["trace"]["chunk_sizes"]), 101)
+        self.assertEqual({call["method"] for call in transport.calls}, {"GET"})
+        self.assertTrue(
+            all(
+                EduskuntaClient._search_method(call["payload"], "auto") == "GET"
+                for call in transport.calls
+            )
+        )
+        self.assertEqual(len(result["request"]["expression"]["ids"]), 101)
+
+    def test_lookup_ids_unwraps_category_records(self):
+        self.assertEqual(
+            eduskunta_api._record_id({"puheenvuoro": {"id": {"fi": 7}}}), "7"
+        )
+        self.assertIsNone(eduskunta_api._record_id({"nimi": "x"}))
+        with self.assertRaises(ValueError):
+            EduskuntaClient().lookup_ids({"category": "x"}, [])
+
     def test_transient_error_is_retried(self):
         calls = 0
         sleeps: list[float] = []
@@ -99,6 +552,223 @@ class ApiHelperTests(unittest.TestCase):
         self.assertEqual(calls, 2)
         self.assertEqual(sleeps, [0.0])
 
+    def test_cache_serves_fresh_entries_without_network(self):
+        calls: list[dict[str, str]] = []
+
+        def transport(method, url, body, headers, timeout):
+            calls.append(dict(headers))
+            return HttpResponse(200, {"Content-Type": "application/json"}, b"[1]", url)
+
+        with tempfile.TemporaryDirectory() as directory:
+            client = EduskuntaClient(
+                transport=transport, cache=ResponseCache(directory)
+            )
+            first = client.reference("asiatyypit")
+            second = client.reference("asiatyypit")
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first["trace"]["cache"], "network")
+        self.assertEqual(second["trace"]["cache"], "hit")
+        self.assertEqual(second["trace"]["retrieved_at"], first["trace"]["retrieved_at"])
+        self.assertEqual(second["data"], [1])
+
+    def test_cache_revalidates_stale_entries_with_etag(self):
+        now = [1000.0]
+        calls: list[dict[str, str]] = []
+
+        def transport(method, url, body, headers, timeout):
+            calls.append(dict(headers))
+            if "If-None-Match" in headers:
+                return HttpResponse(304, {}, b"", url)
+            return HttpResponse(200, {"ETag": '"v1"'}, b'{"count": 3}', url)
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, clock=lambda: now[0])
+            client = EduskuntaClient(transport=transport, cache=cache)
+            client.count({"category": "valtiopaivaasia"})
+            now[0] += 10_000
+            result = client.count({"category": "valtiopaivaasia"})
+
+        self.assertEqual(calls[1]["If-None-Match"], '"v1"')
+        self.assertEqual(result["trace"]["cache"], "revalidated")
+        self.assertEqual(result["data"]["count"], 3)
+
+    def test_cache_evicts_least_recently_used_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, max_bytes=10)
+            for name in ("a", "b"):
+                cache.put(
+                    name,
+                    HttpResponse(200, {}, b"123456", name),
+                    method="GET",
+                    url=name,
+                    ttl=60,
+                    retrieved_at="now",
+                )
+
+            self.assertIsNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("b"))
+
+    def test_cache_scans_its_directory_only_when_over_the_limit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, max_bytes=1000)
+            with mock.patch.object(cache, "_scan", wraps=cache._scan) as scan:
+                for index in range(150):
+                    cache.put(
+                        str(index),
+                        HttpResponse(200, {}, b"1234567890", str(index)),
+                        method="GET",
+                        url=str(index),
+                        ttl=60,
+                        retrieved_at="now",
+                    )
+            sizes = [path.stat().st_size for path in Path(directory).glob("*.body")]
+
+            self.assertLessEqual(scan.call_count, 7)
+            self.assertLessEqual(sum(sizes), 1000)
+            self.assertEqual(cache._size, sum(sizes))
+
+    def test_rate_limiter_bursts_then_paces(self):
+        now = [0.0]
+        limiter = RateLimiter(
+            buckets={"POST": BucketSpec(capacity=2, per_second=0.5)},
+            clock=lambda: now[0],
+        )
+
+        self.assertEqual([limiter.acquire("POST") for _ in range(3)], [0.0, 0.0, 2.0])
+        self.assertEqual(limiter.acquire("GET"), 0.0)
+        now[0] += 10
+        self.assertEqual(limiter.acquire("POST"), 0.0)
+
+    def test_default_get_bucket_leaves_concurrent_detail_calls_unpaced(self):
+        limiter = RateLimiter(clock=lambda: 0.0)
+
+        self.assertEqual({limiter.acquire("GET") for _ in range(100)}, {0.0})
+        limiter.penalize("GET", 5.0)
+        self.assertGreaterEqual(limiter.acquire("GET"), 5.0)
+
+    def test_rate_limiter_state_is_shared_through_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/rate.json"
+            buckets = {"GET": BucketSpec(capacity=1, per_second=1.0)}
+            first = RateLimiter(path, buckets=buckets, clock=lambda: 100.0)
+            second = RateLimiter(path, buckets=buckets, clock=lambda: 100.0)
+
+            self.assertEqual(first.acquire("GET"), 0.0)
+            self.assertEqual(second.acquire("GET"), 1.0)
+
+    def test_429_blocks_the_shared_bucket_for_retry_after(self):
+        calls = 0
+        sleeps: list[float] = []
+
+        def transport(method, url, body, headers, timeout):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                return HttpResponse(429, {"Retry-After": "30"}, b"slow down", url)
+            return HttpResponse(200, {}, b'{"count": 1}', url)
+
+        limiter = RateLimiter(clock=lambda: 0.0)
+        client = EduskuntaClient(
+            transport=transport, sleeper=sleeps.append, rate_limiter=limiter
+        )
+        client.count({"category": "valtiopaivaasia"})
+
+        self.assertEqual(sleeps, [30.0])
+        self.assertGreaterEqual(limiter.acquire("POST"), 30.0)
+
+    def test_batch_reports_failures_per_item_in_input_order(self):
+        def transport(method, url, body, headers, timeout):
+            if url.endswith("missing"):
+                return HttpResponse(404, {}, b"not found", url)
+            return HttpResponse(200, {}, json.dumps({"url": url}).encode("utf-8"), url)
+
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+        items = list(
+            client.batch(
+                "matter",
+                ["HE 1/2020 vp", "missing", "HE 3/2020 vp"],
+                workers=2,
+                ordered=True,
+            )
+        )
+
+        self.assertEqual([item["index"] for item in items], [0, 1, 2])
+        self.assertIn("HE%201%2F2020%20vp", items[0]["data"]["url"])
+        self.assertIn("HTTP 404", items[1]["error"])
+        self.assertNotIn("error", items[2])
+
+    def test_checkpointed_batch_only_refetches_failures(self):
+        requested: list[str] = []
+        broken = {"HE%202%2F2020%20vp"}
+
+        def transport(method, url, body, headers, timeout):
+            requested.append(url.rsplit("/", 1)[1])
+            if requested[-1] in broken:
+                return HttpResponse(404, {}, b"not found", url)
+            return HttpResponse(200, {}, b"{}", url)
+
+        identifiers = ["HE 1/2020 vp", "HE 2/2020 vp", "HE 3/2020 vp"]
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = HarvestCheckpoint(f"{directory}/batch.json")
+            client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+            first = list(client.batch("matter", identifiers, checkpoint=checkpoint))
+            broken.clear()
+            requested.clear()
+            second = list(client.batch("matter", identifiers, checkpoint=checkpoint))
+
+        self.assertEqual(sum("error" in item for item in first), 1)
+        self.assertEqual(requested, ["HE%202%2F2020%20vp"])
+        self.assertEqual(sorted(item["index"] for item in second), [0, 1, 2])
+        self.assertFalse(any("error" in item for item in second))
+
+    def test_checkpointed_batch_replays_in_input_order_for_the_same_list(self):
+        broken = {"HE%202%2F2020%20vp"}
+
+        def transport(method, url, body, headers, timeout):
+            if url.rsplit("/", 1)[1] in broken:
+                return HttpResponse(404, {}, b"not found", url)
+            return HttpResponse(200, {}, b"{}", url)
+
+        identifiers = ["HE 1/2020 vp", "HE 2/2020 vp", "HE 3/2020 vp"]
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = HarvestCheckpoint(f"{directory}/batch.json")
+            client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+            list(client.batch("matter", identifiers, checkpoint=checkpoint))
+            broken.clear()
+            second = list(
+                client.batch("matter", identifiers, ordered=True, checkpoint=checkpoint)
+            )
+            with self.assertRaisesRegex(ValueError, "different request"):
+                list(client.batch("matter", identifiers[:2], checkpoint=checkpoint))
+            checkpoint.records_path.unlink()
+            with self.assertRaisesRegex(ValueError, "missing or shorter"):
+                list(client.batch("matter", identifiers, checkpoint=checkpoint))
+
+        self.assertEqual(
+            [(item["index"], item["identifier"]) for item in second],
+            list(enumerate(identifiers)),
+        )
+
+    def test_batch_rejects_unknown_kind(self):
+        client = EduskuntaClient(transport=FakeSearchTransport(0))
+        with self.assertRaises(ValueError):
+            client.batch("search", ["x"])
+
+    def test_rejected_batch_leaves_the_output_file_alone(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "out.ndjson"
+            output.write_text("previous\n", encoding="utf-8")
+            identifiers = Path(directory) / "ids.txt"
+            identifiers.write_text("HE 1/2024 vp\n", encoding="utf-8")
+            arguments = ["--output", str(output), "batch", "matter"]
+            arguments += ["--input", str(identifiers), "--workers", "0"]
+
+            code = eduskunta_api.main(arguments)
+
+            self.assertNotEqual(code, 0)
+            self.assertEqual(output.read_text(encoding="utf-8"), "previous\n")
+
     def test_html_blocks_preserve_headings_and_paragraphs(self):
         html = """
         <html><head><style>hidden</style></head><body>
@@ -119,6 +789,288 @@ class ApiHelperTests(unittest.TestCase):
         )
 
 
+HTML_PIECES = (
+    "<p>",
+    "</p>",
+    "<P class='a>b'>",
+    "<td>",
+    "</TD>",
+    "<li>",
+    "</li>",
+    "<h2 id=x>",
+    "</h2>",
+    "<div>",
+    "</div>",
+    "<br/>",
+    "<p/>",
+    "<a href=x/>",
+    "<img src='a' />",
+    "<script>var s = '<p>piilossa</p>';</script>",
+    "<STYLE>p > b { }</style >",
+    "<svg><text>kuvio</text></svg>",
+    "<noscript>",
+    "</noscript>",
+    "<!-- <p>kommentti</p> -->",
+    "<!DOCTYPE html>",
+    "<?xml version='1.0'?>",
+    "Valiokunta ",
+    "  ",
+    "\n",
+    "&amp;",
+    "&auml;",
+    "&#228;",
+    "&nbsp",
+    " 1 < 2 ",
+    "äö",
+    "\xa0",
+    ">",
+)
+MALFORMED_PIECES = ("<", "</ p>", "</>", "<!x>", "<p =x>", "<!-->", "<![CDATA[x]]>")
+
+
+def _parser_blocks(html: str) -> list[dict]:
+    parser = BlockHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return parser.blocks
+
+
+def _streamed_blocks(html: str, rng: random.Random) -> tuple[list[dict], bool]:
+    extractor = StreamingBlockExtractor()
+    blocks: list[dict] = []
+    position = 0
+    while position < len(html):
+        size = rng.randint(1, 16)
+        blocks += extractor.feed(html[position : position + size])
+        position += size
+    blocks += extractor.close()
+    return blocks, extractor.fell_back
+
+
+class RunMetricsTests(unittest.TestCase):
+    def test_retry_reasons_and_sleeps_are_traced(self):
+        responses = [
+            HttpResponse(503, {}, b"", "x"),
+            HttpResponse(429, {"Retry-After": "2"}, b"", "x"),
+            HttpResponse(200, {}, b"{}", "x"),
+        ]
+        delays = []
+        metrics = RunMetrics()
+        client = EduskuntaClient(
+            transport=lambda *args: responses.pop(0),
+            sleeper=delays.append,
+            backoff=0.5,
+            metrics=metrics,
+        )
+
+        trace = client.mps()["trace"]
+
+        self.assertEqual(delays, [0.5, 2.0])
+        self.assertEqual(
+            trace["retries"],
+            [
+                {"attempt": 1, "reason": "HTTP 503", "delay": 0.5},
+                {"attempt": 2, "reason": "HTTP 429", "delay": 2.0},
+            ],
+        )
+        self.assertEqual(trace["sleep_seconds"], 2.5)
+        summary = metrics.summary()
+        self.assertEqual(summary["retries"], {"HTTP 503": 1, "HTTP 429": 1})
+        self.assertEqual(summary["sleep_seconds"]["request"], 2.5)
+
+    def test_summary_and_prometheus_textfile(self):
+        metrics = RunMetrics()
+        client = EduskuntaClient(
+            transport=FakeSearchTransport(5), sleeper=lambda delay: None, metrics=metrics
+        )
+        client.search_all({"category": "valtiopaivaasia"}, page_size=2, get_delay=0.25)
+        failing = EduskuntaClient(
+            transport=lambda method, url, *rest: HttpResponse(404, {}, b"", url),
+            metrics=metrics,
+        )
+        with self.assertRaises(ApiError):
+            failing.matter("HE 1/2099 vp")
+
+        summary = metrics.summary()
+        self.assertEqual(summary["requests"], 3)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["by_status"], {"200": 3})
+        self.assertEqual(summary["sleep_seconds"]["pause"], 0.5)
+        self.assertIsNotNone(summary["latency_seconds"]["p95"])
+        with tempfile.TemporaryDirectory() as directory:
+            chosen = metrics.write(f"{directory}/eduskunta.prom")
+            with open(f"{directory}/eduskunta.prom", encoding="utf-8") as handle:
+                lines = handle.read().splitlines()
+
+        self.assertEqual(chosen, "prometheus")
+        self.assertIn(
+            'eduskunta_requests_total{method="GET",status="200",cache="network"} 3',
+            lines,
+        )
+        self.assertIn('eduskunta_request_errors_total{method="GET"} 1', lines)
+        self.assertIn("# TYPE eduskunta_request_latency_seconds summary", lines)
+        self.assertIn("eduskunta_request_latency_seconds_count 3", lines)
+
+    def test_cli_writes_metrics_for_the_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            payload_path = f"{directory}/query.json"
+            metrics_path = f"{directory}/metrics.json"
+            with open(payload_path, "w", encoding="utf-8") as handle:
+                json.dump({"category": "valtiopaivaasia"}, handle)
+            with mock.patch.object(
+                eduskunta_api, "PooledTransport", lambda: FakeSearchTransport(3)
+            ):
+                code = eduskunta_api.main(
+                    [
+                        "--output", f"{directory}/out.json",
+                        "--rate-state", f"{directory}/rate.json",
+                        "--metrics", metrics_path,
+                        "search", "--payload", payload_path, "--all",
+                        "--method", "get", "--page-size", "2",
+                    ]
+                )
+            with open(metrics_path, encoding="utf-8") as handle:
+                summary = json.load(handle)
+
+        self.assertEqual(code, 0)
+        self.assertEqual(summary["requests"], 2)
+        self.assertEqual(summary["by_cache"], {"network": 2})
+
+
+class RequestSharingTests(unittest.TestCase):
+    def test_concurrent_identical_requests_share_one_response(self):
+        release = threading.Event()
+        calls = []
+
+        def slow(method, url, body, headers, timeout):
+            calls.append(url)
+            release.wait(5)
+            return HttpResponse(200, {}, b'{"id": "HE 1/2024 vp"}', url)
+
+        metrics = RunMetrics()
+        client = EduskuntaClient(transport=slow, metrics=metrics)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(client.matter("HE 1/2024 vp"))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        caches = sorted(result["trace"]["cache"] for result in results)
+        self.assertEqual(caches, ["coalesced"] * 4 + ["network"])
+        self.assertTrue(
+            all(result["data"]["id"] == "HE 1/2024 vp" for result in results)
+        )
+        self.assertEqual(metrics.summary()["requests"], 5)
+        self.assertEqual(client._in_flight, {})
+
+    def test_failures_are_neither_remembered_nor_left_in_flight(self):
+        calls = []
+
+        def missing(method, url, body, headers, timeout):
+            calls.append(url)
+            return HttpResponse(404, {}, b"", url)
+
+        client = EduskuntaClient(transport=missing, retries=0, memo=ResponseMemo())
+
+        for _ in range(2):
+            with self.assertRaises(ApiError):
+                client.matter("HE 1/2024 vp")
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(client._in_flight, {})
+
+    def test_memo_answers_repeats_within_its_bounds(self):
+        transport = FakeRecordTransport([{"id": "1", "vuosi": "2024"}])
+        memo = ResponseMemo(max_entries=2)
+        client = EduskuntaClient(transport=transport, memo=memo)
+
+        first = client.count({"category": "valtiopaivaasia"}, method="post")
+        again = client.count({"category": "valtiopaivaasia"}, method="post")
+        for category in ("a", "b"):
+            client.count({"category": category}, method="post")
+        evicted = client.count({"category": "valtiopaivaasia"}, method="post")
+
+        self.assertEqual(first["trace"]["cache"], "network")
+        self.assertEqual(again["trace"]["cache"], "memo")
+        self.assertEqual(again["trace"]["wire_bytes"], 0)
+        self.assertEqual(again["data"], first["data"])
+        self.assertEqual(evicted["trace"]["cache"], "network")
+        self.assertEqual(len(transport.calls), 4)
+        self.assertEqual(len(memo), 2)
+        self.assertEqual((memo.hits, memo.misses), (1, 4))
+
+    def test_memo_skips_search_pages_and_document_bodies(self):
+        transport = FakeSearchTransport(3)
+        memo = ResponseMemo()
+        client = EduskuntaClient(transport=transport, memo=memo)
+
+        for _ in range(2):
+            page = client.search({"category": "valtiopaivaasia"})
+            count = client.count({"category": "valtiopaivaasia"}, method="get")
+
+        self.assertEqual(page["trace"]["cache"], "network")
+        self.assertEqual(count["trace"]["cache"], "memo")
+        self.assertEqual(len(transport.calls), 3)
+        self.assertEqual(len(memo), 1)
+        arguments = ["public-url", "matter", "HE 1/2024 vp"]
+        self.assertEqual(
+            eduskunta_api.build_parser().parse_args(arguments).memo_size, 0
+        )
+
+
+class StreamingBlockExtractorTests(unittest.TestCase):
+    def test_random_documents_match_the_parser_in_any_chunking(self):
+        rng = random.Random(16)
+        for _ in range(2000):
+            html = "".join(rng.choice(HTML_PIECES) for _ in range(rng.randint(0, 40)))
+            expected = _parser_blocks(html)
+
+            self.assertEqual(extract_html_blocks(html), expected, html)
+            blocks, fell_back = _streamed_blocks(html, rng)
+            self.assertEqual(blocks, expected, html)
+            self.assertFalse(fell_back, html)
+
+    def test_malformed_markup_falls_back_to_the_parser(self):
+        rng = random.Random(61)
+        pieces = HTML_PIECES + MALFORMED_PIECES
+        for _ in range(2000):
+            html = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+            blocks, _ = _streamed_blocks(html, rng)
+
+            self.assertEqual(blocks, _parser_blocks(html), html)
+
+    def test_blocks_are_yielded_before_the_document_ends(self):
+        extractor = StreamingBlockExtractor()
+
+        first = extractor.feed("<h1>Otsikko</h1><p>Kesken")
+        second = extractor.feed(" oleva</p><td>")
+        rest = extractor.close()
+
+        self.assertEqual(first, [{"index": 0, "tag": "h1", "text": "Otsikko"}])
+        self.assertEqual(second, [{"index": 1, "tag": "p", "text": "Kesken oleva"}])
+        self.assertEqual(rest, [])
+
+    def test_byte_chunks_are_decoded_across_split_characters(self):
+        html = "<p>Hyväksytään &auml;änestyksettä</p>".encode()
+        chunks = [html[index : index + 1] for index in range(len(html))]
+
+        self.assertEqual(
+            list(iter_html_blocks(chunks)),
+            [{"index": 0, "tag": "p", "text": "Hyväksytään äänestyksettä"}],
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
 
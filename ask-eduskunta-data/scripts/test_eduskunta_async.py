@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import random
+import tempfile
+import threading
+import time
+import unittest
+
+from eduskunta_api import (
+    READ_CHUNK,
+    HttpResponse,
+    RateLimiter,
+    ResponseCache,
+    _BodyDecoder,
+)
+from eduskunta_async import AsyncEduskuntaClient, AsyncPooledTransport, _raw_body
+from test_eduskunta_api import (
+    FakeSearchTransport,
+    KeepAliveHandler,
+    LocalServerTestCase,
+)
+
+
+class AsyncFake:
+    """Wraps a synchronous fake transport and tracks requests in flight."""
+
+    def __init__(self, transport) -> None:
+        self.transport = transport
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, method, url, body, headers, timeout):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            return self.transport(method, url, body, headers, timeout)
+        finally:
+            self.in_flight -= 1
+
+
+class RecordingSleeper:
+    def __init__(self) -> None:
+        self.delays: list[float] = []
+
+    async def __call__(self, delay: float) -> None:
+        self.delays.append(delay)
+
+
+def _matter_transport(method, url, body, headers, timeout):
+    identifier = url.rsplit("/", 1)[1]
+    if identifier == "missing":
+        return HttpResponse(404, {}, b"not found", url)
+    return HttpResponse(200, {}, json.dumps({"id": identifier}).encode(), url)
+
+
+class AsyncClientTests(unittest.TestCase):
+    def test_search_all_pages_until_total(self):
+        transport = FakeSearchTransport(total=25)
+        sleeper = RecordingSleeper()
+        client = AsyncEduskuntaClient(transport=AsyncFake(transport), sleeper=sleeper)
+
+        result = asyncio.run(
+            client.search_all({"category": "valtiopaivaasia"}, page_size=10)
+        )
+
+        self.assertEqual(len(result["data"]["results"]), 25)
+        self.assertEqual(result["data"]["searchMetadata"]["totalResultCount"], 25)
+        self.assertTrue(result["trace"]["complete"])
+        self.assertEqual(len(result["trace"]["pages"]), 3)
+        self.assertEqual(sleeper.delays, [1.1, 1.1])
+
+    def test_iter_search_yields_pages_as_they_arrive(self):
+        transport = FakeSearchTransport(total=5)
+        client = AsyncEduskuntaClient(
+            transport=AsyncFake(transport), sleeper=RecordingSleeper()
+        )
+
+        async def collect():
+            return [
+                page
+                async for page in client.iter_search(
+                    {"category": "valtiopaivaasia"}, page_size=2, pages=True
+                )
+            ]
+
+        pages = asyncio.run(collect())
+
+        self.assertEqual([len(page["data"]["results"]) for page in pages], [2, 2, 1])
+
+    def test_retry_after_is_awaited_before_retrying(self):
+        responses = [
+            HttpResponse(429, {"Retry-After": "3"}, b"", "x"),
+            HttpResponse(200, {}, b'{"ok": true}', "x"),
+        ]
+
+        async def transport(method, url, body, headers, timeout):
+            return responses.pop(0)
+
+        sleeper = RecordingSleeper()
+        client = AsyncEduskuntaClient(transport=transport, sleeper=sleeper)
+
+        result = asyncio.run(client.mps())
+
+        self.assertEqual(result["data"], {"ok": True})
+        self.assertEqual(result["trace"]["attempt"], 2)
+        self.assertEqual(sleeper.delays, [3.0])
+
+    def test_concurrent_lookups_share_one_loop_within_the_bound(self):
+        fake = AsyncFake(_matter_transport)
+        client = AsyncEduskuntaClient(transport=fake, concurrency=5)
+
+        async def lookups():
+            return await asyncio.gather(
+                *(client.matter(f"HE {number}/2024 vp") for number in range(200))
+            )
+
+        results = asyncio.run(lookups())
+
+        self.assertEqual(len(results), 200)
+        self.assertEqual(results[7]["data"]["id"], "HE%207%2F2024%20vp")
+        self.assertEqual(fake.peak, 5)
+
+    def test_identical_concurrent_requests_share_one_response(self):
+        fake = AsyncFake(_matter_transport)
+        client = AsyncEduskuntaClient(transport=fake)
+
+        async def lookups():
+            return await asyncio.gather(
+                *(client.matter(f"HE {number % 3}/2024 vp") for number in range(30))
+            )
+
+        results = asyncio.run(lookups())
+
+        self.assertEqual(fake.peak, 3)
+        caches = [result["trace"]["cache"] for result in results]
+        self.assertEqual(caches.count("network"), 3)
+        self.assertEqual(caches.count("coalesced"), 27)
+        self.assertEqual(results[4]["data"]["id"], "HE%201%2F2024%20vp")
+        self.assertEqual(client._in_flight, {})
+
+    def test_waiters_take_over_when_the_leading_caller_is_cancelled(self):
+        fake = AsyncFake(_matter_transport)
+        client = AsyncEduskuntaClient(transport=fake)
+
+        async def lookups():
+            leader = asyncio.create_task(client.matter("HE 1/2024 vp"))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(client.matter("HE 1/2024 vp"))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await waiter
+
+        result = asyncio.run(lookups())
+
+        self.assertEqual(result["trace"]["cache"], "network")
+        self.assertEqual(client._in_flight, {})
+
+    def test_limiter_and_cache_io_stay_off_the_event_loop(self):
+        class SlowLimiter(RateLimiter):
+            threads: set[int] = set()
+
+            def acquire(self, method):
+                self.threads.add(threading.get_ident())
+                time.sleep(0.05)  # a host-wide file lock held by another run
+                return 0.0
+
+        ticks = []
+
+        async def run(client):
+            async def ticker():
+                while True:
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.005)
+
+            task = asyncio.create_task(ticker())
+            await client.matter("HE 1/2024 vp")
+            task.cancel()
+            return threading.get_ident()
+
+        with tempfile.TemporaryDirectory() as directory:
+            client = AsyncEduskuntaClient(
+                transport=AsyncFake(_matter_transport),
+                rate_limiter=SlowLimiter(),
+                cache=ResponseCache(directory),
+            )
+            loop_thread = asyncio.run(run(client))
+
+        self.assertNotIn(loop_thread, SlowLimiter.threads)
+        self.assertGreater(len(ticks), 3)
+
+    def test_batch_reports_failures_per_item_in_input_order(self):
+        client = AsyncEduskuntaClient(transport=AsyncFake(_matter_transport))
+
+        async def collect():
+            return [
+                item
+                async for item in client.batch(
+                    "matter", ["a", "missing", "b"], workers=2, ordered=True
+                )
+            ]
+
+        items = asyncio.run(collect())
+
+        self.assertEqual([item["identifier"] for item in items], ["a", "missing", "b"])
+        self.assertIn("HTTP 404", items[1]["error"])
+        self.assertEqual(items[2]["data"], {"id": "b"})
+
+
+class AsyncPooledTransportTests(LocalServerTestCase):
+    def test_connections_are_reused_and_bodies_decoded(self):
+        async def run():
+            async with AsyncEduskuntaClient(
+                self.base_url, transport=AsyncPooledTransport()
+            ) as client:
+                first = await client.matter("HE 1/2020 vp")
+                second = await client.mps()
+                return first, second, client.transport.connections_opened
+
+        first, second, opened = asyncio.run(run())
+
+        self.assertEqual(first["data"]["path"], "/valtiopaivaasiat/HE%201%2F2020%20vp")
+        self.assertEqual(second["data"]["path"], "/kansanedustajat")
+        self.assertLess(second["trace"]["wire_bytes"], second["trace"]["decoded_bytes"])
+        self.assertEqual(opened, 1)
+        self.assertEqual(KeepAliveHandler.connections, 1)
+
+    def test_chunked_gzip_body_is_decoded_as_it_arrives(self):
+        body = random.Random(11).randbytes(3 * READ_CHUNK)
+        wire = gzip.compress(body)
+        framed = b"".join(
+            b"%x\r\n%s\r\n" % (len(part), part)
+            for part in (wire[: READ_CHUNK + 5], wire[READ_CHUNK + 5 :])
+        )
+        headers = {"Transfer-Encoding": "chunked", "Content-Encoding": "gzip"}
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(framed + b"0\r\n\r\n")
+            reader.feed_eof()
+            decoder = _BodyDecoder(headers)
+            chunks, will_close = _raw_body(reader, "GET", 200, "HTTP/1.1", headers)
+            sizes, parts = [], []
+            async for chunk in chunks:
+                sizes.append(len(chunk))
+                parts.append(decoder.decode(chunk))
+            parts.append(decoder.finish())
+            return b"".join(parts), sizes, will_close, decoder.wire_bytes
+
+        decoded, sizes, will_close, wire_bytes = asyncio.run(run())
+
+        self.assertEqual(decoded, body)
+        self.assertLessEqual(max(sizes), READ_CHUNK)
+        self.assertEqual(wire_bytes, len(wire))
+        self.assertFalse(will_close)
+        self.assertNotIn("Content-Encoding", headers)
+
+    def test_post_redirect_is_followed_with_get(self):
+        async def run():
+            async with AsyncEduskuntaClient(
+                self.base_url, transport=AsyncPooledTransport()
+            ) as client:
+                return await client.count({"category": "valtiopaivaasia"})
+
+        result = asyncio.run(run())
+
+        self.assertEqual(result["data"]["path"], "/blob/result.json")
+        self.assertTrue(result["trace"]["final_url"].endswith("/blob/result.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
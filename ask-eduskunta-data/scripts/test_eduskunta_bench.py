@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import unittest
+
+from eduskunta_api import EduskuntaClient
+from eduskunta_bench import PageTransport, compare, no_sleep, run_suite
+
+
+class BenchmarkSuiteTests(unittest.TestCase):
+    def test_suite_reports_throughput_and_peak_memory(self):
+        report = run_suite(repeat=1, records=250, page_size=100, sections=20)
+
+        results = {result["name"]: result for result in report["results"]}
+        self.assertEqual(
+            list(results), ["search-all", "decode-json", "write-result", "html-blocks"]
+        )
+        self.assertEqual(results["search-all"]["items"], 250)
+        self.assertEqual(results["decode-json"]["items"], 100)
+        for result in results.values():
+            self.assertGreater(result["items_per_second"], 0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
+        self.assertTrue(results["html-blocks"]["identical"])
+
+    def test_page_transport_serves_every_page_to_the_client(self):
+        transport = PageTransport(total=250, page_size=100)
+        client = EduskuntaClient(transport=transport, sleeper=no_sleep)
+
+        result = client.search_all({"category": "valtiopaivaasia"}, page_size=100)
+
+        self.assertEqual(len(result["data"]["results"]), 250)
+        self.assertEqual(result["data"]["results"][-1]["id"], "asia-249")
+        self.assertEqual(transport.calls, 3)
+
+    def test_unknown_benchmark_is_rejected(self):
+        with self.assertRaises(ValueError):
+            run_suite(["nope"], repeat=1, records=10, page_size=10, sections=1)
+
+    def test_comparison_flags_slower_or_larger_runs(self):
+        def report(seconds, memory):
+            return {
+                "results": [
+                    {"name": "x", "seconds": seconds, "peak_memory_bytes": memory}
+                ]
+            }
+
+        self.assertFalse(compare(report(1.1, 100), report(1.0, 100))[0]["regressed"])
+        self.assertTrue(compare(report(2.0, 100), report(1.0, 100))[0]["regressed"])
+        self.assertTrue(compare(report(1.0, 300), report(1.0, 100))[0]["regressed"])
+        self.assertEqual(compare(report(1.0, 1), {"results": []}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import eduskunta_api
+from eduskunta_api import ApiError, EduskuntaClient, HttpResponse
+from eduskunta_documents import document_texts, edk_identifiers, matter_bundle
+
+
+def _document_transport(method, url, body, headers, timeout):
+    identifier = url.rsplit("/", 2)[1]
+    if identifier == "EDK-missing":
+        return HttpResponse(404, {}, b"", url)
+    html = f"<h1>{identifier}</h1><p>Lausunto  <b>teksti</b></p><script>x</script>"
+    return HttpResponse(
+        200, {"Content-Type": "text/html; charset=utf-8"}, html.encode("utf-8"), url
+    )
+
+
+class DocumentTextsTests(unittest.TestCase):
+    def setUp(self):
+        self.client = EduskuntaClient(
+            transport=_document_transport, sleeper=lambda _: None
+        )
+
+    def test_documents_are_fetched_and_parsed_in_a_process_pool(self):
+        summary = {}
+        items = list(
+            document_texts(
+                self.client,
+                [f"EDK-{number}" for number in range(6)] + ["EDK-missing"],
+                fetch_workers=3,
+                parse_workers=2,
+                ordered=True,
+                summary=summary,
+            )
+        )
+
+        self.assertEqual([item["index"] for item in items], list(range(7)))
+        self.assertEqual(
+            items[2]["data"]["blocks"],
+            [
+                {"index": 0, "tag": "h1", "text": "EDK-2"},
+                {"index": 1, "tag": "p", "text": "Lausunto teksti"},
+            ],
+        )
+        self.assertTrue(items[2]["data"]["source_url"].endswith("/EDK-2/html"))
+        self.assertIn("HTTP 404", items[6]["error"])
+        self.assertEqual(summary["documents"], 7)
+        self.assertEqual(summary["errors"], 1)
+        self.assertGreater(summary["documents_per_second"], 0)
+
+    def test_parsing_can_stay_in_the_fetch_threads(self):
+        items = list(
+            document_texts(self.client, ["EDK-a", "EDK-b"], parse_workers=0)
+        )
+
+        self.assertEqual(sorted(item["identifier"] for item in items), ["EDK-a", "EDK-b"])
+        self.assertTrue(all(len(item["data"]["blocks"]) == 2 for item in items))
+
+    def test_edk_identifiers_are_collected_from_a_listing(self):
+        listing = {
+            "asiakirjat": [
+                {"edktunnus": {"fi": "EDK-1"}, "liitteet": [{"edktunnus": "EDK-2"}]},
+                {"edktunnus": "EDK-1"},
+            ]
+        }
+
+        self.assertEqual(edk_identifiers(listing), ["EDK-1", "EDK-2"])
+
+
+class BundleTransport:
+    """Serves one matter's resources and tracks how many run at once."""
+
+    def __init__(self, missing: str = "") -> None:
+        self.missing = missing
+        self.urls: list[str] = []
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, method, url, body, headers, timeout):
+        with self.lock:
+            self.urls.append(url)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.02)
+            return self.respond(url)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def respond(self, url):
+        if self.missing and self.missing in url:
+            return HttpResponse(404, {}, b"", url)
+        if url.endswith("/html"):
+            name = url.rsplit("/", 2)[1]
+            html = f"<h1>{name}</h1><p>teksti</p>".encode("utf-8")
+            return HttpResponse(200, {"Content-Type": "text/html"}, html, url)
+        if "/valtiopaivaasiat/" in url:
+            data = {"eduskuntatunnus": {"fi": "HE 1/2024 vp"}, "nimeke": {"fi": "x"}}
+        elif "/asiakirjat/eduskuntatunnus/" in url:
+            data = {"asiakirjat": [{"edktunnus": "EDK-1"}, {"edktunnus": "EDK-2"}]}
+        elif "/asiakirjat/edktunnus/" in url:
+            data = {"edktunnus": url.rsplit("/", 1)[1]}
+        else:
+            data = [{"aanestysnumero": 3}]
+        return HttpResponse(200, {}, json.dumps(data).encode("utf-8"), url)
+
+
+class MatterBundleTests(unittest.TestCase):
+    def test_dependent_parts_are_fetched_concurrently(self):
+        transport = BundleTransport()
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+
+        bundle = matter_bundle(client, "he 1/2024 vp", html=True)
+
+        data = bundle["data"]
+        self.assertTrue(data["complete"])
+        self.assertEqual(data["eduskuntatunnus"], "HE 1/2024 vp")
+        self.assertEqual(data["edk_identifiers"], ["EDK-1", "EDK-2"])
+        self.assertEqual(data["document_metadata"]["EDK-2"], {"edktunnus": "EDK-2"})
+        self.assertEqual(data["document_texts"]["EDK-1"]["blocks"][0]["text"], "EDK-1")
+        self.assertEqual(data["votes"], [{"aanestysnumero": 3}])
+        self.assertIn("<h1>HE%201%2F2024%20vp</h1>", data["records"]["HE 1/2024 vp"])
+        self.assertTrue(bundle["trace"]["votes"]["url"].endswith("/HE%201%2F2024%20vp"))
+        self.assertEqual(set(bundle["trace"]["document_texts"]), {"EDK-1", "EDK-2"})
+        self.assertEqual(len(transport.urls), 8)
+        self.assertGreater(transport.peak, 2)
+
+    def test_a_failing_part_is_reported_without_stopping_the_rest(self):
+        transport = BundleTransport(missing="asian-aanestykset")
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None, retries=0)
+
+        bundle = matter_bundle(client, "HE 1/2024 vp", records=["PTK 5/2024 vp"])
+
+        self.assertFalse(bundle["data"]["complete"])
+        self.assertEqual(
+            [
+                (error["part"], error["identifier"])
+                for error in bundle["data"]["errors"]
+            ],
+            [("votes", "HE 1/2024 vp")],
+        )
+        self.assertIsNone(bundle["data"]["votes"])
+        self.assertEqual(list(bundle["data"]["records"]), ["PTK 5/2024 vp"])
+        self.assertNotIn("document_texts", bundle["data"])
+        self.assertEqual(len(bundle["data"]["document_metadata"]), 2)
+        with self.assertRaisesRegex(ApiError, "404"):
+            matter_bundle(
+                EduskuntaClient(
+                    transport=BundleTransport(missing="valtiopaivaasiat"), retries=0
+                ),
+                "HE 9/2024 vp",
+            )
+
+    def test_cli_writes_one_envelope(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = f"{directory}/bundle.json"
+            with mock.patch.object(eduskunta_api, "PooledTransport", BundleTransport):
+                code = eduskunta_api.main(
+                    ["--rate-state", f"{directory}/rate.json", "--output", output]
+                    + ["matter-bundle", "HE 1/2024 vp", "--html"]
+                )
+            with open(output, encoding="utf-8") as handle:
+                bundle = json.load(handle)
+
+        self.assertEqual(code, 0)
+        self.assertEqual(bundle["request"]["records"], ["HE 1/2024 vp"])
+        self.assertEqual(len(bundle["data"]["document_texts"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
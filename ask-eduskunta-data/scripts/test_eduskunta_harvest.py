@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import csv
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlparse
+
+import eduskunta_api
+from eduskunta_api import EduskuntaClient, HttpResponse
+from eduskunta_harvest import (
+    harvest_matters,
+    harvest_speeches,
+    reference_names,
+    speech_sessions,
+    write_table,
+)
+from eduskunta_reference import ReferenceRegistry
+from test_eduskunta_api import FakeRecordTransport
+
+ASIATYYPIT = [
+    {"lyhenne": {"fi": "HE"}, "nimi": {"fi": "Hallituksen esitys"}},
+    {"lyhenne": {"fi": "LA"}, "nimi": {"fi": "Lakialoite"}},
+]
+
+
+def _matter(tunnus, year, code, *, decision=None, events=()):
+    matter = {
+        "eduskuntatunnus": {"fi": tunnus},
+        "asiakirjatyyppikoodi": {"fi": code},
+        "asiakirjatyyppinimi": {"fi": code.lower()},
+        "valtiopaivavuosi": {"fi": str(year)},
+        "laadintapvm": {"fi": f"{year}-02-01"},
+        "tila": {"fi": "Käsittelyssä"},
+        "kasittelyt": {"fi": [{"tapahtumapvm": day} for day in events]},
+    }
+    if decision:
+        matter["kokonaispaatosnimi"] = {"fi": decision}
+    # The fake search matches on flat property names.
+    return {
+        "valtiopaivavuosi.fi": str(year),
+        "asiakirjatyyppikoodi.fi": code,
+        "valtiopaivaasia": matter,
+    }
+
+
+class MatterTransport(FakeRecordTransport):
+    def __call__(self, method, url, body, headers, timeout):
+        if "/reference-data/asiatyypit" in url:
+            return HttpResponse(200, {}, json.dumps(ASIATYYPIT).encode("utf-8"), url)
+        return super().__call__(method, url, body, headers, timeout)
+
+
+class HarvestMattersTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        records = [
+            _matter(
+                "HE 1/2023 vp",
+                2023,
+                "HE",
+                decision="Hyväksytty",
+                events=["2023-05-02", "2023-11-30", "1.6.2023"],
+            ),
+            _matter("LA 4/2023 vp", 2023, "LA"),
+            _matter("KK 9/2024 vp", 2024, "KK"),
+            _matter("HE 7/2024 vp", 2024, "HE"),
+            _matter("HE 2/2022 vp", 2022, "HE"),
+        ]
+        self.client = EduskuntaClient(
+            transport=MatterTransport(records), sleeper=lambda _: None
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_matters_are_collected_into_typed_columns(self):
+        table, trace = harvest_matters(
+            self.client, range(2023, 2025), types=["HE", "LA"], method="get"
+        )
+
+        self.assertEqual(table.tunnus, ["HE 1/2023 vp", "LA 4/2023 vp", "HE 7/2024 vp"])
+        self.assertEqual(list(table.year), [2023, 2023, 2024])
+        self.assertEqual(table.type_code.categories, [None, "HE", "LA"])
+        self.assertEqual(list(table.type_code.codes), [1, 2, 1])
+        self.assertEqual(
+            list(table.type_name.values()),
+            ["Hallituksen esitys", "Lakialoite", "Hallituksen esitys"],
+        )
+        self.assertEqual(table.closed[1], 0)
+        self.assertTrue(trace["complete"])
+        self.assertIn("/reference-data/asiatyypit", trace["reference"]["url"])
+
+    def test_type_names_can_come_from_a_registry(self):
+        registry = ReferenceRegistry(
+            {"asiatyypit": [{"lyhenne": "HE", "nimi": "Hallituksen esitys (snapshot)"}]}
+        )
+
+        with mock.patch.object(self.client, "reference") as reference:
+            table, trace = harvest_matters(
+                self.client, range(2024, 2025), types=["HE"], registry=registry
+            )
+
+        reference.assert_not_called()
+        self.assertEqual(
+            list(table.type_name.values()), ["Hallituksen esitys (snapshot)"]
+        )
+        self.assertIsNone(trace["reference"])
+
+    def test_csv_output_decodes_dates_and_categories(self):
+        table, _ = harvest_matters(self.client, range(2023, 2024), method="get")
+        path = Path(self.directory.name) / "asiat.csv"
+
+        self.assertEqual(write_table(table, path), "csv")
+        with path.open(encoding="utf-8", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+
+        self.assertEqual(rows[0]["tunnus"], "HE 1/2023 vp")
+        self.assertEqual(rows[0]["asiatyyppi"], "Hallituksen esitys")
+        self.assertEqual(rows[0]["tilanne"], "Hyväksytty")
+        self.assertEqual(rows[0]["anto_pvm"], "2023-02-01")
+        self.assertEqual(rows[0]["kasittely_paattynyt"], "2023-11-30")
+        self.assertEqual(rows[1]["tilanne"], "Käsittelyssä")
+        self.assertEqual(rows[1]["kasittely_paattynyt"], "")
+
+    @unittest.skipIf(importlib.util.find_spec("pyarrow"), "pyarrow is installed")
+    def test_parquet_without_pyarrow_is_reported(self):
+        table, _ = harvest_matters(self.client, range(2023, 2024), method="get")
+
+        with self.assertRaises(ValueError):
+            write_table(table, Path(self.directory.name) / "asiat.parquet")
+
+    def test_reference_names_accepts_wrapped_lists(self):
+        wrapped = {"asiatyypit": [{"koodi": "VK", "selite": {"fi": "Välikysymys"}}]}
+
+        self.assertEqual(reference_names(wrapped), {"VK": "Välikysymys"})
+
+    def test_years_must_be_contiguous(self):
+        with self.assertRaises(ValueError):
+            harvest_matters(self.client, [2020, 2022])
+
+
+def _speech(identifier, session, speaker, kind="T", year=2024):
+    return {
+        "id": identifier,
+        "valtiopaivavuosi": str(year),
+        "taysistuntonumero": session,
+        "puheenvuorotyyppikoodi": kind,
+        "puhuja": {"henkilonro": speaker},
+    }
+
+
+SPEECHES = [
+    _speech("1", 1, "100"),
+    _speech("2", 1, "200", "V"),
+    _speech("3", 2, "100"),
+    _speech("4", 5, "300", "V"),
+    _speech("5", 5, "100"),
+    _speech("6", 9, "100", year=2023),
+]
+
+
+class SpeechTransport(FakeRecordTransport):
+    """Also serves speech 3 a second time in session 5, as a moving page might."""
+
+    def __call__(self, method, url, body, headers, timeout):
+        response = super().__call__(method, url, body, headers, timeout)
+        session = {"property": "taysistuntonumero", "match": "5"}
+        if session not in self.calls[-1]["payload"]["expression"].get("and", []):
+            return response
+        data = json.loads(response.body)
+        data["results"].append(SPEECHES[2])
+        return HttpResponse(200, {}, json.dumps(data).encode("utf-8"), url)
+
+
+class HarvestSpeechesTests(unittest.TestCase):
+    def setUp(self):
+        self.transport = SpeechTransport(SPEECHES)
+        self.client = EduskuntaClient(transport=self.transport, sleeper=lambda _: None)
+
+    def test_sessions_are_found_with_a_binary_search_over_counts(self):
+        traces = []
+        payload = {
+            "category": "puheenvuoro",
+            "expression": {"property": "valtiopaivavuosi", "match": "2024"},
+        }
+
+        sessions = speech_sessions(self.client, payload, traces=traces)
+
+        self.assertEqual(sessions, range(1, 6))
+        self.assertLessEqual(len(traces), 15)
+        probes = [
+            call["payload"]["expression"]["and"][1] for call in self.transport.calls
+        ]
+        self.assertNotIn("from", json.dumps(probes))
+        self.assertEqual(len(probes[0]["or"]), 8)
+
+    def test_year_is_harvested_per_session_without_duplicates(self):
+        summary = {}
+
+        records = list(
+            harvest_speeches(
+                self.client, 2024, workers=3, ordered=True, summary=summary
+            )
+        )
+
+        self.assertEqual(
+            [record["id"] for record in records], ["1", "2", "3", "4", "5"]
+        )
+        self.assertEqual(summary["sessions"], 5)
+        self.assertEqual(summary["speeches"], 5)
+        self.assertEqual(summary["duplicates"], 1)
+        self.assertEqual(summary["expected"], 5)
+        self.assertTrue(summary["complete"])
+        self.assertEqual(
+            [trace["records"] for trace in summary["session_traces"]], [2, 1, 0, 0, 3]
+        )
+
+    def test_sparse_speaker_is_harvested_across_long_gaps(self):
+        records = [_speech(str(number), number, "200") for number in range(1, 31)]
+        records += [_speech("a", 2, "100"), _speech("b", 25, "100")]
+        transport = FakeRecordTransport(records)
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+        summary = {}
+
+        found = list(harvest_speeches(client, 2024, speakers=["100"], summary=summary))
+
+        self.assertEqual(sorted(record["id"] for record in found), ["a", "b"])
+        self.assertEqual(summary["sessions"], 30)
+        self.assertEqual(summary["expected"], 2)
+        self.assertTrue(summary["complete"])
+
+    def test_harvest_short_of_the_total_count_is_incomplete(self):
+        def losing(method, url, body, headers, timeout):
+            response = self.transport(method, url, body, headers, timeout)
+            if urlparse(url).path.endswith("/search/count"):
+                return response
+            data = json.loads(response.body)
+            data["results"] = [r for r in data["results"] if r["id"] != "4"]
+            return HttpResponse(200, {}, json.dumps(data).encode("utf-8"), url)
+
+        client = EduskuntaClient(transport=losing, sleeper=lambda _: None)
+        summary = {}
+
+        records = list(harvest_speeches(client, 2024, method="post", summary=summary))
+
+        self.assertEqual(len(records), 4)
+        self.assertEqual(summary["expected"], 5)
+        self.assertFalse(summary["complete"])
+
+    def test_speaker_and_type_filters(self):
+        records = list(
+            harvest_speeches(
+                self.client, 2024, speakers=["100"], types=["T"], sessions=[1, 2, 5]
+            )
+        )
+
+        self.assertEqual(sorted(record["id"] for record in records), ["1", "3", "5"])
+        base = self.transport.calls[-1]["payload"]["expression"]["and"][0]["and"]
+        self.assertIn({"property": "puheenvuorotyyppikoodi", "match": "T"}, base)
+        self.assertIn(
+            {"termWithIds": {"term": "puhuja.henkilonro", "ids": ["100"]}}, base
+        )
+
+    def test_speakers_are_still_matched_locally(self):
+        def ignoring_speakers(method, url, body, headers, timeout):
+            payload = json.loads(body.decode("utf-8"))
+            base = payload["expression"]["and"][0]
+            base["and"] = [
+                clause for clause in base["and"] if "termWithIds" not in clause
+            ]
+            body = json.dumps(payload).encode("utf-8")
+            return self.transport(method, url, body, headers, timeout)
+
+        client = EduskuntaClient(transport=ignoring_speakers, sleeper=lambda _: None)
+
+        records = list(
+            harvest_speeches(
+                client, 2024, speakers=["300"], sessions=[5], method="post"
+            )
+        )
+
+        self.assertEqual([record["id"] for record in records], ["4"])
+
+    def test_failed_session_is_reported_and_others_continue(self):
+        def failing(method, url, body, headers, timeout):
+            if '"match":"2"' in (body or url.encode()).decode():
+                return HttpResponse(404, {}, b"", url)
+            return self.transport(method, url, body, headers, timeout)
+
+        client = EduskuntaClient(transport=failing, sleeper=lambda _: None, retries=0)
+        summary = {}
+
+        records = list(
+            harvest_speeches(
+                client, 2024, sessions=[1, 2], method="post", summary=summary
+            )
+        )
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(summary["errors"][0]["session"], 2)
+        self.assertFalse(summary["complete"])
+
+    def test_cli_streams_records_and_a_trailer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "puheet.ndjson"
+            with mock.patch.object(
+                eduskunta_api, "PooledTransport", lambda: SpeechTransport(SPEECHES)
+            ):
+                code = eduskunta_api.main(
+                    [
+                        "--rate-state", f"{directory}/rate.json",
+                        "--output", str(output),
+                        "harvest-speeches", "--year", "2024", "--sessions", "1:3",
+                        "--ordered",
+                    ]
+                )
+            lines = [json.loads(line) for line in output.read_text().splitlines()]
+
+        self.assertEqual(code, 0)
+        self.assertEqual([line.get("id") for line in lines[:-1]], ["1", "2", "3"])
+        self.assertEqual(lines[-1]["trailer"]["summary"]["sessions"], 2)
+        self.assertEqual(lines[-1]["trailer"]["request"]["sessions"], "1:3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import eduskunta_api
+from eduskunta_index import TextIndex, TextIndexBuilder, speech_blocks, tokenize
+
+DOCUMENT = {
+    "trace": {"final_url": "https://example.test/EDK-1/html"},
+    "request": None,
+    "data": {
+        "edktunnus": "EDK-1",
+        "source_url": "https://example.test/EDK-1/html",
+        "blocks": [
+            {"index": 0, "tag": "h1", "text": "Asiantuntijalausunto"},
+            {
+                "index": 1,
+                "tag": "p",
+                "text": "Tietosuojan taso ja EU:n tietosuoja-asetus.",
+            },
+            {
+                "index": 2,
+                "tag": "p",
+                "text": "Valvonta kuuluu tietosuojavaltuutetulle.",
+            },
+        ],
+    },
+}
+SPEECH = {
+    "puheenvuoro": {
+        "id": "77",
+        "henkilonro": "1234",
+        "asia": {"fi": {"eduskuntatunnus": "HE 1/2024 vp"}},
+        "puheenvuoro": {"fi": "Arvoisa puhemies!\nTietosuojasta ei saa tinkiä."},
+    }
+}
+
+
+class TokenizeTests(unittest.TestCase):
+    def test_finnish_words(self):
+        self.assertEqual(
+            tokenize("EU:n tietosuoja-asetus, HE:ssä vaa'an Äänestys_2024"),
+            ["eu", "tietosuoja", "asetus", "he", "vaaan", "äänestys", "2024"],
+        )
+
+    def test_speech_text_is_split_into_paragraphs(self):
+        self.assertEqual(
+            speech_blocks(SPEECH), ["Arvoisa puhemies!", "Tietosuojasta ei saa tinkiä."]
+        )
+        self.assertEqual(
+            speech_blocks({"puheenvuoroXml": "<p>Yksi</p><p>Kaksi</p>"}),
+            ["Yksi", "Kaksi"],
+        )
+
+
+class TextIndexTests(unittest.TestCase):
+    def setUp(self):
+        builder = TextIndexBuilder()
+        builder.add_item(DOCUMENT)
+        builder.add_item(SPEECH)
+        builder.add_item({"trailer": {"summary": {}}})
+        builder.add_item(DOCUMENT)
+        self.skipped = builder.skipped
+        self.index = builder.build()
+
+    def test_prefix_search_finds_inflected_forms(self):
+        result = self.index.search("tietosuoj*")
+
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(
+            [(hit["identifier"], hit["block"]) for hit in result["hits"]],
+            [("EDK-1", 1), ("EDK-1", 2), ("77", 1)],
+        )
+        self.assertEqual(result["hits"][0]["score"], 2)
+        self.assertEqual(
+            result["hits"][0]["source_url"], DOCUMENT["data"]["source_url"]
+        )
+        self.assertEqual(result["hits"][2]["eduskuntatunnus"], "HE 1/2024 vp")
+        self.assertEqual(self.skipped, 1)
+
+    def test_exact_words_phrases_and_conjunction(self):
+        self.assertEqual(self.index.search("tietosuoja")["total"], 1)
+        self.assertEqual(
+            self.index.search('"eu:n tietosuoja"')["hits"][0]["positions"], [3]
+        )
+        self.assertEqual(self.index.search("tietosuoja-asetus")["total"], 1)
+        self.assertEqual(self.index.search('"tietosuoja eu"')["total"], 0)
+        self.assertEqual(self.index.search("tietosuoj* valvon*")["total"], 1)
+        self.assertEqual(self.index.search("puhemies tinkiä")["total"], 0)
+        with self.assertRaises(ValueError):
+            self.index.search("t*")
+
+    def test_saved_index_answers_the_same(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "texts.idx"
+            self.index.save(path)
+            loaded = TextIndex.load(path)
+            path.write_bytes(path.read_bytes()[:-1])
+            with self.assertRaisesRegex(ValueError, "Truncated"):
+                TextIndex.load(path)
+
+        self.assertEqual(loaded.search("tietosuoj*"), self.index.search("tietosuoj*"))
+        self.assertEqual(loaded.summary(), self.index.summary())
+
+    def test_cli_builds_and_searches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            texts = Path(directory) / "texts.ndjson"
+            texts.write_text(
+                "\n".join(json.dumps(item) for item in (DOCUMENT, SPEECH)),
+                encoding="utf-8",
+            )
+            index = f"{directory}/texts.idx"
+            output = f"{directory}/out.json"
+            common = ["--output", output, "text-index"]
+            built = eduskunta_api.main(
+                common + ["build", "--index", index, "--input", str(texts)]
+            )
+            found = eduskunta_api.main(
+                common + ["search", "--index", index, "--query", "tinki*"]
+            )
+            with open(output, encoding="utf-8") as handle:
+                result = json.load(handle)
+
+        self.assertEqual((built, found), (0, 0))
+        self.assertEqual(result["trace"]["source"], "local")
+        self.assertEqual(result["data"]["hits"][0]["identifier"], "77")
+
+
+if __name__ == "__main__":
+    unittest.main()
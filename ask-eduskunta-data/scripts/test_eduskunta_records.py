@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import unittest
+
+from eduskunta_records import first_scalar, iso_date, localised, record_value, scalar
+
+
+class RecordFieldTests(unittest.TestCase):
+    def test_record_value_unwraps_nested_localised_fields(self):
+        record = {"valtiopaivaasia": {"eduskuntatunnus": {"fi": "HE 1/2024 vp"}}}
+        self.assertEqual(record_value(record, "eduskuntatunnus"), "HE 1/2024 vp")
+
+    def test_localised_prefers_finnish_then_swedish(self):
+        self.assertEqual(localised({"fi": "Jaa", "sv": "Ja"}), "Jaa")
+        self.assertEqual(localised({"sv": "Ja"}), "Ja")
+        self.assertEqual(localised({"nimi": "x"}), {"nimi": "x"})
+
+    def test_scalar_names_coded_objects_and_rejects_lists(self):
+        self.assertEqual(
+            scalar({"fi": {"nimi": "Kokoomus", "koodi": "kok"}}), "Kokoomus"
+        )
+        self.assertEqual(scalar(12), "12")
+        self.assertIsNone(scalar([1]))
+        self.assertIsNone(scalar({"muu": 1}))
+        self.assertEqual(
+            first_scalar({"a": None, "b": {"koodi": "T"}}, ("a", "b")), "T"
+        )
+
+    def test_iso_date_reads_iso_and_finnish_dates(self):
+        self.assertEqual(iso_date("2024-02-01T10:00:00"), "2024-02-01")
+        self.assertEqual(iso_date({"fi": "1.2.2024"}), "2024-02-01")
+        self.assertIsNone(iso_date("helmikuu"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+import eduskunta_api
+from eduskunta_api import REFERENCE_NAMES, ApiError, EduskuntaClient, HttpResponse
+from eduskunta_reference import ReferenceRegistry, reference_periods
+
+TABLES = {
+    "asiatyypit": [
+        {"lyhenne": {"fi": "HE"}, "nimi": {"fi": "Hallituksen esitys"}},
+        {"lyhenne": {"fi": "VK"}, "nimi": {"fi": "Välikysymys"}},
+    ],
+    "valtiopaivat": {
+        "valtiopaivat": [
+            {"tunnus": "2023", "alkupvm": "2023-04-12", "loppupvm": "2024-02-06"},
+            {"tunnus": "2024", "alkupvm": "6.2.2024", "loppupvm": "4.2.2025"},
+            {"tunnus": "2025", "alkupvm": "2025-02-05"},
+        ]
+    },
+    "vaalikaudet": [
+        {"tunnus": "2019-2023", "alkupvm": "2019-04-17", "loppupvm": "2023-04-04"},
+        {"tunnus": "2023-2027", "alkupvm": "2023-04-05", "loppupvm": "2027-04-13"},
+    ],
+}
+
+
+class ReferenceTransport:
+    """Serves every reference table and tracks how many run at once."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, method, url, body, headers, timeout):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.02)
+            name = url.rsplit("/", 1)[1]
+            data = TABLES.get(name, [])
+            return HttpResponse(200, {}, json.dumps(data).encode("utf-8"), url)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class ReferenceRegistryTests(unittest.TestCase):
+    def test_fetch_loads_every_table_concurrently(self):
+        transport = ReferenceTransport()
+        client = EduskuntaClient(transport=transport)
+
+        registry = ReferenceRegistry.fetch(client)
+
+        self.assertEqual(set(registry.tables), REFERENCE_NAMES)
+        self.assertGreater(transport.peak, 1)
+        self.assertIn(
+            "/reference-data/vaalikaudet", registry.traces["vaalikaudet"]["url"]
+        )
+
+    def test_fetch_fails_when_a_table_is_missing(self):
+        def flaky(method, url, body, headers, timeout):
+            if url.endswith("/valiokunnat"):
+                return HttpResponse(404, {}, b"", url)
+            return HttpResponse(200, {}, b"[]", url)
+
+        client = EduskuntaClient(transport=flaky, retries=0)
+
+        with self.assertRaisesRegex(ApiError, "valiokunnat"):
+            ReferenceRegistry.fetch(client)
+
+    def test_code_and_date_lookups(self):
+        registry = ReferenceRegistry(TABLES)
+
+        self.assertEqual(registry.name("asiatyypit", "VK"), "Välikysymys")
+        self.assertIsNone(registry.name("asiatyypit", "XX"))
+        self.assertEqual(registry.valtiopaivat_on("2024-02-06").code, "2024")
+        self.assertEqual(registry.valtiopaivat_on(date(2023, 12, 1)).code, "2023")
+        self.assertEqual(registry.valtiopaivat_on("1.1.2030").code, "2025")
+        self.assertIsNone(registry.valtiopaivat_on("2023-01-01"))
+        self.assertEqual(registry.vaalikausi_on("2023-04-05").code, "2023-2027")
+        self.assertIsNone(registry.vaalikausi_on("2027-05-01"))
+        with self.assertRaises(ValueError):
+            registry.vaalikausi_on("huomenna")
+        with self.assertRaises(ValueError):
+            registry.names("valiokunnat")
+
+    def test_periods_without_a_start_day_are_skipped(self):
+        periods = reference_periods([{"tunnus": "x"}, {"alkupvm": "2020-01-01"}])
+
+        self.assertEqual([period.start for period in periods], ["2020-01-01"])
+
+    def test_snapshot_round_trip_checks_version_and_digest(self):
+        registry = ReferenceRegistry(TABLES, retrieved_at="2025-01-01T00:00:00Z")
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "reference.json"
+            registry.save(path)
+            loaded = ReferenceRegistry.load(path)
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+            snapshot["tables"]["asiatyypit"] = []
+            path.write_text(json.dumps(snapshot), encoding="utf-8")
+            with self.assertRaises(ValueError):
+                ReferenceRegistry.load(path)
+            snapshot["version"] = 99
+            path.write_text(json.dumps(snapshot), encoding="utf-8")
+            with self.assertRaisesRegex(ValueError, "version"):
+                ReferenceRegistry.load(path)
+
+        self.assertEqual(loaded.tables, registry.tables)
+        self.assertEqual(loaded.digest, registry.digest)
+        self.assertEqual(loaded.retrieved_at, "2025-01-01T00:00:00Z")
+
+    def test_cli_snapshot_then_lookup_without_network(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_path = f"{directory}/reference.json"
+            output_path = f"{directory}/out.json"
+            common = ["--rate-state", f"{directory}/rate.json", "--output", output_path]
+            with mock.patch.object(
+                eduskunta_api, "PooledTransport", ReferenceTransport
+            ):
+                code = eduskunta_api.main(
+                    common + ["reference-snapshot", snapshot_path]
+                )
+            with open(output_path, encoding="utf-8") as handle:
+                fetched = json.load(handle)
+            with mock.patch.object(eduskunta_api, "PooledTransport", None):
+                lookup_code = eduskunta_api.main(
+                    common
+                    + ["reference-lookup", snapshot_path, "--date", "2024-06-01"]
+                    + ["--table", "asiatyypit", "--code", "HE"]
+                )
+            with open(output_path, encoding="utf-8") as handle:
+                looked_up = json.load(handle)
+
+        self.assertEqual((code, lookup_code), (0, 0))
+        self.assertEqual(fetched["data"]["tables"]["vaalikaudet"], 2)
+        self.assertEqual(looked_up["trace"]["source"], "local")
+        self.assertEqual(looked_up["data"]["valtiopaivat"]["code"], "2024")
+        self.assertEqual(looked_up["data"]["vaalikausi"]["code"], "2023-2027")
+        self.assertEqual(looked_up["data"]["name"], "Hallituksen esitys")
+
+
+if __name__ == "__main__":
+    unittest.main()
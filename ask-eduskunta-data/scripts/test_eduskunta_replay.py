@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import eduskunta_api
+from eduskunta_api import ApiError, EduskuntaClient, HttpResponse, PooledTransport
+from eduskunta_replay import (
+    FixtureCorpus,
+    RecordingTransport,
+    ReplayTransport,
+    RequestBudget,
+    StandInServer,
+    matches,
+    parse_budget,
+    read_cassette,
+)
+from test_eduskunta_api import FakeSearchTransport
+
+RECORD = {
+    "valtiopaivaasia": {
+        "id": "42",
+        "eduskuntatunnus": {"fi": "HE 1/2024 vp"},
+        "asiakirjatyyppikoodi": {"fi": "HE"},
+        "valtiopaivavuosi": {"fi": "2024"},
+        "laadintapvm": "2024-03-01",
+        "nimeketeksti": {"fi": "Hallituksen esitys tietojärjestelmästä"},
+        "aktiivinen": True,
+        "eduskuntaryhmat": [{"nimi": "Kokoomuksen eduskuntaryhmä", "alku": 2019}],
+    }
+}
+
+
+def _matters(count: int) -> list[dict]:
+    kinds = ("HE", "LA", "KK")
+    return [
+        {
+            "id": str(index),
+            "asiakirjatyyppikoodi": {"fi": kinds[index % 3]},
+            "valtiopaivavuosi": {"fi": str(2020 + index % 5)},
+        }
+        for index in range(count)
+    ]
+
+
+class RecordReplayTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cassette = Path(self.directory.name) / "cassette.ndjson"
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_replay_answers_recorded_requests_without_network(self):
+        recorder = RecordingTransport(self.cassette, FakeSearchTransport(5))
+        recorded = EduskuntaClient(transport=recorder, sleeper=lambda _: None)
+        original = recorded.search_all({"category": "x"}, page_size=2, method="post")
+
+        replayed = EduskuntaClient(
+            transport=ReplayTransport(self.cassette), sleeper=lambda _: None
+        ).search_all({"category": "x"}, page_size=2, method="post")
+
+        self.assertEqual(recorder.recorded, 3)
+        self.assertEqual(replayed["data"], original["data"])
+        with self.assertRaisesRegex(ApiError, "404"):
+            EduskuntaClient(transport=ReplayTransport(self.cassette)).mps()
+
+    def test_repeated_requests_replay_in_recorded_order(self):
+        responses = [
+            HttpResponse(503, {}, b"", "x"),
+            HttpResponse(200, {}, b'{"ok": true}', "x"),
+        ]
+        recorder = RecordingTransport(self.cassette, lambda *args: responses.pop(0))
+        EduskuntaClient(transport=recorder, sleeper=lambda _: None).mps()
+        replay = ReplayTransport(read_cassette(self.cassette))
+        delays = []
+
+        result = EduskuntaClient(transport=replay, sleeper=delays.append).mps()
+
+        self.assertEqual(result["data"], {"ok": True})
+        self.assertEqual(len(delays), 1)
+        self.assertEqual(result["trace"]["retries"][0]["reason"], "HTTP 503")
+
+    def test_cli_records_then_replays(self):
+        output = Path(self.directory.name) / "out.json"
+        payload = Path(self.directory.name) / "query.json"
+        payload.write_text(json.dumps({"category": "valtiopaivaasia"}))
+        common = [
+            "--rate-state",
+            f"{self.directory.name}/rate.json",
+            "--output",
+            str(output),
+        ]
+        search = ["search", "--payload", str(payload), "--method", "get"]
+        with mock.patch.object(
+            eduskunta_api, "PooledTransport", lambda: FakeSearchTransport(3)
+        ):
+            recorded = eduskunta_api.main(
+                common + ["--record", str(self.cassette)] + search
+            )
+        first = json.loads(output.read_text(encoding="utf-8"))
+        with mock.patch.object(eduskunta_api, "PooledTransport", None):
+            replayed = eduskunta_api.main(
+                common + ["--replay", str(self.cassette)] + search
+            )
+        second = json.loads(output.read_text(encoding="utf-8"))
+
+        self.assertEqual((recorded, replayed), (0, 0))
+        self.assertEqual(second["data"], first["data"])
+
+    def test_replay_and_stand_in_runs_keep_off_the_shared_rate_state(self):
+        parser = eduskunta_api.build_parser()
+
+        def limiter(*argv):
+            args = parser.parse_args([*argv, "mps"])
+            return eduskunta_api._rate_limiter_from_args(args)
+
+        replay = limiter("--replay", str(self.cassette))
+        stand_in = limiter("--base-url", "http://127.0.0.1:8080/api/v1")
+        explicit = limiter("--base-url", "http://127.0.0.1:8080", "--rate-state", "r")
+
+        self.assertEqual(replay.buckets, {})
+        self.assertEqual(replay.acquire("POST"), 0.0)
+        self.assertEqual(limiter().state_path, eduskunta_api.DEFAULT_RATE_STATE)
+        self.assertEqual(
+            stand_in.state_path.name, "ask-eduskunta-data-ratelimit-127.0.0.1_8080.json"
+        )
+        self.assertEqual(explicit.state_path, Path("r"))
+
+
+class ExpressionTests(unittest.TestCase):
+    def test_operators(self):
+        cases = [
+            ({"property": "valtiopaivavuosi.fi", "match": "2024"}, True),
+            ({"property": "asiakirjatyyppikoodi", "match": "H"}, False),
+            ({"property": "nimeketeksti", "match": "tietojärjestelm"}, True),
+            ({"property": "laadintapvm", "match_phrase": "2024-03"}, True),
+            (
+                {
+                    "property": "laadintapvm",
+                    "fromDate": "2024-01-01",
+                    "toDate": "2024-03-01",
+                },
+                False,
+            ),
+            ({"property": "eduskuntaryhmat.alku", "from": 2019, "to": 2020}, True),
+            ({"property": "aktiivinen", "boolValue": True}, True),
+            ({"exists": "loppupvm"}, False),
+            ({"ids": ["41", "42"]}, True),
+            ({"not": {"property": "asiakirjatyyppikoodi.fi", "match": "HE"}}, False),
+            (
+                {
+                    "property": "eduskuntaryhmat",
+                    "with": {
+                        "and": [
+                            {"property": "nimi", "match": "kokoomuksen"},
+                            {"property": "alku", "intValue": 2019},
+                        ]
+                    },
+                },
+                True,
+            ),
+        ]
+        for expression, expected in cases:
+            with self.subTest(expression=expression):
+                self.assertIs(matches(RECORD, expression), expected)
+        with self.assertRaises(ValueError):
+            matches(RECORD, {"property": "x", "regex": "."})
+
+    def test_parse_budget(self):
+        self.assertEqual(
+            parse_budget("post=450/3000"), ("POST", RequestBudget(450, 3000.0))
+        )
+        with self.assertRaises(ValueError):
+            parse_budget("POST=many")
+
+
+class StandInServerTests(unittest.TestCase):
+    def serve(self, **options) -> StandInServer:
+        corpus = FixtureCorpus({"valtiopaivaasia": _matters(250)})
+        corpus.add_detail(
+            "/valtiopaivaasiat/HE%201%2F2024%20vp", {"id": "HE 1/2024 vp"}
+        )
+        server = StandInServer(corpus, **options).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_search_count_aggregation_and_details(self):
+        server = self.serve()
+        transport = PooledTransport()
+        self.addCleanup(transport.close)
+        client = EduskuntaClient(
+            server.base_url, transport=transport, sleeper=lambda _: None
+        )
+        payload = {
+            "category": "valtiopaivaasia",
+            "expression": {"property": "asiakirjatyyppikoodi.fi", "match": "HE"},
+        }
+
+        everything = client.search_all(payload, page_size=30, method="get")
+        counted = client.count(payload)
+        unique = client.aggregate(
+            {
+                "category": "valtiopaivaasia",
+                "agg": {"unique": {"terms": ["asiakirjatyyppikoodi"]}},
+            }
+        )
+        matter = client.matter("HE 1/2024 vp")
+
+        self.assertEqual(len(everything["data"]["results"]), 84)
+        self.assertEqual(counted["data"], {"count": 84})
+        self.assertEqual(
+            unique["data"]["results"][0], {"asiakirjatyyppikoodi": "HE", "count": 84}
+        )
+        self.assertEqual(matter["data"], {"id": "HE 1/2024 vp"})
+        self.assertEqual(server.stats["GET /search"], 3)
+        with self.assertRaisesRegex(ApiError, "404"):
+            client.matter("HE 2/2024 vp")
+
+    def test_large_bodies_redirect_and_budgets_answer_429(self):
+        now = [0.0]
+
+        def advance(delay):
+            now[0] += delay
+
+        server = self.serve(
+            redirect_bytes=2000,
+            budgets={"POST": RequestBudget(2, 30.0)},
+            clock=lambda: now[0],
+        )
+        transport = PooledTransport()
+        self.addCleanup(transport.close)
+        client = EduskuntaClient(server.base_url, transport=transport, sleeper=advance)
+        payload = {"category": "valtiopaivaasia", "maxResults": 100}
+
+        pages = [client.search(payload, method="post") for _ in range(3)]
+
+        self.assertEqual(len(pages[2]["data"]["results"]), 100)
+        self.assertEqual(
+            pages[0]["trace"]["final_url"], f"{server.base_url}/blobs/1.json"
+        )
+        self.assertEqual(
+            pages[2]["trace"]["retries"],
+            [{"attempt": 1, "reason": "HTTP 429", "delay": 30.0}],
+        )
+        self.assertEqual((server.stats["302"], server.stats["429"]), (3, 1))
+
+    def test_corpus_from_a_recorded_cassette(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cassette = Path(directory) / "cassette.ndjson"
+
+            def detail(method, url, body, headers, timeout):
+                if "/search" in url:
+                    return FakeSearchTransport(4)(method, url, body, headers, timeout)
+                return HttpResponse(
+                    200, {"Content-Type": "application/json"}, b'{"id": 1}', url
+                )
+
+            client = EduskuntaClient(
+                transport=RecordingTransport(cassette, detail), sleeper=lambda _: None
+            )
+            client.search_all({"category": "aanestys"}, page_size=3, method="get")
+            client.vote("12")
+            corpus = FixtureCorpus.load(cassette)
+            corpus.save(Path(directory) / "corpus.json")
+            loaded = FixtureCorpus.load(Path(directory) / "corpus.json")
+
+        self.assertEqual(len(loaded.records["aanestys"]), 4)
+        self.assertEqual(
+            loaded.details["/taysistunnot/aanestykset/12"],
+            ("application/json", b'{"id": 1}'),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
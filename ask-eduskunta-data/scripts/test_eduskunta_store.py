@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+from eduskunta_api import EduskuntaClient
+from eduskunta_store import LocalStore, ingest, sync
+from test_eduskunta_api import FakeRecordTransport
+
+
+def vote(identifier: str, day: str, title: str = "Äänestys") -> dict[str, object]:
+    return {"id": identifier, "istuntopvm": day, "aanestysotsikko": {"fi": title}}
+
+
+class SyncTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = LocalStore(f"{self.directory.name}/mirror.sqlite")
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_first_sync_requires_a_start_date(self):
+        client = EduskuntaClient(transport=FakeRecordTransport([]))
+        with self.assertRaises(ValueError):
+            sync(client, self.store, "aanestys")
+
+    def test_incremental_sync_fetches_only_the_window_after_the_mark(self):
+        transport = FakeRecordTransport(
+            [vote("1", "2024-01-10"), vote("2", "2024-02-01"), vote("3", "2024-03-05")]
+        )
+        client = EduskuntaClient(transport=transport, sleeper=lambda _: None)
+
+        first = sync(
+            client, self.store, "aanestys", since="2024-01-01", today=date(2024, 3, 5)
+        )
+        self.assertEqual(first["data"]["new"], 3)
+        self.assertEqual(first["data"]["high_water"], "2024-03-05")
+
+        transport.records[2] = vote("3", "2024-03-05", "Korjattu")
+        transport.records.append(vote("4", "2024-03-06"))
+        transport.calls.clear()
+        second = sync(client, self.store, "aanestys", today=date(2024, 3, 6))
+
+        self.assertEqual(second["data"]["from"], "2024-03-04")
+        self.assertEqual(
+            (
+                second["data"]["new"],
+                second["data"]["changed"],
+                second["data"]["unchanged"],
+            ),
+            (1, 1, 0),
+        )
+        self.assertEqual(second["data"]["high_water"], "2024-03-06")
+        self.assertEqual(len(self.store.records("aanestys")), 4)
+        self.assertTrue(
+            all("2024-03-04" in str(call["payload"]) for call in transport.calls)
+        )
+
+
+class IngestQueryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = LocalStore(f"{self.directory.name}/mirror.sqlite")
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def envelope(self, path, data, request=None):
+        return {
+            "trace": {
+                "url": f"https://api.eduskunta.fi/api/v1{path}",
+                "retrieved_at": "2026-01-01T00:00:00+00:00",
+            },
+            "request": request,
+            "data": data,
+        }
+
+    def test_vote_detail_and_mps_answer_who_voted_no(self):
+        with self.store.connection:
+            self.store.ingest(
+                self.envelope(
+                    "/kansanedustajat",
+                    [
+                        {"henkilonro": "1", "etunimi": "Aino", "sukunimi": "Aalto"},
+                        {"henkilonro": "2", "etunimi": "Eero", "sukunimi": "Esko"},
+                    ],
+                )
+            )
+            self.store.ingest(
+                self.envelope(
+                    "/taysistunnot/asian-aanestykset/HE%2060%2F2018%20vp",
+                    [
+                        {
+                            "id": "42",
+                            "istunnonTunniste": "PTK 1/2018 vp",
+                            "eduskuntatunnus": "HE 60/2018 vp",
+                            "aanestystapahtumat": [
+                                {"henkilonro": "1", "aani": "Jaa"},
+                                {"henkilonro": "2", "aani": "Ei"},
+                            ],
+                        }
+                    ],
+                )
+            )
+
+        answer = self.store.query("matter-ballots", id="HE 60/2018 vp", ballot="Ei")
+
+        self.assertEqual([row["sukunimi"] for row in answer["data"]], ["Esko"])
+        self.assertEqual(answer["trace"]["source"], "local")
+        self.assertEqual(
+            answer["trace"]["provenance"][0]["retrieved_at"],
+            "2026-01-01T00:00:00+00:00",
+        )
+
+    def test_reference_data_is_not_taken_for_mp_details(self):
+        with self.store.connection:
+            counts = self.store.ingest(
+                self.envelope(
+                    "/reference-data/kansanedustajat",
+                    [{"henkilonro": "9", "etunimi": "Viite", "sukunimi": "Rivi"}],
+                )
+            )
+
+        self.assertEqual(counts, {})
+        self.assertEqual(self.store.query("mp", id="9")["data"], [])
+
+    def test_search_envelopes_are_normalised_by_category(self):
+        search = {
+            "trace": {"retrieved_at": "2026-01-01T00:00:00+00:00", "pages": []},
+            "request": {"category": "valtiopaivaasia"},
+            "data": {
+                "results": [
+                    {
+                        "valtiopaivaasia": {
+                            "eduskuntatunnus": {"fi": "HE 1/2024 vp"},
+                            "laadintapvm": {"fi": "2024-01-05"},
+                        }
+                    }
+                ]
+            },
+        }
+        with self.store.connection:
+            counts = self.store.ingest(search)
+
+        self.assertEqual(counts, {"valtiopaivaasia": 1})
+        row = self.store.query("matter", id="HE 1/2024 vp")["data"][0]
+        self.assertEqual(row["laadintapvm"], "2024-01-05")
+
+    def test_streamed_records_are_ingested_under_their_category(self):
+        matter = {
+            "valtiopaivaasia": {
+                "eduskuntatunnus": {"fi": "HE 2/2024 vp"},
+                "laadintapvm": {"fi": "2024-02-01"},
+            }
+        }
+        trailer = {
+            "trailer": {
+                "trace": {"retrieved_at": "2026-01-01T00:00:00+00:00", "pages": []},
+                "request": {"category": "valtiopaivaasia"},
+            }
+        }
+        speech = {"id": "7", "puhuja": {"henkilonro": "100"}}
+        speeches = {"trailer": {"summary": {"speeches": 1}, "request": {"year": 2024}}}
+        path = Path(self.directory.name)
+        (path / "asiat.ndjson").write_text(
+            "\n".join(json.dumps(item) for item in (matter, trailer)), encoding="utf-8"
+        )
+        (path / "puheet.ndjson").write_text(
+            "\n".join(json.dumps(item) for item in (speech, speeches)),
+            encoding="utf-8",
+        )
+
+        result = ingest(self.store, [str(path / "asiat.ndjson")])
+        with self.assertRaisesRegex(ValueError, "--category"):
+            ingest(self.store, [str(path / "puheet.ndjson")])
+        speeches_result = ingest(
+            self.store, [str(path / "puheet.ndjson")], category="puheenvuoro"
+        )
+
+        self.assertEqual(result["data"]["records"], {"valtiopaivaasia": 1})
+        self.assertEqual(speeches_result["data"]["records"], {"puheenvuoro": 1})
+        row = self.store.query("matter", id="HE 2/2024 vp")["data"][0]
+        self.assertEqual(row["laadintapvm"], "2024-02-01")
+
+    def test_sql_is_read_only(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.store.sql("DELETE FROM matters")
+
+
+if __name__ == "__main__":
+    unittest.main()
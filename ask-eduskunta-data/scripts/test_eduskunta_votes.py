@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from eduskunta_votes import (
+    ABSENT,
+    MISSING,
+    NO,
+    YES,
+    VoteMatrix,
+    VoteMatrixBuilder,
+    query_matrix,
+)
+
+
+def _vote(identifier, day, ballots, *, cancelled=False):
+    return {
+        "id": identifier,
+        "istunnonTunniste": f"PTK {identifier}/2024 vp",
+        "istuntopvm": day,
+        "aanestysmitatoity": cancelled,
+        "aanestystapahtumat": [
+            {"henkilonro": person, "aani": ballot, "eduskuntaryhma": group}
+            for person, ballot, group in ballots
+        ],
+    }
+
+
+def _envelope(*votes):
+    return {"trace": {"url": "/taysistunnot/istunnon-aanestykset/x"}, "data": list(votes)}
+
+
+class VoteMatrixTests(unittest.TestCase):
+    def setUp(self):
+        builder = VoteMatrixBuilder()
+        builder.add_envelope(
+            _envelope(
+                _vote(
+                    "2",
+                    "2024-02-01",
+                    [
+                        ("1", "Jaa", "kok"),
+                        ("2", "Jaa", "kok"),
+                        ("3", "Ei", "sd"),
+                        ("4", "Poissa", "sd"),
+                    ],
+                ),
+                _vote(
+                    "1",
+                    "2024-01-15",
+                    [
+                        ("1", "Jaa", "kok"),
+                        ("2", "Ei", "kok"),
+                        ("3", "Ei", "sd"),
+                        ("4", "Ei", "sd"),
+                    ],
+                ),
+                _vote("3", "2024-03-01", [("1", "Jaa", "kok")], cancelled=True),
+            )
+        )
+        builder.add_envelope(
+            _envelope(
+                _vote("4", "2024-03-05", [("5", "Tyhjää", "vas"), ("1", "?", "kok")])
+            )
+        )
+        self.builder = builder
+        self.matrix = builder.build()
+
+    def test_votes_are_ordered_by_date_with_one_byte_per_ballot(self):
+        self.assertEqual(self.matrix.vote_ids, ["1", "2", "4"])
+        self.assertEqual(self.matrix.shape, (3, 5))
+        self.assertEqual(self.matrix.row("2"), bytes([YES, YES, NO, ABSENT, MISSING]))
+        self.assertEqual(self.builder.skipped, 1)
+        self.assertEqual(self.matrix.row("4")[0], MISSING)
+        self.assertEqual(self.builder.unknown_ballots, {"?": 1})
+
+    def test_cohesion_turnout_and_agreement(self):
+        self.assertEqual(self.matrix.cohesion("kok"), [0.0, 1.0, None])
+        self.assertEqual(self.matrix.cohesion(["kok", "sd"]), [0.5, 1 / 3, None])
+        self.assertEqual(self.matrix.turnout(), [1.0, 0.75, 1.0])
+        agreement = self.matrix.agreement("3")
+        self.assertEqual(agreement["4"], {"compared": 1, "agreed": 1, "share": 1.0})
+        self.assertEqual(agreement["1"], {"compared": 2, "agreed": 0, "share": 0.0})
+        self.assertIsNone(agreement["5"]["share"])
+
+    def test_saved_matrix_is_memory_mapped_and_answers_the_same(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "term.vmx"
+            self.matrix.save(path)
+            with VoteMatrix.open(path) as opened:
+                self.assertIsInstance(opened.ballots, memoryview)
+                self.assertEqual(opened.row("2"), self.matrix.row("2"))
+                self.assertEqual(opened.group_cohesion(), self.matrix.group_cohesion())
+                answer = query_matrix(opened, "cohesion", groups=["sd"])
+
+        self.assertEqual([row["value"] for row in answer["data"]], [1.0, 1.0, None])
+        self.assertEqual(answer["data"][0]["session"], "PTK 1/2024 vp")
+        self.assertEqual(answer["trace"]["matrix"], str(path))
+
+    def test_unknown_group_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.matrix.cohesion("ps")
+
+    def test_unknown_member_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Unknown member: 99"):
+            self.matrix.agreement("99")
+
+
+if __name__ == "__main__":
+    unittest.main()